@@ -1,41 +1,96 @@
-from flask import Flask, render_template, request, url_for, session, redirect
+from flask import Flask, render_template, request, url_for, session, redirect, jsonify, Response
 import re
-import numpy as np
 import os
+import sys
 import math
+import time
+import functools
+import hypercomplex
 from hypercomplex import Quaternion, Coquaternion, parse_quaternion_expr, parse_coquaternion_expr
+import assets
+import expr_compiler
+import metrics
+import profiling
+import result_cache
+import slowlog
+import warmup
+import workspace
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-
-# Dicionário global para mapear funções matemáticas aos métodos do NumPy
-NUMPY_FUNCTIONS = {
-    'sin': np.sin,
-    'cos': np.cos,
-    'tan': np.tan,
-    'asin': np.arcsin,
-    'acos': np.arccos,
-    'atan': np.arctan,
-    'sinh': np.sinh,
-    'cosh': np.cosh,
-    'tanh': np.tanh,
-    'asinh': np.arcsinh,
-    'acosh': np.arccosh,
-    'atanh': np.arctanh,
-    'sqrt': np.sqrt,
-    'abs': np.abs,
-    'log': np.log10,
-    'ln': np.log,
-    'exp': np.exp,
-    'pi': np.pi,
-    'e': np.e,
-    'real': np.real,
-    'imag': np.imag,
-    'conj': np.conj,
-    'arg': np.angle,
-    'mod': np.mod,
+# Com vários workers, a chave tem de ser comum a todos para as sessões serem válidas
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
+assets.init_app(app)
+metrics.init_app(app)
+slowlog.init_app(app)
+profiling.init_app(app)
+result_cache.init_app(app)
+warmup.init_app(app)
+
+# Limite de pixels de cada imagem de /plot (largura x altura)
+app.config.setdefault('PLOT_MAX_PIXELS', int(os.environ.get('PLOT_MAX_PIXELS', 4_000_000)))
+
+# Dicionário global para mapear funções matemáticas aos nomes do NumPy.
+# O NumPy só é importado na primeira avaliação (ver numpy_environment), para que
+# o arranque dos workers e as rotas que não o usam não paguem a importação.
+NUMPY_FUNCTION_NAMES = {
+    'sin': 'sin',
+    'cos': 'cos',
+    'tan': 'tan',
+    'asin': 'arcsin',
+    'acos': 'arccos',
+    'atan': 'arctan',
+    'sinh': 'sinh',
+    'cosh': 'cosh',
+    'tanh': 'tanh',
+    'asinh': 'arcsinh',
+    'acosh': 'arccosh',
+    'atanh': 'arctanh',
+    'sqrt': 'sqrt',
+    'abs': 'abs',
+    'log': 'log10',
+    'ln': 'log',
+    'exp': 'exp',
+    'pi': 'pi',
+    'e': 'e',
+    'real': 'real',
+    'imag': 'imag',
+    'conj': 'conj',
+    'arg': 'angle',
+    'mod': 'mod',
 }
 
+_numpy_env = None
+
+def numpy_environment():
+    """
+    Devolve o ambiente base para avaliação de expressões com NumPy,
+    importando o NumPy na primeira utilização.
+
+    Returns:
+        dict: Nomes disponíveis nas expressões (não deve ser modificado)
+    """
+    global _numpy_env
+    if _numpy_env is None:
+        import numpy as np
+        env = {
+            'np': np,
+            'pi': np.pi,
+            'e': np.e,
+            'j': 1j,
+        }
+        # Adicionar funções matemáticas ao ambiente
+        for func_name, numpy_name in NUMPY_FUNCTION_NAMES.items():
+            env[func_name] = getattr(np, numpy_name)
+        _numpy_env = env
+    return _numpy_env
+
+def __getattr__(name):
+    """Mantém NUMPY_FUNCTIONS acessível, resolvendo-o apenas quando pedido."""
+    if name == 'NUMPY_FUNCTIONS':
+        env = numpy_environment()
+        return {func_name: env[func_name] for func_name in NUMPY_FUNCTION_NAMES}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def parse_complex_expr(expression):
     """
     Converte uma expressão matemática em formato adequado para o NumPy,
@@ -64,33 +119,18 @@ def parse_complex_expr(expression):
     
     return expression
 
-def safe_eval_expr(expression, angle_mode='rad'):
+def rewrite_complex_expr(expression, angle_mode='rad'):
     """
-    Avalia expressões matemáticas de forma segura usando NumPy,
-    com suporte para diferentes modos angulares.
-    
+    Reescreve uma expressão da calculadora principal em Python para o NumPy,
+    ajustando as funções trigonométricas ao modo angular.
+
     Args:
-        expression (str): A expressão matemática a ser avaliada
+        expression (str): A expressão matemática introduzida
         angle_mode (str): 'rad' para radianos, 'deg' para graus
-    
+
     Returns:
-        O resultado da avaliação da expressão
-    
-    Raises:
-        ValueError: Se ocorrer erro na avaliação da expressão
+        str: Expressão pronta a avaliar no ambiente do NumPy
     """
-    # Preparar ambiente seguro para avaliação
-    safe_env = {
-        'np': np,
-        'pi': np.pi,
-        'e': np.e,
-        'j': 1j,
-    }
-    
-    # Adicionar funções matemáticas ao ambiente
-    for func_name, func in NUMPY_FUNCTIONS.items():
-        safe_env[func_name] = func
-    
     # Processar expressões trigonométricas para o modo angular correto
     if angle_mode == 'deg':
         # Para funções trigonométricas directas, converter entrada de grau para radiano
@@ -104,13 +144,111 @@ def safe_eval_expr(expression, angle_mode='rad'):
         expression = re.sub(r'atan\((.*?)\)', r'(180/pi)*atan(\1)', expression)
     
     # Substituir funções específicas pelo equivalente NumPy
-    parsed_expr = parse_complex_expr(expression)
+    return parse_complex_expr(expression)
+
+def safe_eval_expr(expression, angle_mode='rad', stats=None, variables=None):
+    """
+    Avalia expressões matemáticas de forma segura usando NumPy,
+    com suporte para diferentes modos angulares.
+    
+    Args:
+        expression (str): A expressão matemática a ser avaliada
+        angle_mode (str): 'rad' para radianos, 'deg' para graus
+        stats (dict, optional): Se fornecido, recebe o tempo (em segundos)
+            das etapas 'rewrite' e 'eval' e a expressão reescrita em 'rewritten'
+        variables (dict, optional): Variáveis e funções do utilizador, por nome
+    
+    Returns:
+        O resultado da avaliação da expressão
+    
+    Raises:
+        ValueError: Se ocorrer erro na avaliação da expressão
+    """
+    start = time.perf_counter()
+
+    # Preparar ambiente seguro para avaliação (cópia, para não partilhar estado entre pedidos)
+    safe_env = dict(numpy_environment())
+    if variables:
+        safe_env.update(variables)
+    
+    parsed_expr = rewrite_complex_expr(expression, angle_mode)
+
+    rewritten = time.perf_counter()
+    if stats is not None:
+        stats['rewrite'] = rewritten - start
+        stats['rewritten'] = parsed_expr
     
     # Avaliar a expressão no ambiente seguro
     try:
         return eval(parsed_expr, {"__builtins__": {}}, safe_env)
+    except Exception as e:
+        if stats is not None:
+            stats['eval_error'] = type(e).__name__
+        raise ValueError(f"Erro ao avaliar expressão: {str(e)}")
+    finally:
+        if stats is not None:
+            stats['eval'] = time.perf_counter() - rewritten
+
+@functools.lru_cache(maxsize=256)
+def compile_complex_expr(expression, angle_mode='rad', variables=()):
+    """
+    Reescreve e compila (com memorização) uma expressão da calculadora
+    principal, para a avaliar várias vezes (p.ex. o corpo de uma função do
+    utilizador).
+
+    Args:
+        expression (str): Expressão introduzida pelo utilizador
+        angle_mode (str): 'rad' ou 'deg'
+        variables (tuple): Nomes cujo valor é indicado em cada avaliação
+
+    Returns:
+        expr_compiler.CompiledExpression: Expressão a avaliar com evaluate(valores)
+
+    Raises:
+        SyntaxError: Se a expressão reescrita não for Python válido
+    """
+    source = rewrite_complex_expr(expression, angle_mode)
+    return expr_compiler.CompiledExpression(source, compile(source, '<string>', 'eval'), numpy_environment(), {})
+
+def evaluate_complex_grid(expression, bounds, size, angle_mode='rad', variables=None):
+    """
+    Avalia uma expressão da calculadora principal em toda uma grelha de
+    valores de z, de uma só vez: a expressão é compilada (com memorização) e
+    cada função do ambiente é uma ufunc do NumPy aplicada ao array completo.
+
+    Args:
+        expression (str): Expressão em função de z
+        bounds (tuple): (re_min, re_max, im_min, im_max) da região do plano
+        size (tuple): (largura, altura) da grelha, em pontos
+        angle_mode (str): 'rad' ou 'deg'
+        variables (dict, optional): Variáveis e funções do utilizador, por nome
+
+    Returns:
+        np.ndarray: Valores complexos (altura, largura); a primeira linha
+            corresponde a im_max, como numa imagem
+
+    Raises:
+        ValueError: Se a expressão não for válida ou não der valores numéricos
+    """
+    import numpy as np
+    re_min, re_max, im_min, im_max = bounds
+    width, height = size
+    values = dict(variables or {})
+    values['z'] = (np.linspace(re_min, re_max, width)[np.newaxis, :]
+                   + 1j * np.linspace(im_max, im_min, height)[:, np.newaxis])
+    try:
+        compiled = compile_complex_expr(expression, angle_mode, tuple(sorted(values)))
+        # Pólos e ramos fora do domínio dão inf/NaN, que a imagem representa
+        with np.errstate(all='ignore'):
+            result = np.asarray(compiled.evaluate(values), dtype=np.complex128)
     except Exception as e:
         raise ValueError(f"Erro ao avaliar expressão: {str(e)}")
+    # Uma expressão constante (sem z) ocupa a grelha inteira
+    return np.broadcast_to(result, (height, width))
+
+def is_reserved_name(name):
+    """Indica se um nome pertence ao ambiente da calculadora principal ou é reescrito (i, j)."""
+    return name in NUMPY_FUNCTION_NAMES or name in ('np', 'j') or parse_complex_expr(name) != name
 
 def format_result(value):
     """
@@ -127,13 +265,145 @@ def format_result(value):
     if isinstance(value, complex):
         return str(value).replace('j', 'i')
     
-    # Para arrays NumPy ou outros tipos NumPy
-    elif isinstance(value, np.ndarray) or isinstance(value, np.number):
+    # Para arrays NumPy ou outros tipos NumPy (só possíveis se o NumPy já foi importado)
+    np = sys.modules.get('numpy')
+    if np is not None and (isinstance(value, np.ndarray) or isinstance(value, np.number)):
         return str(value)
     
     # Para outros tipos, converter para string
     return str(value)
 
+def _record_evaluation(calculator, expression, stats, error=None, angle_mode=None):
+    """
+    Regista as métricas e, se exceder o limiar, a entrada no registo de
+    avaliações lentas de uma avaliação concluída.
+
+    Args:
+        calculator (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+        expression (str): Expressão original
+        stats (dict): Tempos por etapa recolhidos durante a avaliação
+        error (Exception, optional): Excepção que fez falhar a avaliação
+        angle_mode (str, optional): Modo angular da calculadora principal
+    """
+    if error is not None:
+        metrics.count_error(calculator, stats.get('eval_error', type(error).__name__))
+    metrics.observe_stages(calculator, stats)
+    slowlog.record(calculator, expression, stats, error, angle_mode)
+
+def _timed_render(calculator, template_name, **context):
+    """
+    Renderiza um template registando o tempo gasto na etapa 'render'.
+
+    Args:
+        calculator (str): Tipo de calculadora, usado como etiqueta da métrica
+        template_name (str): Nome do template a renderizar
+        **context: Variáveis passadas ao template
+
+    Returns:
+        str: Template HTML renderizado
+    """
+    start = time.perf_counter()
+    html = render_template(template_name, **context)
+    metrics.observe(metrics.STAGE_SECONDS, time.perf_counter() - start, calculator=calculator, stage='render')
+    return html
+
+def _wants_partial():
+    """
+    Indica se o pedido foi submetido pelo calculator.js em segundo plano,
+    caso em que basta devolver o resultado e a nova entrada do histórico.
+
+    Returns:
+        bool: True se o cliente pediu uma resposta JSON
+    """
+    return request.accept_mimetypes.best == 'application/json'
+
+def _partial_response(result, history_entry, error=None):
+    """
+    Resposta JSON a uma submissão em segundo plano.
+
+    Args:
+        result (str): Resultado formatado (ou mensagem de erro)
+        history_entry (dict): Entrada acrescentada ao histórico, ou None
+        error (Exception, optional): Excepção que fez falhar a avaliação
+
+    Returns:
+        Response: JSON com 'result', 'entry' e 'error'
+    """
+    return jsonify(result=result, entry=history_entry, error=error is not None)
+
+def _standard_evaluator(angle_mode):
+    """Operações da calculadora principal para o espaço de nomes, no modo angular indicado."""
+    return workspace.Evaluator(
+        compile=lambda expression, variables: compile_complex_expr(expression, angle_mode, variables),
+        evaluate=lambda expression, values, stats, mode: safe_eval_expr(expression, mode or angle_mode, stats, values),
+        reserved=is_reserved_name,
+    )
+
+_QUATERNION_EVALUATOR = workspace.Evaluator(
+    compile=lambda expression, variables: hypercomplex.compile_hypercomplex_expr(expression, 'Quaternion', variables),
+    evaluate=lambda expression, values, stats, angle_mode: parse_quaternion_expr(expression, stats, values),
+    reserved=lambda name: hypercomplex.is_reserved_name(name, 'Quaternion'),
+)
+
+_COQUATERNION_EVALUATOR = workspace.Evaluator(
+    compile=lambda expression, variables: hypercomplex.compile_hypercomplex_expr(expression, 'Coquaternion', variables),
+    evaluate=lambda expression, values, stats, angle_mode: parse_coquaternion_expr(expression, stats, values),
+    reserved=lambda name: hypercomplex.is_reserved_name(name, 'Coquaternion'),
+)
+
+def _execute(calculator, expression, evaluator, formatter, stats, angle_mode=None):
+    """
+    Executa uma instrução (expressão, atribuição ou definição de função) no
+    espaço de nomes da sessão (ver workspace).
+
+    As expressões sem nomes do utilizador passam pela cache de resultados;
+    as restantes dependem da sessão e são avaliadas com os valores nativos
+    das variáveis e as funções já compiladas.
+
+    Args:
+        calculator (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+        expression (str): Instrução introduzida
+        evaluator (workspace.Evaluator): Operações da calculadora
+        formatter (callable): Formata o valor para exibição
+        stats (dict): Recebe os tempos por etapa
+        angle_mode (str, optional): Modo angular da calculadora principal
+
+    Returns:
+        tuple: (resultado formatado, True se o resultado ficou guardado em ans)
+    """
+    space = workspace.load(session, calculator)
+    statement = workspace.parse_statement(expression)
+    if statement.kind == 'definition':
+        space.define(statement.name, statement.params, statement.expression, evaluator)
+        space.save(session)
+        return f"{statement.name}({', '.join(statement.params)}) = {statement.expression}", False
+
+    computed = []
+
+    def evaluate(canonical, values=None):
+        value = evaluator.evaluate(canonical, values, stats, angle_mode)
+        computed.append(value)
+
+        start = time.perf_counter()
+        formatted = formatter(value)
+        stats['format'] = time.perf_counter() - start
+        return formatted
+
+    if statement.kind == 'assignment' or space.references(statement.expression):
+        result = evaluate(statement.expression, space.scope(evaluator, statement.expression))
+        if statement.kind == 'assignment':
+            space.assign(statement.name, computed[0], evaluator)
+    else:
+        result, _ = result_cache.get_or_compute(calculator, expression, evaluate, angle_mode)
+
+    if computed:
+        space.set_answer(computed[0])
+    else:
+        # Resultado servido pela cache: ans só é calculado se for usado
+        space.set_pending_answer(result_cache.canonicalize(expression, calculator), angle_mode)
+    space.save(session)
+    return result, True
+
 @app.route("/", methods=["GET", "POST"])
 def calculatormain():
     """
@@ -161,17 +431,21 @@ def calculatormain():
         
     result = ""
     if request.method == "POST":
+        stats = {}
+        error = None
+        history_entry = None
         try:
             expression = request.form["expression"]
             
-            # Avaliar a expressão usando a função segura com NumPy
-            computed = safe_eval_expr(expression, session['angle_mode'])
-
-            # Formatar o resultado para exibição
-            result = format_result(computed)
+            # Avaliar a instrução usando a função segura com NumPy
+            angle_mode = session['angle_mode']
+            result, is_answer = _execute('standard', expression, _standard_evaluator(angle_mode),
+                                         format_result, stats, angle_mode)
             
             # Adicionar o cálculo ao histórico do utilizador
             history_entry = {'expression': expression, 'result': result}
+            if is_answer:
+                history_entry['ans'] = True
             history = session['history']
             history.insert(0, history_entry)
             # Limitar o histórico aos 20 cálculos mais recentes
@@ -180,12 +454,16 @@ def calculatormain():
             session['history'] = history
             
         except Exception as e:
+            error = e
             result = f"Erro: {str(e)}"
+        _record_evaluation('standard', request.form.get("expression", ""), stats, error, angle_mode=session['angle_mode'])
+        if _wants_partial():
+            return _partial_response(result, history_entry, error)
 
     # Preparar os dados para renderização do template
     history = session.get('history', [])
     angle_mode = session.get('angle_mode', 'rad')
-    return render_template("calculator.html", result=result, history=history, angle_mode=angle_mode)
+    return _timed_render('standard', "calculator.html", result=result, history=history, angle_mode=angle_mode)
 
 @app.route("/toggle_angle_mode")
 def toggle_angle_mode():
@@ -215,16 +493,18 @@ def quaternions():
         
     result = ""
     if request.method == "POST":
+        stats = {}
+        error = None
+        history_entry = None
         try:
             expression = request.form["expression"]
             
-            # Avaliar a expressão usando a função de parse de quaterniões
-            computed = parse_quaternion_expr(expression)
-            
-            result = str(computed)
+            result, is_answer = _execute('quaternion', expression, _QUATERNION_EVALUATOR, str, stats)
             
             # Adicionar o cálculo ao histórico de quaterniões
             history_entry = {'expression': expression, 'result': result}
+            if is_answer:
+                history_entry['ans'] = True
             history = session['quaternion_history']
             history.insert(0, history_entry)
             if len(history) > 20:
@@ -232,10 +512,14 @@ def quaternions():
             session['quaternion_history'] = history
             
         except Exception as e:
+            error = e
             result = f"Erro: {str(e)}"
+        _record_evaluation('quaternion', request.form.get("expression", ""), stats, error)
+        if _wants_partial():
+            return _partial_response(result, history_entry, error)
             
     history = session.get('quaternion_history', [])
-    return render_template("quaternion.html", result=result, history=history)
+    return _timed_render('quaternion', "quaternion.html", result=result, history=history)
 
 @app.route("/coquaternions", methods=["GET", "POST"])
 def coquaternions():
@@ -251,16 +535,18 @@ def coquaternions():
         
     result = ""
     if request.method == "POST":
+        stats = {}
+        error = None
+        history_entry = None
         try:
             expression = request.form["expression"]
             
-            # Usar parse_coquaternion_expr em vez de eval()
-            computed = parse_coquaternion_expr(expression)
-            
-            result = str(computed)
+            result, is_answer = _execute('coquaternion', expression, _COQUATERNION_EVALUATOR, str, stats)
             
             # Adicionar o cálculo ao histórico de coquaterniões
             history_entry = {'expression': expression, 'result': result}
+            if is_answer:
+                history_entry['ans'] = True
             history = session['coquaternion_history']
             history.insert(0, history_entry)
             if len(history) > 20:
@@ -268,10 +554,63 @@ def coquaternions():
             session['coquaternion_history'] = history
             
         except Exception as e:
+            error = e
             result = f"Erro: {str(e)}"
+        _record_evaluation('coquaternion', request.form.get("expression", ""), stats, error)
+        if _wants_partial():
+            return _partial_response(result, history_entry, error)
             
     history = session.get('coquaternion_history', [])
-    return render_template("coquaternion.html", result=result, history=history)
+    return _timed_render('coquaternion', "coquaternion.html", result=result, history=history)
+
+@app.route("/plot")
+def plot():
+    """
+    Imagem PNG da coloração de domínio de uma expressão em função de z.
+
+    Parâmetros do pedido: expression, re_min, re_max, im_min, im_max (região
+    do plano complexo) e width, height (resolução, em pixels). A expressão
+    segue as regras da calculadora principal, incluindo o modo angular e as
+    variáveis e funções da sessão.
+
+    Returns:
+        Response: Imagem PNG, ou JSON com 'error' (400) se os parâmetros ou a
+            expressão forem inválidos
+    """
+    # imaging importa o NumPy: só é carregado quando é pedida uma imagem
+    import imaging
+    stats = {}
+    expression = request.args.get('expression', '')
+    try:
+        try:
+            bounds = tuple(float(request.args.get(name, default)) for name, default in
+                           (('re_min', -2), ('re_max', 2), ('im_min', -2), ('im_max', 2)))
+            size = (int(request.args.get('width', 512)), int(request.args.get('height', 512)))
+        except ValueError:
+            raise ValueError("Os limites e a resolução devem ser números")
+        if not expression.strip():
+            raise ValueError("Expressão em falta")
+        if not all(math.isfinite(bound) for bound in bounds) or bounds[0] >= bounds[1] or bounds[2] >= bounds[3]:
+            raise ValueError("Limites inválidos: é preciso re_min < re_max e im_min < im_max")
+        if min(size) < 1 or size[0] * size[1] > app.config['PLOT_MAX_PIXELS']:
+            raise ValueError(f"Resolução inválida: até {app.config['PLOT_MAX_PIXELS']} pixels")
+
+        space = workspace.load(session, 'standard')
+        angle_mode = session.get('angle_mode', 'rad')
+        evaluator = _standard_evaluator(angle_mode)
+        variables = space.scope(evaluator, expression) if space.references(expression) else None
+
+        start = time.perf_counter()
+        values = evaluate_complex_grid(expression, bounds, size, angle_mode, variables)
+        rendered = time.perf_counter()
+        png = imaging.encode_png(imaging.domain_coloring(values))
+        stats['eval'] = rendered - start
+        stats['render'] = time.perf_counter() - rendered
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        metrics.observe_stages('plot', stats)
+    return Response(png, mimetype='image/png')
 
 @app.route("/clear_history/<calculator_type>")
 def clear_history(calculator_type):
@@ -292,7 +631,23 @@ def clear_history(calculator_type):
         session['coquaternion_history'] = []
     return redirect(request.referrer or '/')
 
+@app.route("/clear_variables/<calculator_type>")
+def clear_variables(calculator_type):
+    """
+    Apaga as variáveis e funções definidas numa calculadora.
+
+    Args:
+        calculator_type (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+
+    Returns:
+        Redirecionamento para a página anterior
+    """
+    if calculator_type in ('standard', 'quaternion', 'coquaternion'):
+        workspace.clear(session, calculator_type)
+    return redirect(request.referrer or '/')
+
 if __name__ == "__main__":
     # Executa a aplicação quando o script é executado directamente
-    app.run(debug=True)
-    # Para Docker: app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # (servidor de desenvolvimento; em produção usar gunicorn -c gunicorn.conf.py wsgi:app)
+    warmup.warm_up(app)
+    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Endereços e entrega dos recursos estáticos gerados por tools/build_assets.py.
+
+Os templates referem os recursos pelo nome lógico através de asset_url().
+Se existir o manifesto do build, o endereço aponta para a versão minificada
+com impressão digital, servida em /assets/ com cabeçalhos de cache
+imutáveis e, quando o cliente aceita gzip, a partir da variante
+pré-comprimida. Sem build, recorre aos ficheiros originais em static/.
+
+Como os recursos com impressão digital ficam em cache um ano, um pacote só é
+usado se os hashes das origens gravados pelo build coincidirem, no arranque, com os
+ficheiros actuais em static/; um pacote desactualizado (ou um build antigo,
+sem hashes) é ignorado e o endereço volta a apontar para o original. Em modo
+de depuração o manifesto é ignorado por completo.
+"""
+import hashlib
+import json
+import os
+
+# Um recurso com impressão digital nunca muda de conteúdo: pode ficar em cache um ano
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def load_manifest(dist_dir):
+    """
+    Lê o manifesto do build.
+
+    Args:
+        dist_dir (str): Pasta com os recursos gerados
+
+    Returns:
+        dict: Nome lógico -> nome com impressão digital (vazio se não houver build)
+    """
+    try:
+        with open(os.path.join(dist_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def current_manifest(static_dir, dist_dir):
+    """
+    Manifesto do build restrito aos pacotes cujas origens não mudaram.
+
+    Args:
+        static_dir (str): Pasta dos ficheiros de origem
+        dist_dir (str): Pasta com os recursos gerados
+
+    Returns:
+        dict: Nome lógico -> nome com impressão digital, só dos pacotes actuais
+    """
+    manifest = load_manifest(dist_dir)
+    try:
+        with open(os.path.join(dist_dir, 'sources.json'), encoding='utf-8') as f:
+            hashes = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    def _unchanged(source, digest):
+        try:
+            with open(os.path.join(static_dir, source), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest() == digest
+        except OSError:
+            return False
+
+    return {
+        name: filename for name, filename in manifest.items()
+        if hashes.get(name) and all(_unchanged(s, d) for s, d in hashes[name].items())
+    }
+
+
+def init_app(app):
+    """
+    Regista a função asset_url nos templates e a rota /assets/ na aplicação.
+
+    Args:
+        app (Flask): Aplicação a configurar
+    """
+    from flask import abort, request, send_from_directory, url_for
+
+    dist_dir = os.path.join(app.static_folder, 'dist')
+    manifest = current_manifest(app.static_folder, dist_dir)
+    fingerprinted = set(manifest.values())
+
+    def asset_url(name):
+        """
+        Endereço de um recurso estático pelo seu nome lógico.
+
+        Args:
+            name (str): Nome lógico (p.ex. 'style.css')
+
+        Returns:
+            str: Endereço da versão com impressão digital, ou do ficheiro original
+        """
+        # Em depuração os ficheiros de static/ mudam a toda a hora: servem-se sempre
+        # os originais (app.debug só fica definido em app.run, depois de init_app)
+        filename = None if app.debug else manifest.get(name)
+        if filename is None:
+            return url_for('static', filename=name)
+        return url_for('asset', filename=filename)
+
+    @app.context_processor
+    def _inject_asset_url():
+        return {'asset_url': asset_url}
+
+    @app.route("/assets/<path:filename>")
+    def asset(filename):
+        """
+        Entrega um recurso com impressão digital, comprimido se possível.
+
+        Args:
+            filename (str): Nome com impressão digital, tal como no manifesto
+
+        Returns:
+            Response: Ficheiro com cabeçalhos de cache imutáveis
+        """
+        if filename not in fingerprinted:
+            abort(404)
+        compressed = filename + '.gz'
+        use_gzip = ('gzip' in request.headers.get('Accept-Encoding', '')
+                    and os.path.exists(os.path.join(dist_dir, compressed)))
+        if use_gzip:
+            import mimetypes
+            mimetype = mimetypes.guess_type(filename)[0]
+            response = send_from_directory(dist_dir, compressed, mimetype=mimetype, max_age=31536000)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_from_directory(dist_dir, filename, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
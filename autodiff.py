@@ -0,0 +1,786 @@
+"""
+Diferenciação automática (modo directo) de expressões com quaterniões e
+coquaterniões, com números duais.
+
+Um número dual x + ε·dx (com ε² = 0 e ε a comutar com tudo) transporta, a
+par do valor x, as suas derivadas dx em ordem a P parâmetros. Cada operação
+calcula o valor com as fórmulas das classes Quaternion e Coquaternion e a
+sua matriz jacobiana 4x4 no ponto, que é aplicada às derivadas (regra da
+cadeia): no produto, d(xy) = dx·y + x·dy, com as matrizes das
+multiplicações à direita por y e à esquerda por x (o produto não é
+comutativo); no inverso, d(x⁻¹) = -x⁻¹·dx·x⁻¹. Uma única avaliação dá o
+valor e o jacobiano, sem as 2P avaliações extra (e a perda de precisão) das
+diferenças finitas.
+
+As funções exp, ln, sin, cos, ... das classes têm a forma
+f(a + v) = A + g·v, com A + g·ω·u = f(a + ω·u) e u² = -1 (quaterniões e
+coquaterniões tipo tempo) ou u² = +1 (coquaterniões tipo espaço). As
+derivadas de A e g obtêm-se de f' no mesmo ponto e dão a derivada em
+qualquer direcção (e não só na de q). Nos coquaterniões tipo luz, são as da
+série em δ = b² - c² - d², com f'' e f''', que prolonga as fórmulas T e S.
+
+O valor tem a forma dos dados (() para um elemento, (N,) para um vector) e
+as derivadas são um array (4, P, *forma). Os mesmos números duais servem
+assim os elementos das classes (com produtos de matrizes 4x4) e os vectores
+de hyperarray (componente a componente). Os elementos singulares não lançam
+excepções: dão inf ou nan, como nos vectores.
+
+Exemplo:
+    value, jac = jacobian(lambda q, p: (q * p).exp() * q.inverse(), q, p)
+    # value: Quaternion; jac: array (4, 8), d(componente)/d(parâmetro)
+    value, jac = expression_jacobian('exp(q*p) / q', {'q': vector, 'p': p})
+    # value: QuaternionArray; jac: array (N, 4, 8)
+"""
+import math
+import numbers
+import operator
+
+import numpy as np
+
+from hypercomplex import Quaternion, Coquaternion, compile_hypercomplex_expr
+from hyperarray import QuaternionArray, CoquaternionArray
+
+# Limiar das classes abaixo do qual a parte vectorial é considerada nula
+_EPSILON = 1e-15
+
+_UNITS = ((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0), (0.0, 0.0, 1.0, 0.0), (0.0, 0.0, 0.0, 1.0))
+
+
+def _inverse_second(z):
+    return -1 / (z * z)
+
+
+def _inverse_third(z):
+    return 2 / (z * z * z)
+
+
+def _negative_sin(z):
+    return -np.sin(z)
+
+
+def _negative_cos(z):
+    return -np.cos(z)
+
+
+# f, f', f'' e f''' das funções das classes (as duas últimas só são precisas
+# nos coquaterniões tipo luz, e só existem para as funções dos coquaterniões)
+_FUNCTIONS = {
+    'exp': (np.exp, np.exp, np.exp, np.exp),
+    'ln': (np.log, np.reciprocal, _inverse_second, _inverse_third),
+    'sin': (np.sin, np.cos, _negative_sin, _negative_cos),
+    'cos': (np.cos, _negative_sin, _negative_cos, np.sin),
+    'sinh': (np.sinh, np.cosh, np.sinh, np.cosh),
+    'cosh': (np.cosh, np.sinh, np.cosh, np.sinh),
+    'tan': (np.tan, lambda z: 1 / np.cos(z) ** 2),
+    'tanh': (np.tanh, lambda z: 1 / np.cosh(z) ** 2),
+    'asin': (np.arcsin, lambda z: 1 / np.sqrt(1 - z * z)),
+    'acos': (np.arccos, lambda z: -1 / np.sqrt(1 - z * z)),
+    'atan': (np.arctan, lambda z: 1 / (1 + z * z)),
+    'asinh': (np.arcsinh, lambda z: 1 / np.sqrt(1 + z * z)),
+    'acosh': (np.arccosh, lambda z: 1 / (np.sqrt(z - 1) * np.sqrt(z + 1))),
+    'atanh': (np.arctanh, lambda z: 1 / (1 - z * z)),
+    'sqrt': (np.sqrt, lambda z: 0.5 / np.sqrt(z)),
+}
+
+
+def _quaternion_product(x, y):
+    """Produto de Quaternion.__mul__ sobre componentes (números ou arrays)."""
+    a1, b1, c1, d1 = x
+    a2, b2, c2, d2 = y
+    return (
+        a1*a2 - b1*b2 - c1*c2 - d1*d2,
+        a1*b2 + b1*a2 + c1*d2 - d1*c2,
+        a1*c2 - b1*d2 + c1*a2 + d1*b2,
+        a1*d2 + b1*c2 - c1*b2 + d1*a2,
+    )
+
+
+def _coquaternion_product(x, y):
+    """Produto de Coquaternion.__mul__ sobre componentes (números ou arrays)."""
+    a1, b1, c1, d1 = x
+    a2, b2, c2, d2 = y
+    return (
+        a1*a2 - b1*b2 + c1*c2 + d1*d2,
+        a2*b1 + a1*b2 + c2*d1 - c1*d2,
+        a2*c1 + a1*c2 + b2*d1 - b1*d2,
+        -(b2*c1) + b1*c2 + a2*d1 + a1*d2,
+    )
+
+
+def _where(condition, x, y):
+    """np.where, sem o custo do NumPy quando a condição é um só valor."""
+    if not isinstance(condition, np.ndarray) or not condition.ndim:
+        return x if condition else y
+    return np.where(condition, x, y)
+
+
+def _transform(matrix, tangent):
+    """
+    Aplica uma matriz 4x4 às derivadas.
+
+    Args:
+        matrix (sequence): Linhas de 4 entradas (números ou arrays com a forma dos dados)
+        tangent (np.ndarray): Derivadas (4, P, ...), ou None
+
+    Returns:
+        np.ndarray: Derivadas transformadas (None se tangent for None)
+    """
+    if tangent is None:
+        return None
+    if tangent.ndim == 2:
+        # Um elemento: um só produto de matrizes
+        return np.array(matrix, dtype=float) @ tangent
+    return np.stack([sum(entry * row for entry, row in zip(line, tangent)) for line in matrix])
+
+
+def _sum(x, y):
+    """Soma de duas derivadas (None para as de uma constante)."""
+    if x is None:
+        return y
+    if y is None:
+        return x
+    return x + y
+
+
+def _gradient_tangent(gradient, tangent):
+    """Derivadas de um resultado real (só a componente a), dado o seu gradiente."""
+    if tangent is None:
+        return None
+    first = sum(entry * row for entry, row in zip(gradient, tangent))
+    result = np.zeros((4,) + np.shape(first))
+    result[0] = first
+    return result
+
+
+def _function_matrix(real_gradient, g, g_gradient, vector):
+    """
+    Jacobiana de q -> A + g·v, dados os gradientes de A e de g em ordem a (a, b, c, d).
+    """
+    rows = [tuple(real_gradient)]
+    for k, v_k in enumerate(vector):
+        rows.append(tuple(v_k * entry + (g if j == k + 1 else 0.0) for j, entry in enumerate(g_gradient)))
+    return rows
+
+
+def _quaternion_function(value, name):
+    """Valor e jacobiana de uma função de Quaternion (ver _apply_complex_func_to_quaternion)."""
+    f, df = _FUNCTIONS[name][:2]
+    a, b, c, d = value
+    squared = b*b + c*c + d*d
+    small = squared < _EPSILON ** 2
+    omega = np.sqrt(squared)
+    safe = _where(small, 1.0, omega)
+    # f(a + i·ω); com a parte vectorial nula, f(a) dá as componentes a e b
+    z = a + 1j * _where(small, 0.0, omega)
+    result = f(z)
+    g = _where(small, 0.0, result.imag / safe)
+    value = (result.real, _where(small, result.imag, g * b), g * c, g * d)
+
+    # dω = v·dv/ω; d(A + g·ω·i) = f'(z)·(da + dω·i), com f'(z) = p + q·i
+    derivative = df(z)
+    p, q = derivative.real, derivative.imag
+    # Parte vectorial nula: f'(a)·dq (multiplicação à esquerda por p + q·i)
+    at_real = ((p, -q, 0.0, 0.0), (q, p, 0.0, 0.0), (0.0, 0.0, p, -q), (0.0, 0.0, q, p))
+    if small is True or small is np.True_:
+        return value, at_real
+    unit = (b / safe, c / safe, d / safe)
+    scale = (p - g) / safe
+    general = _function_matrix((p,) + tuple(-q * u for u in unit), g,
+                               (q / safe,) + tuple(scale * u for u in unit), (b, c, d))
+    if not isinstance(small, np.ndarray):
+        return value, general
+    matrix = [[np.where(small, s, t) for s, t in zip(row_s, row_t)] for row_s, row_t in zip(at_real, general)]
+    return value, matrix
+
+
+def _coquaternion_function(value, name):
+    """Valor e jacobiana de uma função de Coquaternion (fórmulas T, S e L)."""
+    f, df, d2f, d3f = _FUNCTIONS[name]
+    a, b, c, d = value
+    disc = b*b - c*c - d*d
+    timelike = disc >= _EPSILON
+    spacelike = disc <= -_EPSILON
+    lightlike = np.abs(disc) < _EPSILON
+    omega = np.sqrt(np.abs(disc))
+    # ωq = v/ω, ou v se ω for nulo (Coquaternion._get_omega_q)
+    safe = _where(omega < _EPSILON, 1.0, omega)
+
+    # T: f(a + i·ω); S: f(a ± ω), cuja semi-soma e semi-diferença são A e g·ω; L: f(a) + f'(a)·ωq
+    complex_result = f(a + 1j * omega)
+    plus, minus = f(a + omega), f(a - omega)
+    f1 = df(a)
+    real = _where(timelike, complex_result.real, _where(spacelike, 0.5 * (plus + minus), f(a)))
+    vector = _where(timelike, complex_result.imag, _where(spacelike, 0.5 * (plus - minus), f1))
+    g = vector / safe
+    value = (real, g * b, g * c, g * d)
+
+    # dω = ±(b·db - c·dc - d·dd)/ω; f'(a + ω·u) = p + q·u dá
+    # d(A + g·ω·u) = (p + q·u)(da + dω·u), com u² = -1 (T) ou +1 (S)
+    complex_derivative = df(a + 1j * omega)
+    d_plus, d_minus = df(a + omega), df(a - omega)
+    p = _where(timelike, complex_derivative.real, 0.5 * (d_plus + d_minus))
+    q = _where(timelike, complex_derivative.imag, 0.5 * (d_plus - d_minus))
+    unit = tuple(np.sign(disc) * x / safe for x in (b, -c, -d))
+    square = _where(timelike, -1.0, 1.0)
+    real_gradient = (p,) + tuple(square * q * u for u in unit)
+    scale = (p - g) / safe
+    g_gradient = (q / safe,) + tuple(scale * u for u in unit)
+
+    # L: A = f(a) - f''(a)·δ/2 + ... e g = f'(a) - f'''(a)·δ/6 + ..., com dδ = 2(b·db - c·dc - d·dd)
+    f2, f3 = d2f(a), d3f(a)
+    half_gradient = (0.0, b, -c, -d)
+    real_gradient = [_where(lightlike, f1 if j == 0 else -f2 * h, entry)
+                     for j, (h, entry) in enumerate(zip(half_gradient, real_gradient))]
+    g_gradient = [_where(lightlike, f2 if j == 0 else -f3 * h / 3, entry)
+                  for j, (h, entry) in enumerate(zip(half_gradient, g_gradient))]
+    g = _where(lightlike, f1, g)
+    return value, _function_matrix(real_gradient, g, g_gradient, (b, c, d))
+
+
+class _Dual:
+    """
+    Base de DualQuaternion e DualCoquaternion.
+
+    Args:
+        value (sequence): Componentes a, b, c, d (números ou arrays com a forma dos dados)
+        tangent (np.ndarray, optional): Derivadas (4, P, *forma dos dados);
+            None para uma constante
+    """
+
+    algebra = None
+    array_class = None
+    _metric = None
+
+    __slots__ = ('value', 'tangent')
+    __array_ufunc__ = None  # os arrays NumPy delegam nos operadores reflectidos
+
+    def __init__(self, value, tangent=None):
+        # Os arrays de dimensão 0 passam a float: a aritmética com eles é várias vezes mais lenta
+        self.value = tuple(x if isinstance(x, np.ndarray) and x.ndim else float(x) for x in value)
+        self.tangent = tangent
+
+    def __repr__(self):
+        shape = np.shape(self.value[0])
+        if shape:
+            return f"{type(self).__name__}(forma={shape})"
+        return f"{type(self).__name__}({self.algebra(*self.value)})"
+
+    @classmethod
+    def constant(cls, x):
+        """Elemento, número, vector ou array (N, 4) como número dual de derivadas nulas."""
+        if isinstance(x, cls):
+            return x
+        if isinstance(x, cls.algebra):
+            return cls((x.a, x.b, x.c, x.d))
+        if isinstance(x, numbers.Real):
+            return cls((float(x), 0.0, 0.0, 0.0))
+        if isinstance(x, cls.array_class):
+            x = x.to_numpy()
+        x = np.asarray(x, dtype=float)
+        if x.shape[-1:] != (4,):
+            raise ValueError(f"Esperado um array (..., 4) de componentes, recebido {x.shape}")
+        return cls(np.moveaxis(x, -1, 0))
+
+    def _operand(self, other):
+        """Operando como número dual do mesmo tipo, ou None se não suportado."""
+        if isinstance(other, type(self)):
+            return other
+        if isinstance(other, (self.algebra, numbers.Real)):
+            return type(self).constant(other)
+        return None
+
+    def _real_result(self, value, gradient):
+        """Resultado real (norma, argumento, ...) como elemento com parte vectorial nula."""
+        return type(self)((value, 0.0, 0.0, 0.0), _gradient_tangent(gradient, self.tangent))
+
+    def _left_matrix(self, x):
+        """Matriz de y -> x·y."""
+        columns = [self._product(x, unit) for unit in _UNITS]
+        return list(zip(*columns))
+
+    def _right_matrix(self, y):
+        """Matriz de x -> x·y."""
+        columns = [self._product(unit, y) for unit in _UNITS]
+        return list(zip(*columns))
+
+    # Operações aritméticas
+
+    def __add__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return type(self)((p + q for p, q in zip(self.value, other.value)), _sum(self.tangent, other.tangent))
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self + (-other)
+
+    def __rsub__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return other + (-self)
+
+    def __neg__(self):
+        return type(self)((-p for p in self.value), None if self.tangent is None else -self.tangent)
+
+    def _multiply(self, x, y):
+        # d(xy) = dx·y + x·dy
+        tangent = _sum(_transform(self._right_matrix(y.value), x.tangent) if x.tangent is not None else None,
+                       _transform(self._left_matrix(x.value), y.tangent) if y.tangent is not None else None)
+        return type(self)(self._product(x.value, y.value), tangent)
+
+    def __mul__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self._multiply(self, other)
+
+    def __rmul__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self._multiply(other, self)
+
+    def __truediv__(self, other):
+        """Divisão à direita: self * other⁻¹."""
+        if isinstance(other, numbers.Real):
+            return self * (1.0 / other)
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return self * other.inverse()
+
+    def __rtruediv__(self, other):
+        other = self._operand(other)
+        if other is None:
+            return NotImplemented
+        return other * self.inverse()
+
+    def left_division(self, other):
+        """Divisão à esquerda: other⁻¹ * self."""
+        if isinstance(other, numbers.Real):
+            return (1.0 / other) * self
+        return type(self).constant(other).inverse() * self
+
+    def _exp_of_scaled_ln(self, exponent):
+        """exp(exponent·ln(self)), com exponent real (à direita) ou elemento (à esquerda), como nas classes."""
+        if isinstance(exponent, numbers.Real):
+            return (self.ln() * exponent).exp()
+        return (exponent * self.ln()).exp()
+
+    def ten_power(self):
+        """10^q = exp(q·ln 10)."""
+        return (self * math.log(10)).exp()
+
+    # Partes, conjugado, normas e inverso
+
+    def conjugate(self):
+        a, b, c, d = self.value
+        tangent = self.tangent
+        if tangent is not None:
+            tangent = tangent.copy()
+            tangent[1:] *= -1
+        return type(self)((a, -b, -c, -d), tangent)
+
+    def real(self):
+        tangent = self.tangent
+        if tangent is not None:
+            tangent = tangent.copy()
+            tangent[1:] = 0.0
+        return type(self)((self.value[0], 0.0, 0.0, 0.0), tangent)
+
+    def vectorial(self):
+        tangent = self.tangent
+        if tangent is not None:
+            tangent = tangent.copy()
+            tangent[0] = 0.0
+        return type(self)((0.0,) + self.value[1:], tangent)
+
+    def _norm_squared(self):
+        return sum(sign * x * x for sign, x in zip(self._metric, self.value))
+
+    def inverse(self):
+        """Inverso conj(q)/|q|², com derivada -q⁻¹·dq·q⁻¹."""
+        a, b, c, d = self.value
+        norm_squared = self._norm_squared()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = (a / norm_squared, -b / norm_squared, -c / norm_squared, -d / norm_squared)
+        tangent = _transform(self._left_matrix(value), _transform(self._right_matrix(value), self.tangent))
+        return type(self)(value, None if tangent is None else -tangent)
+
+    def norm(self):
+        """Norma (de Minkowski, em valor absoluto, nos coquaterniões), como elemento real."""
+        norm_squared = self._norm_squared()
+        norm = np.sqrt(np.abs(norm_squared))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = np.sign(norm_squared) / norm
+            gradient = [sign * x * factor for sign, x in zip(self._metric, self.value)]
+        return self._real_result(norm, gradient)
+
+    def _divide_by(self, norm):
+        """self / norm, com norm um resultado real (como em normalize)."""
+        scale = norm.value[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = tuple(x / scale for x in self.value)
+            tangent = self.tangent
+            if norm.tangent is not None:
+                # d(x/s) = (dx - (x/s)·ds)/s
+                correction = np.stack([-x * norm.tangent[0] for x in value])
+                tangent = _sum(tangent, correction)
+            if tangent is not None:
+                tangent = tangent / scale
+        return type(self)(value, tangent)
+
+    def vec_norm(self):
+        """Norma da parte vectorial (de Minkowski, em valor absoluto, nos coquaterniões)."""
+        return self.vectorial().norm()
+
+    # Funções
+
+    def exp(self):
+        return self._function('exp')
+
+    def ln(self):
+        return self._function('ln')
+
+    def sin(self):
+        return self._function('sin')
+
+    def cos(self):
+        return self._function('cos')
+
+    def sinh(self):
+        return self._function('sinh')
+
+    def cosh(self):
+        return self._function('cosh')
+
+    def _function(self, name):
+        with np.errstate(all='ignore'):
+            value, matrix = self._apply(self.value, name)
+            return type(self)(value, _transform(matrix, self.tangent))
+
+
+class DualQuaternion(_Dual):
+    """
+    Quaternião dual: valor e derivadas, com as operações de Quaternion.
+
+    Args:
+        value (sequence): Componentes a, b, c, d (números ou arrays)
+        tangent (np.ndarray, optional): Derivadas (4, P, ...)
+    """
+
+    algebra = Quaternion
+    array_class = QuaternionArray
+    _metric = (1, 1, 1, 1)
+    _product = staticmethod(_quaternion_product)
+    _apply = staticmethod(_quaternion_function)
+
+    __slots__ = ()
+
+    def __pow__(self, exponent):
+        """Potência, pelos mesmos passos de Quaternion.__pow__."""
+        one = type(self)((1.0, 0.0, 0.0, 0.0))
+        if isinstance(exponent, int):
+            if exponent == 2:
+                return self * self
+            if exponent == 0:
+                return one
+            if exponent == 1:
+                return self
+            if exponent < 0:
+                inverse = self.inverse()
+                if exponent == -1:
+                    return inverse
+                result = one
+                for _ in range(-exponent):
+                    result = result * inverse
+                return result
+            result, power, n = one, self, exponent
+            while n > 0:
+                if n % 2 == 1:
+                    result = result * power
+                power = power * power
+                n //= 2
+            return result
+        if isinstance(exponent, (float, Quaternion, DualQuaternion)):
+            return self._exp_of_scaled_ln(exponent)
+        raise TypeError("Expoente para potenciação de quaternião deve ser inteiro, float ou quaternião.")
+
+    def tan(self):
+        return self._function('tan')
+
+    def tanh(self):
+        return self._function('tanh')
+
+    def asin(self):
+        return self._function('asin')
+
+    def acos(self):
+        return self._function('acos')
+
+    def atan(self):
+        return self._function('atan')
+
+    def asinh(self):
+        return self._function('asinh')
+
+    def acosh(self):
+        return self._function('acosh')
+
+    def atanh(self):
+        return self._function('atanh')
+
+    def sqrt(self):
+        return self._function('sqrt')
+
+    def normalize(self):
+        """Quaternião dividido pela norma."""
+        return self._divide_by(self.norm())
+
+    def sign(self):
+        """Parte vectorial normalizada (Quaternion.vec_normalize)."""
+        return self.vectorial()._divide_by(self.vec_norm())
+
+    def arg(self):
+        """Argumento arccos(a/|q|), como elemento real (0 no quaternião nulo)."""
+        norm = np.sqrt(self._norm_squared())
+        null = norm < _EPSILON
+        safe = _where(null, 1.0, norm)
+        cosine = np.clip(self.value[0] / safe, -1.0, 1.0)
+        value = _where(null, 0.0, np.arccos(cosine))
+        # d(a/|q|) = (da - cos·d|q|)/|q| e d(arccos) = -d(cos)/sin
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = _where(null, 0.0, -1 / (safe * np.sqrt(1 - cosine * cosine)))
+            gradient = [factor * ((j == 0) - cosine * x / safe) for j, x in enumerate(self.value)]
+        return self._real_result(value, gradient)
+
+
+class DualCoquaternion(_Dual):
+    """
+    Coquaternião dual: valor e derivadas, com as operações de Coquaternion.
+
+    Args:
+        value (sequence): Componentes a, b, c, d (números ou arrays)
+        tangent (np.ndarray, optional): Derivadas (4, P, ...)
+    """
+
+    algebra = Coquaternion
+    array_class = CoquaternionArray
+    _metric = (1, 1, -1, -1)
+    _product = staticmethod(_coquaternion_product)
+    _apply = staticmethod(_coquaternion_function)
+
+    __slots__ = ()
+
+    def __pow__(self, exponent):
+        """Potência, pelos mesmos passos de Coquaternion.__pow__."""
+        if isinstance(exponent, int):
+            if exponent == 0:
+                return type(self)((1.0, 0.0, 0.0, 0.0))
+            if exponent == 1:
+                return self
+            if exponent == 2:
+                return self * self
+            if exponent == -1:
+                return self.inverse()
+        return self._exp_of_scaled_ln(exponent)
+
+    def tan(self):
+        return self.sin() / self.cos()
+
+    def tanh(self):
+        return self.sinh() / self.cosh()
+
+    def sqrt(self):
+        return self ** 0.5
+
+    def sign(self):
+        """ωq = v/ω, ou v se ω for nulo (Coquaternion._get_omega_q)."""
+        vec_norm = self.vec_norm()
+        null = vec_norm.value[0] < _EPSILON
+        if not np.any(null):
+            return self.vectorial()._divide_by(vec_norm)
+        tangent = vec_norm.tangent
+        if tangent is not None:
+            tangent = np.where(null, 0.0, tangent)
+        scale = type(self)((_where(null, 1.0, vec_norm.value[0]), 0.0, 0.0, 0.0), tangent)
+        return self.vectorial()._divide_by(scale)
+
+    def atan(self):
+        """arctan(q) = -ωq·ln((1 + ωq·q)/(1 - ωq·q))."""
+        omega = self.sign()
+        product = omega * self
+        return omega * (-1) * ((1 + product) / (1 - product)).ln()
+
+    def norm_minkowski(self):
+        """Norma de Minkowski √(a² + b² - c² - d²) (nan se o quadrado for negativo)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            norm = np.sqrt(self._norm_squared())
+            gradient = [sign * x / norm for sign, x in zip(self._metric, self.value)]
+        return self._real_result(norm, gradient)
+
+    def normalize_minkowski(self):
+        """Coquaternião dividido pela norma de Minkowski."""
+        return self._divide_by(self.norm_minkowski())
+
+
+_DUAL_CLASSES = {Quaternion: DualQuaternion, Coquaternion: DualCoquaternion}
+
+# Funções das expressões da calculadora, com os números duais
+_DUAL_FUNCTIONS = {
+    'conjugate': lambda x: x.conjugate(),
+    'real': lambda x: x.real(),
+    'vectorial': lambda x: x.vectorial(),
+    'inverse': lambda x: x.inverse(),
+    'norm': lambda x: x.norm(),
+    'normalize': lambda x: x.normalize() if isinstance(x, DualQuaternion) else x.normalize_minkowski(),
+    'norm_mink': lambda x: x.norm_minkowski(),
+    'normalize_mink': lambda x: x.normalize_minkowski(),
+    'arg': lambda x: x.arg(),
+    'absIJK': lambda x: x.vec_norm(),
+    'sign': lambda x: x.sign(),
+    'pow10': lambda x: x.ten_power(),
+    'log': lambda x: x.ln(),
+    'neg': operator.neg,
+    'divR': operator.truediv,
+    'divL': lambda q, p: (q if isinstance(q, _Dual) else type(p).constant(q)).left_division(p),
+    'pow': operator.pow,
+    # Conversão no elemento da álgebra (expr_compiler.COERCION): os números duais já o são
+    '_element': lambda x: x,
+}
+_DUAL_FUNCTIONS.update({name: operator.methodcaller(name) for name in _FUNCTIONS})
+
+# Ambientes das expressões com as funções de _dual_function, por classe
+_DUAL_ENVIRONMENTS = {}
+
+
+def _dual_function(name, scalar_function):
+    """Função do ambiente que, com números duais, usa a operação correspondente."""
+    dual_function = _DUAL_FUNCTIONS.get(name)
+
+    def function(*args):
+        if not any(isinstance(arg, _Dual) for arg in args):
+            return scalar_function(*args)
+        if dual_function is None:
+            raise ValueError(f"A função {name} não está disponível na diferenciação automática")
+        return dual_function(*args)
+    return function
+
+
+def _seed(cls, arguments, wrt):
+    """Números duais dos argumentos, com uma derivada unitária por parâmetro diferenciado."""
+    duals = [cls.constant(x) for x in arguments]
+    shapes = [np.shape(dual.value[0]) for dual in duals]
+    data_shape = np.broadcast_shapes(*shapes) if shapes else ()
+    sizes = [(1 if isinstance(x, numbers.Real) else 4) if index in wrt else 0
+             for index, x in enumerate(arguments)]
+    count = sum(sizes)
+
+    first = 0
+    for index, (dual, shape, size) in enumerate(zip(duals, shapes, sizes)):
+        if not size:
+            continue
+        # Eixos de tamanho 1 para os dados, se este argumento não for um vector
+        tangent = np.zeros((4, count) + (1,) * (len(data_shape) - len(shape)) + shape)
+        for component in range(size):
+            tangent[component, first + component] = 1.0
+        duals[index] = cls(dual.value, tangent)
+        first += size
+    return duals, count, data_shape
+
+
+def _unpack(cls, result, count, data_shape):
+    """Valor (elemento ou vector) e jacobiano (..., 4, P) do resultado de uma avaliação."""
+    result = cls.constant(result)
+    if result.tangent is not None:
+        tangent = result.tangent
+    else:
+        # Resultado constante: eixos de tamanho 1 para os dados, como em _seed
+        tangent = np.zeros((4, count) + (1,) * len(data_shape))
+    if not data_shape and tangent.ndim == 2 and not any(np.shape(x) for x in result.value):
+        return cls.algebra(*result.value), tangent.copy()
+    shape = np.broadcast_shapes(data_shape, *(np.shape(x) for x in result.value))
+    value = np.stack([np.broadcast_to(x, shape) for x in result.value], axis=-1)
+    jacobian = np.moveaxis(np.broadcast_to(tangent, (4, count) + shape), (0, 1), (-2, -1))
+    if shape:
+        return cls.array_class(value), np.ascontiguousarray(jacobian)
+    return cls.algebra(*value), np.array(jacobian)
+
+
+def jacobian(function, *arguments, wrt=None, algebra=Quaternion):
+    """
+    Valor e jacobiano de uma função, numa única avaliação com números duais.
+
+    Args:
+        function (callable): Função dos argumentos, escrita com as operações
+            e os métodos das classes (recebe DualQuaternion ou DualCoquaternion)
+        *arguments: Elementos da álgebra, números reais, vectores de
+            hyperarray ou arrays (N, 4)
+        wrt (iterable, optional): Índices dos argumentos em ordem aos quais se
+            deriva (por omissão, todos)
+        algebra (type): Quaternion ou Coquaternion
+
+    Returns:
+        tuple: (valor, jacobiano). O valor é um elemento, ou um vector se algum
+            argumento o for. O jacobiano é um array (4, P), ou (N, 4, P) nos
+            vectores, com a derivada de cada componente (a, b, c, d) do
+            resultado em ordem a cada parâmetro: as componentes dos argumentos
+            diferenciados (quatro por elemento ou vector, uma por número), pela
+            ordem dos argumentos. Nos vectores, é o jacobiano de cada elemento
+            em ordem aos seus próprios parâmetros
+    """
+    cls = _DUAL_CLASSES[algebra]
+    wrt = set(range(len(arguments)) if wrt is None else wrt)
+    duals, count, data_shape = _seed(cls, arguments, wrt)
+    return _unpack(cls, function(*duals), count, data_shape)
+
+
+def expression_jacobian(expression, values, class_name='Quaternion', wrt=None):
+    """
+    Valor e jacobiano de uma expressão da calculadora com variáveis.
+
+    Args:
+        expression (str): Expressão, como na calculadora (p.ex. 'exp(q*p) / q')
+        values (dict): Valores das variáveis, como os argumentos de jacobian
+        class_name (str): 'Quaternion' ou 'Coquaternion'
+        wrt (iterable, optional): Nomes das variáveis em ordem às quais se
+            deriva (por omissão, todas, pela ordem de values)
+
+    Returns:
+        tuple: (valor, jacobiano), como em jacobian
+
+    Raises:
+        ValueError: Se a expressão não for válida ou usar uma função sem derivada
+    """
+    try:
+        compiled = compile_hypercomplex_expr(expression, class_name, tuple(values))
+    except SyntaxError as e:
+        raise ValueError(f"Erro de sintaxe na expressão '{expression}': {e.msg}")
+    names = list(values)
+    unknown = set(wrt or ()) - set(names)
+    if unknown:
+        raise ValueError(f"Variáveis sem valor: {', '.join(sorted(unknown))}")
+    environment = _DUAL_ENVIRONMENTS.get(class_name)
+    if environment is None:
+        environment = _DUAL_ENVIRONMENTS[class_name] = {
+            name: _dual_function(name, value) if callable(value) and not isinstance(value, type) else value
+            for name, value in compiled.env.items()
+        }
+    # As constantes são só valores; a conversão de conjugate(conjugate(x)) é a
+    # função _element do ambiente, coberta por _dual_function
+    scope = dict(environment, **compiled.constants)
+
+    def function(*duals):
+        scope.update(zip(names, duals))
+        return eval(compiled.code, {"__builtins__": {}}, scope)
+
+    indices = None if wrt is None else [names.index(name) for name in wrt]
+    algebra = Quaternion if class_name == 'Quaternion' else Coquaternion
+    return jacobian(function, *(values[name] for name in names), wrt=indices, algebra=algebra)
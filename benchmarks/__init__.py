@@ -0,0 +1,7 @@
+"""
+Benchmarks de desempenho da calculadora.
+
+Executar a partir da raiz do projecto, por exemplo:
+    python -m benchmarks.bench_hypercomplex --output resultados.json
+    python -m benchmarks.bench_hypercomplex --baseline resultados.json --tolerance 0.15
+"""
@@ -0,0 +1,78 @@
+"""
+Benchmark da diferenciação automática com números duais (autodiff.py).
+
+Compara o valor e o jacobiano de uma expressão (em ordem às componentes de
+dois quaterniões, 8 parâmetros) numa única avaliação com números duais e
+por diferenças centrais (17 avaliações com a classe Quaternion), num
+elemento e num vector.
+
+Uso:
+    python -m benchmarks.bench_autodiff
+    python -m benchmarks.bench_autodiff --size 1000000 -o autodiff.json
+"""
+import sys
+
+import numpy as np
+
+import autodiff
+from hypercomplex import Quaternion, compile_hypercomplex_expr
+from hyperarray import QuaternionArray
+from benchmarks import common
+
+EXPRESSION = 'exp(q*p) / q + sin(p)*ln(q)'
+
+# Passo das diferenças finitas
+STEP = 1e-6
+
+# Elementos das diferenças finitas objecto a objecto
+LOOP_SIZE = 2_000
+
+
+def finite_differences(compiled, q, p):
+    """Valor e jacobiano (4, 8) por diferenças centrais, com a classe Quaternion."""
+    value = compiled.evaluate({'q': q, 'p': p})
+    columns = []
+    for name in ('q', 'p'):
+        for component in range(4):
+            shifted = []
+            for step in (STEP, -STEP):
+                values = {'q': q, 'p': p}
+                parts = [values[name].a, values[name].b, values[name].c, values[name].d]
+                parts[component] += step
+                values[name] = Quaternion(*parts)
+                result = compiled.evaluate(values)
+                shifted.append((result.a, result.b, result.c, result.d))
+            columns.append([(plus - minus) / (2 * STEP) for plus, minus in zip(*shifted)])
+    return value, np.array(columns).T
+
+
+def autodiff_benchmarks(size, seed=0):
+    """Benchmarks de um elemento e de vectores (size e LOOP_SIZE elementos)."""
+    rng = np.random.default_rng(seed)
+    compiled = compile_hypercomplex_expr(EXPRESSION, 'Quaternion', ('q', 'p'))
+    q, p = Quaternion(*rng.normal(size=4)), Quaternion(*rng.normal(size=4))
+    data = rng.normal(size=(size, 4))
+    vector = QuaternionArray(data)
+    loop = [Quaternion(*row) for row in data[:LOOP_SIZE]]
+    return {
+        "autodiff.dual[1]": lambda: autodiff.expression_jacobian(EXPRESSION, {'q': q, 'p': p}),
+        "autodiff.finite[1]": lambda: finite_differences(compiled, q, p),
+        f"autodiff.dual[{size}]": lambda: autodiff.expression_jacobian(EXPRESSION, {'q': vector, 'p': p}),
+        f"autodiff.finite[{LOOP_SIZE}]": lambda: [finite_differences(compiled, x, p) for x in loop],
+    }
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100_000, help="elementos do vector")
+    args = parser.parse_args(argv)
+
+    results = common.run_suite(autodiff_benchmarks(args.size), args.repeat, args.min_time, args.filter)
+    for name, result in results.items():
+        print(f"{name:<40} {common.format_ns(result['median_ns']):>10}")
+    meta = common.metadata(suite='autodiff', size=args.size, source=common.source_fingerprint('autodiff.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Benchmark do código gerado (codegen) face ao caminho eval.
+
+Cada expressão é compilada uma vez com variáveis e avaliada repetidamente,
+primeiro pela função gerada sobre as componentes e depois pelo eval da
+árvore optimizada (a mesma expressão compilada, sem a função gerada).
+No fim, indica o ganho por avaliação de cada expressão.
+
+Uso:
+    python -m benchmarks.bench_codegen
+    python -m benchmarks.bench_codegen --output codegen.json -k Quaternion
+"""
+import sys
+
+import expr_compiler
+from hypercomplex import Quaternion, Coquaternion, compile_hypercomplex_expr
+from benchmarks import common
+from benchmarks.corpus import SAMPLE_COMPONENTS
+
+# Expressões com as variáveis q e p, da aritmética pura às funções transcendentes
+CODEGEN_EXPRESSIONS = [
+    "q*p - p*q",
+    "q*p + conjugate(q)*2 - p/q",
+    "(q*2+1)*(q*2+1) - (q*2+1)",
+    "divL(q, p) + divR(p, q)*3i",
+    "q*(1+2i+3j+4k)/(2-j) + neg(p)",
+    "exp(q)*p + sin(q)*sin(q)",
+]
+
+
+def codegen_benchmarks(cls):
+    """Pares de benchmarks (código gerado, eval) para uma classe."""
+    name = cls.__name__
+    values = {'q': cls(*(x / 4 for x in SAMPLE_COMPONENTS[2])), 'p': cls(*SAMPLE_COMPONENTS[1])}
+    benchmarks = {}
+    for expression in CODEGEN_EXPRESSIONS:
+        compiled = compile_hypercomplex_expr(expression, name, variables=('q', 'p'))
+        if compiled.kernel is None:
+            continue
+        plain = expr_compiler.CompiledExpression(compiled.source, compiled.code, compiled.env, compiled.constants)
+        benchmarks[f"{name}.codegen[{expression}]"] = lambda compiled=compiled: compiled.evaluate(values)
+        benchmarks[f"{name}.eval[{expression}]"] = lambda plain=plain: plain.evaluate(values)
+    return benchmarks
+
+
+def print_speedups(results, stream=sys.stdout):
+    """Escreve o ganho do código gerado sobre o eval, por expressão."""
+    print(f"{'expressão':<48} {'eval':>12} {'codegen':>12} {'ganho':>7}", file=stream)
+    for name, result in results.items():
+        if '.codegen[' not in name:
+            continue
+        baseline = results.get(name.replace('.codegen[', '.eval[', 1))
+        if baseline is None:
+            continue
+        before, after = baseline['median_ns'], result['median_ns']
+        print(f"{name.replace('.codegen', ''):<48} {common.format_ns(before):>12} "
+              f"{common.format_ns(after):>12} {before / after:>6.1f}x", file=stream)
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    args = parser.parse_args(argv)
+
+    benchmarks = {}
+    benchmarks.update(codegen_benchmarks(Quaternion))
+    benchmarks.update(codegen_benchmarks(Coquaternion))
+    results = common.run_suite(benchmarks, args.repeat, args.min_time, args.filter)
+    print_speedups(results)
+    meta = common.metadata(suite='codegen', source=common.source_fingerprint('codegen.py', 'expr_compiler.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark da avaliação fundida por blocos de hyperarray.
+
+Cada cadeia de operações sobre vectores de quaterniões e coquaterniões é
+avaliada com o bloco por omissão (fundida) e com um único bloco do tamanho
+do vector, o que equivale a materializar um array (N, 4) por cada passo.
+Uma cadeia de rotações é ainda avaliada com vectores marcados como
+unitários (inverso = conjugado, sem normalizações) e sem a marca.
+Além dos tempos, indica o pico de memória de cada avaliação (tracemalloc).
+
+Uso:
+    python -m benchmarks.bench_hyperarray
+    python -m benchmarks.bench_hyperarray --size 2000000 --output arrays.json
+"""
+import sys
+import tracemalloc
+
+import numpy as np
+
+from hyperarray import DEFAULT_BLOCK_SIZE, QuaternionArray, CoquaternionArray
+from benchmarks import common
+
+# Cadeias de operações sobre três vectores a, b, c
+PIPELINES = {
+    '(a*b+c).normalize().exp()': lambda a, b, c: (a * b + c).normalize().exp(),
+    'a*b*c/a + conjugate(b)*2 - 1': lambda a, b, c: a * b * c / a + b.conjugate() * 2 - 1,
+    '(a*b).exp()*c/norm(a)': lambda a, b, c: (a * b).exp() * c / a.norm(),
+}
+
+
+def array_benchmarks(cls, size, seed=0):
+    """Pares de benchmarks (fundido, não fundido) para uma classe de vectores."""
+    rng = np.random.default_rng(seed)
+    a, b, c = (cls(rng.uniform(-1, 1, (size, 4))) for _ in range(3))
+    name = cls.__name__
+    benchmarks = {}
+    for label, pipeline in PIPELINES.items():
+        graph = pipeline(a, b, c)
+        benchmarks[f"{name}.fused[{label}]"] = lambda graph=graph: graph.compute(DEFAULT_BLOCK_SIZE)
+        benchmarks[f"{name}.unfused[{label}]"] = lambda graph=graph: graph.compute(size)
+    return benchmarks
+
+
+# Cadeia de rotações sobre vectores unitários
+UNIT_PIPELINE = ('(a*b/c).inverse().normalize()', lambda a, b, c: (a * b / c).inverse().normalize())
+
+
+def unit_benchmarks(size, seed=0):
+    """Cadeia de rotações com vectores marcados como unitários e sem a marca."""
+    rng = np.random.default_rng(seed)
+    data = [QuaternionArray(rng.uniform(-1, 1, (size, 4))).normalize().to_numpy() for _ in range(3)]
+    label, pipeline = UNIT_PIPELINE
+    unit = pipeline(*(QuaternionArray(x, unit=True) for x in data))
+    plain = pipeline(*(QuaternionArray(x) for x in data))
+    return {
+        f"QuaternionArray.rotations[unit,{label}]": unit.compute,
+        f"QuaternionArray.rotations[{label}]": plain.compute,
+    }
+
+
+def peak_memory(func):
+    """Pico de memória alocada (em bytes) durante uma chamada."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help="elementos de cada vector")
+    args = parser.parse_args(argv)
+
+    benchmarks = {}
+    benchmarks.update(array_benchmarks(QuaternionArray, args.size))
+    benchmarks.update(array_benchmarks(CoquaternionArray, args.size))
+    benchmarks.update(unit_benchmarks(args.size))
+    results = common.run_suite(benchmarks, args.repeat, args.min_time, args.filter)
+
+    print(f"{'benchmark':<64} {'tempo':>10} {'pico MiB':>9}")
+    for name, result in results.items():
+        result['peak_bytes'] = peak_memory(benchmarks[name])
+        print(f"{name:<64} {common.format_ns(result['median_ns']):>10} {result['peak_bytes'] / 2**20:>9.1f}")
+    meta = common.metadata(suite='hyperarray', size=args.size, source=common.source_fingerprint('hyperarray.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
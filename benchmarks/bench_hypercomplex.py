@@ -0,0 +1,139 @@
+"""
+Micro-benchmarks das primitivas de hypercomplex.py.
+
+Cobre a construção de Quaternion/Coquaternion, multiplicação, divisão,
+inverso, exp, ln, potências, from_string e as funções parse_*_expr sobre
+o corpus de expressões realistas, e compara as operações de UnitQuaternion
+com as de Quaternion sobre o mesmo quaternião unitário.
+
+Uso:
+    python -m benchmarks.bench_hypercomplex --output base.json
+    python -m benchmarks.bench_hypercomplex --baseline base.json --tolerance 0.15
+    python -m benchmarks.bench_hypercomplex --slowlog slow.jsonl -k parse
+"""
+import sys
+
+from hypercomplex import (Quaternion, UnitQuaternion, Coquaternion, clear_expression_caches,
+                          compile_hypercomplex_expr, parse_quaternion_expr, parse_coquaternion_expr)
+from benchmarks import common
+from benchmarks.corpus import (COQUATERNION_EXPRESSIONS, QUATERNION_EXPRESSIONS,
+                               SAMPLE_COMPONENTS, load_slowlog)
+
+FROM_STRING_INPUTS = ["1+2i+3j+4k", "-2.5i+0.5k", "3", "1/2+3/4j", "1e3+2i"]
+
+
+def _over_corpus(func, expressions, cold=False):
+    """
+    Função que avalia todas as expressões de um corpus (ignorando erros).
+
+    Com cold=True, as caches de reescrita e compilação são esvaziadas antes
+    de cada expressão, medindo o custo de uma expressão nunca vista.
+    """
+    def run():
+        for expression in expressions:
+            if cold:
+                clear_expression_caches()
+            try:
+                func(expression)
+            except ValueError:
+                pass
+    return run
+
+
+def primitive_benchmarks(cls):
+    """Benchmarks das operações de uma classe (Quaternion ou Coquaternion)."""
+    name = cls.__name__
+    p, q = cls(*SAMPLE_COMPONENTS[2]), cls(*SAMPLE_COMPONENTS[1])
+    small = cls(*(x / 4 for x in SAMPLE_COMPONENTS[2]))
+    components = SAMPLE_COMPONENTS[0]
+    return {
+        f"{name}.__init__": lambda: cls(*components),
+        f"{name}.__mul__": lambda: p * q,
+        f"{name}.__truediv__": lambda: p / q,
+        f"{name}.inverse": p.inverse,
+        f"{name}.exp": small.exp,
+        f"{name}.ln": p.ln,
+        f"{name}.__pow__(int)": lambda: p ** 5,
+        f"{name}.__pow__(float)": lambda: p ** 0.5,
+        f"{name}.from_string": lambda: [cls.from_string(s) for s in FROM_STRING_INPUTS],
+    }
+
+
+def unit_benchmarks():
+    """Operações de UnitQuaternion e as mesmas operações de Quaternion com valores unitários."""
+    p, q = UnitQuaternion(*SAMPLE_COMPONENTS[2]), UnitQuaternion(*SAMPLE_COMPONENTS[1])
+    plain_p, plain_q = Quaternion(p.a, p.b, p.c, p.d), Quaternion(q.a, q.b, q.c, q.d)
+    benchmarks = {}
+    for suffix, x, y in (('', p, q), ('[Quaternion]', plain_p, plain_q)):
+        benchmarks.update({
+            f"UnitQuaternion.inverse{suffix}": x.inverse,
+            f"UnitQuaternion.normalize{suffix}": x.normalize,
+            f"UnitQuaternion.__mul__{suffix}": lambda x=x, y=y: x * y,
+            f"UnitQuaternion.__truediv__{suffix}": lambda x=x, y=y: x / y,
+            f"UnitQuaternion.ln{suffix}": x.ln,
+            f"UnitQuaternion.__pow__(float){suffix}": lambda x=x: x ** 0.5,
+        })
+    return benchmarks
+
+
+# Expressões com uma variável q, compiladas uma vez e avaliadas repetidamente
+COMPILED_EXPRESSIONS = ["sin(q)*sin(q) + cos(q)*cos(q)", "exp(q+1) + exp(q+1)*exp(q+1)", "(q*2+1)^2 - (q*2+1)"]
+
+
+def compiled_benchmarks(cls):
+    """Avaliação de expressões compiladas com variáveis (o custo por avaliação)."""
+    name = cls.__name__
+    values = {'q': cls(*(x / 4 for x in SAMPLE_COMPONENTS[2]))}
+    benchmarks = {}
+    for expression in COMPILED_EXPRESSIONS:
+        compiled = compile_hypercomplex_expr(expression, name, variables=('q',))
+        benchmarks[f"{name}.compiled[{expression}]"] = lambda compiled=compiled: compiled.evaluate(values)
+    return benchmarks
+
+
+def build_benchmarks(slowlog_path=None):
+    """
+    Constrói o dicionário de benchmarks.
+
+    Args:
+        slowlog_path (str, optional): Registo de avaliações lentas cujas
+            expressões são acrescentadas como corpus adicional
+
+    Returns:
+        dict: Nome -> função sem argumentos
+    """
+    benchmarks = {}
+    benchmarks.update(primitive_benchmarks(Quaternion))
+    benchmarks.update(primitive_benchmarks(Coquaternion))
+    benchmarks.update(unit_benchmarks())
+    benchmarks.update(compiled_benchmarks(Quaternion))
+    benchmarks.update(compiled_benchmarks(Coquaternion))
+    benchmarks['parse_quaternion_expr[corpus]'] = _over_corpus(parse_quaternion_expr, QUATERNION_EXPRESSIONS)
+    benchmarks['parse_coquaternion_expr[corpus]'] = _over_corpus(parse_coquaternion_expr, COQUATERNION_EXPRESSIONS)
+    benchmarks['parse_quaternion_expr[corpus,cold]'] = _over_corpus(
+        parse_quaternion_expr, QUATERNION_EXPRESSIONS, cold=True)
+    benchmarks['parse_coquaternion_expr[corpus,cold]'] = _over_corpus(
+        parse_coquaternion_expr, COQUATERNION_EXPRESSIONS, cold=True)
+
+    if slowlog_path:
+        slow = load_slowlog(slowlog_path)
+        if slow.get('quaternion'):
+            benchmarks['parse_quaternion_expr[slowlog]'] = _over_corpus(parse_quaternion_expr, slow['quaternion'])
+        if slow.get('coquaternion'):
+            benchmarks['parse_coquaternion_expr[slowlog]'] = _over_corpus(parse_coquaternion_expr, slow['coquaternion'])
+    return benchmarks
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--slowlog', help="acrescentar as expressões de um registo de avaliações lentas")
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks(args.slowlog)
+    results = common.run_suite(benchmarks, args.repeat, args.min_time, args.filter)
+    meta = common.metadata(suite='hypercomplex', source=common.source_fingerprint('hypercomplex.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark dos conjuntos de Julia de quaterniões (julia.py).
+
+Mede a iteração vectorizada (hyperarray, com máscaras de fuga) de vários
+mapas num corte 2D, e a mesma iteração ponto a ponto com a classe
+Quaternion numa grelha pequena, para comparar o custo por ponto. É também um
+teste de esforço do produto de Hamilton vectorizado.
+
+Uso:
+    python -m benchmarks.bench_julia
+    python -m benchmarks.bench_julia --resolution 1000 --max-iter 128 -o julia.json
+"""
+import sys
+
+import julia
+from hypercomplex import Quaternion, compile_hypercomplex_expr
+from benchmarks import common
+
+# Mapas em q e c, do quadrático ao cúbico com termos extra
+JULIA_MAPS = [
+    "q*q + c",
+    "q*q*q + c",
+    "q*q + conjugate(q)*0.25 + c",
+]
+
+JULIA_C = Quaternion(-0.2, 0.6, 0.2, 0.0)
+BOUNDS = [(-1.5, 1.5), (-1.5, 1.5)]
+ORIGIN = (0.0, 0.0, 0.1, 0.0)
+
+# Lado da grelha da iteração ponto a ponto (só dá a referência por ponto)
+SCALAR_RESOLUTION = 40
+
+
+def scalar_escape_time(points, c, max_iter, expression):
+    """Tempos de fuga calculados ponto a ponto com a classe Quaternion."""
+    compiled = compile_hypercomplex_expr(expression, 'Quaternion', ('q', 'c'))
+    times = []
+    for point in points:
+        q, time = Quaternion(*point), max_iter
+        for iteration in range(1, max_iter + 1):
+            q = compiled.evaluate({'q': q, 'c': c})
+            if not q.a * q.a + q.b * q.b + q.c * q.c + q.d * q.d <= 4.0:
+                time = iteration
+                break
+        times.append(time)
+    return times
+
+
+def julia_benchmarks(resolution, max_iter):
+    """Benchmarks vectorizados (na resolução indicada) e ponto a ponto, por mapa."""
+    size = (resolution, resolution)
+    scalar_points, _ = julia.grid_points(BOUNDS, (SCALAR_RESOLUTION, SCALAR_RESOLUTION), origin=ORIGIN)
+    benchmarks = {}
+    for expression in JULIA_MAPS:
+        benchmarks[f"julia.array[{expression}]"] = lambda expression=expression: julia.julia_slice(
+            JULIA_C, BOUNDS, size, origin=ORIGIN, max_iter=max_iter, expression=expression)
+        benchmarks[f"julia.scalar[{expression}]"] = lambda expression=expression: scalar_escape_time(
+            scalar_points, JULIA_C, max_iter, expression)
+    return benchmarks
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--resolution', type=int, default=800, help="lado da grelha vectorizada, em pontos")
+    parser.add_argument('--max-iter', type=int, default=64, help="número máximo de iterações")
+    args = parser.parse_args(argv)
+
+    results = common.run_suite(julia_benchmarks(args.resolution, args.max_iter),
+                               args.repeat, args.min_time, args.filter)
+    print(f"{'benchmark':<48} {'tempo':>10} {'ns/ponto':>10}")
+    for name, result in results.items():
+        side = args.resolution if '.array[' in name else SCALAR_RESOLUTION
+        print(f"{name:<48} {common.format_ns(result['median_ns']):>10} {result['median_ns'] / side**2:>10.0f}")
+    meta = common.metadata(suite='julia', resolution=args.resolution, max_iter=args.max_iter,
+                           source=common.source_fingerprint('julia.py', 'hyperarray.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Benchmark das transformações de Lorentz com coquaterniões (lorentz.py).
+
+Compara a aplicação de uma transformação a N acontecimentos com a matriz 3x3
+(BLAS) e com a sanduíche q v q⁻¹ calculada objecto a objecto, e mede a
+aplicação de uma transformação diferente a cada acontecimento.
+
+Uso:
+    python -m benchmarks.bench_lorentz
+    python -m benchmarks.bench_lorentz --size 5000000 -o lorentz.json
+"""
+import sys
+
+import numpy as np
+
+import lorentz
+from hypercomplex import Coquaternion
+from benchmarks import common
+
+# Acontecimentos da sanduíche objecto a objecto
+LOOP_SIZE = 20_000
+
+
+def sandwich_loop(q, events):
+    """Transforma os acontecimentos um a um com a classe Coquaternion."""
+    inverse = q.inverse()
+    return [q * Coquaternion(0, t, x, y) * inverse for t, x, y in events]
+
+
+def lorentz_benchmarks(size, seed=0):
+    """Benchmarks da matriz (size acontecimentos), do ciclo (LOOP_SIZE) e de apply_each."""
+    rng = np.random.default_rng(seed)
+    events = rng.normal(size=(size, 3))
+    out = np.empty_like(events)
+    transform = lorentz.LorentzTransform.boost(0.8, 0.3) * lorentz.LorentzTransform.rotation(1.1)
+    coquaternions = rng.normal(size=(size, 4))
+    loop_events = events[:LOOP_SIZE].tolist()
+    return {
+        f"lorentz.matrix[{size}]": lambda: transform.apply(events, out=out),
+        f"lorentz.matrix[{LOOP_SIZE}]": lambda: transform.apply(events[:LOOP_SIZE]),
+        f"lorentz.loop[{LOOP_SIZE}]": lambda: sandwich_loop(transform.coquaternion, loop_events),
+        f"lorentz.apply_each[{size}]": lambda: lorentz.apply_each(coquaternions, events),
+    }
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help="acontecimentos por transformação")
+    args = parser.parse_args(argv)
+
+    results = common.run_suite(lorentz_benchmarks(args.size), args.repeat, args.min_time, args.filter)
+    for name, result in results.items():
+        print(f"{name:<40} {common.format_ns(result['median_ns']):>10}")
+    meta = common.metadata(suite='lorentz', size=args.size, source=common.source_fingerprint('lorentz.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Benchmark das imagens de coloração de domínio (/plot).
+
+Cada expressão é avaliada numa grelha de z, colorida e codificada em PNG; as
+três etapas são medidas em separado, para a resolução indicada.
+
+Uso:
+    python -m benchmarks.bench_plot
+    python -m benchmarks.bench_plot --resolution 2000 --output plot.json
+"""
+import sys
+
+import imaging
+from app import evaluate_complex_grid
+from benchmarks import common
+
+# Funções representativas: polinómio racional, singularidade essencial, ramos
+PLOT_EXPRESSIONS = [
+    "(z**2-1)*(z-2-1j)**2/(z**2+2+2j)",
+    "exp(1/z)",
+    "sin(z)*conj(z) + log(z)",
+    "sqrt(z**3 - 1)",
+]
+
+BOUNDS = (-3.0, 3.0, -3.0, 3.0)
+
+
+def plot_benchmarks(resolution):
+    """Benchmarks de avaliação, cor e codificação, por expressão."""
+    size = (resolution, resolution)
+    benchmarks = {}
+    for expression in PLOT_EXPRESSIONS:
+        values = evaluate_complex_grid(expression, BOUNDS, size)
+        colors = imaging.domain_coloring(values)
+        benchmarks[f"plot.eval[{expression}]"] = (
+            lambda expression=expression: evaluate_complex_grid(expression, BOUNDS, size))
+        benchmarks[f"plot.color[{expression}]"] = lambda values=values: imaging.domain_coloring(values)
+        benchmarks[f"plot.png[{expression}]"] = lambda colors=colors: imaging.encode_png(colors)
+    return benchmarks
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--resolution', type=int, default=1000, help="largura e altura da imagem, em pixels")
+    args = parser.parse_args(argv)
+
+    results = common.run_suite(plot_benchmarks(args.resolution), args.repeat, args.min_time, args.filter)
+    for name, result in results.items():
+        print(f"{name:<64} {common.format_ns(result['median_ns']):>10}")
+    meta = common.metadata(suite='plot', resolution=args.resolution,
+                           source=common.source_fingerprint('imaging.py', 'app.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark da transformada de Fourier de quaterniões (qfft.py).
+
+Compara a QFFT de um sinal (duas FFT complexas do numpy.fft) com a
+transformada directa O(N²) calculada objecto a objecto com a classe
+Quaternion, e mede a QFFT 2D de uma imagem a cores e a sua inversa.
+
+Uso:
+    python -m benchmarks.bench_qfft
+    python -m benchmarks.bench_qfft --resolution 2048 -o qfft.json
+"""
+import math
+import sys
+
+import numpy as np
+
+import qfft
+from hypercomplex import Quaternion
+from benchmarks import common
+
+# Amostras do sinal da transformada directa
+DIRECT_SIZE = 256
+
+
+def direct_transform(signal, mu=qfft.GRAY_AXIS):
+    """Transformada à esquerda pela definição, com a classe Quaternion."""
+    count = len(signal)
+    samples = [Quaternion(*row) for row in signal]
+    spectrum = []
+    for u in range(count):
+        total = Quaternion(0, 0, 0, 0)
+        for x, sample in enumerate(samples):
+            angle = -2 * math.pi * u * x / count
+            sine = math.sin(angle)
+            total = total + Quaternion(math.cos(angle), sine * mu[0], sine * mu[1], sine * mu[2]) * sample
+        spectrum.append(total)
+    return spectrum
+
+
+def qfft_benchmarks(resolution, seed=0):
+    """Benchmarks do sinal (DIRECT_SIZE amostras) e da imagem resolution x resolution."""
+    rng = np.random.default_rng(seed)
+    signal = rng.normal(size=(DIRECT_SIZE, 4))
+    image = qfft.from_rgb(rng.random((resolution, resolution, 3)))
+    spectrum = qfft.qfft2(image)
+    return {
+        f"qfft.signal[{DIRECT_SIZE}]": lambda: qfft.qfft(signal),
+        f"qfft.direct[{DIRECT_SIZE}]": lambda: direct_transform(signal),
+        f"qfft.image[{resolution}x{resolution}]": lambda: qfft.qfft2(image),
+        f"qfft.image_right[{resolution}x{resolution}]": lambda: qfft.qfft2(image, side='right'),
+        f"qfft.inverse[{resolution}x{resolution}]": lambda: qfft.iqfft2(spectrum),
+    }
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--resolution', type=int, default=1024, help="lado da imagem, em pixels")
+    args = parser.parse_args(argv)
+
+    results = common.run_suite(qfft_benchmarks(args.resolution), args.repeat, args.min_time, args.filter)
+    for name, result in results.items():
+        print(f"{name:<40} {common.format_ns(result['median_ns']):>10}")
+    meta = common.metadata(suite='qfft', resolution=args.resolution, source=common.source_fingerprint('qfft.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark das estatísticas de rotações (rotations.py).
+
+Mede a média, a dispersão e a matriz de distâncias vectorizadas por blocos e,
+para comparação, a média e a dispersão calculadas com um ciclo sobre objectos
+Quaternion (normalize, conjugate e arg), numa amostra mais pequena. Mede
+também as consultas ao RotationIndex face à procura exaustiva.
+
+Uso:
+    python -m benchmarks.bench_rotations
+    python -m benchmarks.bench_rotations --size 5000000 -o rotacoes.json
+"""
+import math
+import sys
+
+import numpy as np
+
+import rotations
+from hypercomplex import Quaternion
+from benchmarks import common
+
+# Amostras do ciclo sobre objectos e lado da matriz de distâncias
+LOOP_SIZE = 20_000
+MATRIX_SIZE = 2_000
+
+# Consultas por repetição nos benchmarks do índice
+QUERIES = 100
+
+
+def loop_statistics(quaternions):
+    """Média de Markley e ângulo médio em torno dela, com um ciclo sobre objectos."""
+    scatter = np.zeros((4, 4))
+    for q in quaternions:
+        q = q.normalize()
+        row = (q.a, q.b, q.c, q.d)
+        scatter += np.outer(row, row)
+    mean = Quaternion(*np.linalg.eigh(scatter)[1][:, -1])
+    total = 0.0
+    for q in quaternions:
+        angle = (mean.conjugate() * q.normalize()).arg()
+        total += 2 * min(angle, math.pi - angle)
+    return mean, total / len(quaternions)
+
+
+def rotation_benchmarks(size, seed=0):
+    """Benchmarks vectorizados (size amostras) e do ciclo sobre objectos (LOOP_SIZE)."""
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(size=(size, 4))
+    objects = [Quaternion(*row) for row in samples[:LOOP_SIZE]]
+    matrix_samples = samples[:MATRIX_SIZE]
+    return {
+        f"rotations.mean[{size}]": lambda: rotations.mean_rotation(samples),
+        f"rotations.dispersion[{size}]": lambda: rotations.dispersion(samples),
+        f"rotations.distance_matrix[{MATRIX_SIZE}x{MATRIX_SIZE}]": lambda: rotations.distance_matrix(matrix_samples),
+        f"rotations.vector[{LOOP_SIZE}]": lambda: rotations.dispersion(samples[:LOOP_SIZE]),
+        f"rotations.loop[{LOOP_SIZE}]": lambda: loop_statistics(objects),
+    }
+
+
+def index_benchmarks(size, seed=0):
+    """Consultas ao RotationIndex (k=1 e k=10) e procura exaustiva equivalente."""
+    rng = np.random.default_rng(seed)
+    index = rotations.RotationIndex(rng.normal(size=(size, 4)))
+    references = index.references
+    queries = rng.normal(size=(QUERIES, 4))
+    return {
+        f"rotations.index_query[{QUERIES}x{size},k=1]": lambda: index.query(queries, k=1),
+        f"rotations.index_query[{QUERIES}x{size},k=10]": lambda: index.query(queries, k=10),
+        f"rotations.brute_query[{QUERIES}x{size},k=1]": lambda: [
+            rotations.angular_distances(references, Quaternion(*query)).argmin() for query in queries],
+    }
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help="amostras das estatísticas vectorizadas")
+    args = parser.parse_args(argv)
+
+    benchmarks = rotation_benchmarks(args.size)
+    benchmarks.update(index_benchmarks(args.size))
+    results = common.run_suite(benchmarks, args.repeat, args.min_time, args.filter)
+    for name, result in results.items():
+        print(f"{name:<56} {common.format_ns(result['median_ns']):>10}")
+    meta = common.metadata(suite='rotations', size=args.size, source=common.source_fingerprint('rotations.py'))
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
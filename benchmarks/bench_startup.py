@@ -0,0 +1,120 @@
+"""
+Benchmark do arranque a frio: tempo até à primeira resposta.
+
+Cada amostra lança um interpretador novo. No modo por omissão, o processo
+filho importa a aplicação e serve, pelo cliente de testes do Flask, o
+primeiro GET e o primeiro POST de cada calculadora; mede-se o tempo total
+desde o lançamento e as etapas internas (importação, primeira página,
+primeira avaliação). Com --server-cmd, lança-se um servidor real e mede-se
+o tempo até este responder ao primeiro pedido HTTP.
+
+Uso:
+    python -m benchmarks.bench_startup --repeat 10 --output arranque.json
+    python -m benchmarks.bench_startup --server-cmd "python -m flask --app app run --port {port}"
+"""
+import json
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks import common
+
+# Código executado no processo filho; escreve os tempos das etapas em JSON
+CHILD_SCRIPT = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import app
+t1 = time.perf_counter()
+client = app.test_client()
+client.get('/')
+t2 = time.perf_counter()
+stages = {'import_app': t1 - t0, 'first_get': t2 - t1}
+for path, expression in (('/', '1+2i'), ('/quaternions', '1+2i+3j'), ('/coquaternions', '1+2i+3j')):
+    start = time.perf_counter()
+    client.post(path, data={'expression': expression})
+    stages['first_post ' + path] = time.perf_counter() - start
+stages['numpy_loaded'] = 'numpy' in sys.modules
+print(json.dumps(stages))
+"""
+
+
+def _in_process_sample():
+    """Lança um processo filho e devolve (tempo total, etapas internas)."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=common.ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    total = time.perf_counter() - start
+    return total, json.loads(output.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _server_sample(command, timeout=60.0):
+    """
+    Lança um servidor e mede o tempo até à primeira resposta HTTP bem-sucedida.
+
+    Args:
+        command (str): Comando do servidor, com {port} no lugar da porta
+        timeout (float): Tempo máximo de espera, em segundos
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    process = subprocess.Popen(shlex.split(command.format(port=port)), cwd=common.ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+            if process.poll() is not None:
+                raise RuntimeError(f"O servidor terminou com código {process.returncode}")
+        raise TimeoutError("O servidor não respondeu dentro do tempo limite")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = common.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--server-cmd', help="comando de um servidor real, com {port} no lugar da porta")
+    parser.set_defaults(repeat=10)
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.server_cmd:
+        samples = [_server_sample(args.server_cmd) * 1e9 for _ in range(args.repeat)]
+        results['server_time_to_first_response'] = common.summarize_samples(samples)
+    else:
+        totals, stages = [], {}
+        for _ in range(args.repeat):
+            total, child = _in_process_sample()
+            totals.append(total * 1e9)
+            for name, value in child.items():
+                if not isinstance(value, bool):
+                    stages.setdefault(name, []).append(value * 1e9)
+        results['time_to_first_response'] = common.summarize_samples(totals)
+        for name, samples in stages.items():
+            results[f"stage {name}"] = common.summarize_samples(samples)
+
+    for name, result in results.items():
+        if not args.filter or re.search(args.filter, name):
+            print(f"{name:<48} {common.format_ns(result['median_ns']):>12}", file=sys.stderr)
+    meta = common.metadata(suite='startup', source=common.source_fingerprint('app.py', 'hypercomplex.py'),
+                           server_cmd=args.server_cmd)
+    return common.finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Utilitários partilhados pelos benchmarks: medição, gravação em JSON e
+comparação com uma baseline guardada.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def source_fingerprint(*filenames):
+    """
+    Calcula uma impressão digital do código-fonte medido.
+
+    Args:
+        *filenames: Ficheiros relativos à raiz do projecto
+
+    Returns:
+        str: Primeiros 12 caracteres do SHA-256 do conteúdo dos ficheiros
+    """
+    digest = hashlib.sha256()
+    for filename in filenames:
+        with open(os.path.join(ROOT, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Mede o tempo por chamada de uma função sem argumentos.
+
+    O número de chamadas por repetição é escolhido automaticamente para que
+    cada repetição dure pelo menos min_time segundos.
+
+    Args:
+        func (callable): Função a medir
+        repeat (int): Número de repetições
+        min_time (float): Duração mínima de cada repetição, em segundos
+
+    Returns:
+        dict: Mediana, mínimo e desvio (em nanossegundos por chamada) e contagens
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10**7:
+            break
+        number *= 2 if elapsed * 10 >= min_time else 10
+    samples = [elapsed / number * 1e9 for elapsed in timer.repeat(repeat, number)]
+    return summarize_samples(samples, number)
+
+
+def summarize_samples(samples, number=1):
+    """
+    Resume amostras de tempo (em nanossegundos) no formato dos resultados.
+
+    Args:
+        samples (list): Tempos por chamada, em nanossegundos
+        number (int): Chamadas por amostra
+
+    Returns:
+        dict: Mediana, mínimo e desvio das amostras e contagens
+    """
+    return {
+        'median_ns': statistics.median(samples),
+        'min_ns': min(samples),
+        'stdev_ns': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'number': number,
+        'repeat': len(samples),
+    }
+
+
+def run_suite(benchmarks, repeat=5, min_time=0.2, pattern=None, stream=sys.stderr):
+    """
+    Executa um conjunto de benchmarks.
+
+    Args:
+        benchmarks (dict): Nome -> função sem argumentos
+        repeat (int): Número de repetições de cada benchmark
+        min_time (float): Duração mínima de cada repetição, em segundos
+        pattern (str, optional): Expressão regular para seleccionar benchmarks pelo nome
+        stream: Destino das linhas de progresso
+
+    Returns:
+        dict: Resultados por nome de benchmark
+    """
+    results = {}
+    for name, func in benchmarks.items():
+        if pattern and not re.search(pattern, name):
+            continue
+        results[name] = measure(func, repeat, min_time)
+        print(f"{name:<48} {format_ns(results[name]['median_ns']):>12}", file=stream)
+    return results
+
+
+def format_ns(value):
+    """Formata uma duração em nanossegundos com a unidade mais legível."""
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('µs', 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} ns"
+
+
+def metadata(**extra):
+    """Metadados do ambiente em que os resultados foram obtidos."""
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def save(path, meta, results):
+    """Grava os resultados e metadados em JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    """Lê um ficheiro de resultados gravado por save()."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.10, key='median_ns'):
+    """
+    Compara resultados com uma baseline.
+
+    Args:
+        results (dict): Resultados actuais por nome de benchmark
+        baseline (dict): Resultados da baseline por nome de benchmark
+        tolerance (float): Abrandamento relativo tolerado (0.10 = 10%)
+        key (str): Métrica comparada
+
+    Returns:
+        list: Tuplos (nome, baseline, actual, variação relativa, regressão?)
+            para os benchmarks presentes em ambos
+    """
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name][key], current[key]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+def report_comparison(rows, tolerance, stream=sys.stdout):
+    """
+    Escreve a tabela de comparação e indica se houve regressões.
+
+    Returns:
+        bool: True se algum benchmark regrediu além da tolerância
+    """
+    regressed = False
+    print(f"{'benchmark':<48} {'baseline':>12} {'actual':>12} {'variação':>9}", file=stream)
+    for name, before, after, change, regression in rows:
+        flag = '  REGRESSÃO' if regression else ''
+        regressed = regressed or regression
+        print(f"{name:<48} {format_ns(before):>12} {format_ns(after):>12} {change:>+8.1%}{flag}", file=stream)
+    if regressed:
+        print(f"\nRegressões acima da tolerância de {tolerance:.0%}.", file=stream)
+    return regressed
+
+
+def argument_parser(description):
+    """Argumentos de linha de comandos comuns a todos os benchmarks."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--output', '-o', help="gravar os resultados neste ficheiro JSON")
+    parser.add_argument('--baseline', '-b', help="comparar com os resultados guardados neste ficheiro JSON")
+    parser.add_argument('--tolerance', '-t', type=float, default=0.10,
+                        help="abrandamento relativo tolerado face à baseline (por omissão 0.10)")
+    parser.add_argument('--repeat', '-r', type=int, default=5, help="repetições de cada benchmark")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="duração mínima de cada repetição, em segundos")
+    parser.add_argument('--filter', '-k', help="expressão regular para seleccionar benchmarks pelo nome")
+    return parser
+
+
+def finish(args, meta, results):
+    """
+    Grava os resultados e compara-os com a baseline, conforme os argumentos.
+
+    Returns:
+        int: Código de saída (1 se houve regressões, 0 caso contrário)
+    """
+    if args.output:
+        save(args.output, meta, results)
+    if args.baseline:
+        baseline = load(args.baseline)['results']
+        rows = compare(results, baseline, args.tolerance)
+        if report_comparison(rows, args.tolerance):
+            return 1
+    return 0
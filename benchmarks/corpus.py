@@ -0,0 +1,134 @@
+"""
+Corpus de expressões realistas usado pelos benchmarks e ferramentas de carga.
+
+As expressões reproduzem o tipo de entradas submetidas pelos utilizadores:
+aritmética com as unidades i, j e k, divisões à esquerda/direita, potências,
+funções elementares e expressões já com resultados anteriores colados.
+"""
+import json
+
+QUATERNION_EXPRESSIONS = [
+    "1+2i+3j+4k",
+    "(1+2i+3j+4k)*(2-i+j-k)",
+    "(1+2i+3j+4k)/(2-i+j-k)",
+    "2*i*3 + j*j - conjugate(1+2i)",
+    "divL(1+2i, 3j+k)",
+    "divR(1+2i+3j, 2-k)",
+    "-divL(1+i, 1+j) + 2",
+    "(1+i+j)**3",
+    "(1+i+j)^-2",
+    "(1+i+j)**0.5",
+    "(1+i)**(2+j)",
+    "exp(1+2i+3j)",
+    "ln(1+2i+3j+4k)",
+    "sqrt(1+2i+3j+4k)",
+    "sin(1+i)*sin(1+i) + cos(1+i)*cos(1+i)",
+    "exp(1+2i+3j) + exp(1+2i+3j) * exp(1+2i+3j)",
+    "tan(0.5+0.1j)",
+    "asinh(1+i) - acosh(2+j)",
+    "atanh(0.5+i)",
+    "norm(1+2i+3j+4k)*i",
+    "normalize(1+i+j+k)",
+    "inverse(2-3i+j)",
+    "arg(1+i)",
+    "sign(1+2i+2j) + absIJK(1+2i+2j)",
+    "pow10(0.5+i)",
+    "vectorial(3+2i+j) + real(3+2i+j)",
+    "1.5i-2.25j+0.75k",
+    "-3+i",
+    "pi*i + e*j",
+    "2 3",
+]
+
+COQUATERNION_EXPRESSIONS = [
+    "1+2i+3j+4k",
+    "(1+2i+3j+4k)*(2-i+j-k)",
+    "(2+i)/(3+j)",
+    "2*i*3 + j*j - conjugate(1+2i)",
+    "divL(1+2i, 3+j)",
+    "divR(1+2i, 3+k)",
+    "(1+i+0.5j)**3",
+    "(2+j)**0.5",
+    "exp(1+2i+j)",
+    "exp(1+i+2j)",
+    "exp(1+j+k)",
+    "ln(2+0.5i)",
+    "ln(2+0.5j)",
+    "sin(0.3+i) + cos(0.3+j)",
+    "sinh(1+k) * cosh(1+k)",
+    "tanh(0.5+0.2i)",
+    "tan(0.5+0.2j)",
+    "atan(0.3i)",
+    "sqrt(4+i)",
+    "norm(2+i+j)",
+    "norm_mink(3+j)",
+    "normalize_mink(3+j)",
+    "sign(1+2i+j)",
+    "inverse(2+i+j)",
+    "pow10(0.5+0.1j)",
+    "-(2+i)*3",
+    "1.5i-2.25j+0.75k",
+    "pi*j",
+]
+
+COMPLEX_EXPRESSIONS = [
+    "1+2i",
+    "(1+2i)*(3-4i)",
+    "(1+2i)/(3-4i)",
+    "sin(0.5) + cos(0.5)",
+    "exp(i*pi) + 1",
+    "sqrt(-4+0j)",
+    "ln(2) + log(100)",
+    "abs(3+4i)",
+    "arg(1+i)",
+    "conj(2-3i) * real(2+5i)",
+    "sinh(1) - cosh(1) + tanh(0.5)",
+    "asin(0.5) + acos(0.5) + atan(1)",
+    "2**10 - 3**4",
+    "mod(17, 5) * pi",
+    "sin(30) + cos(60)",
+]
+
+# Quaterniões/coquaterniões de exemplo (componentes a, b, c, d) para as primitivas
+SAMPLE_COMPONENTS = [
+    (1.0, 2.0, 3.0, 4.0),
+    (0.5, -1.25, 0.75, 2.0),
+    (2.0, 0.3, -0.4, 0.1),
+    (-1.5, 0.2, 0.9, -0.6),
+]
+
+CORPORA = {
+    'quaternion': QUATERNION_EXPRESSIONS,
+    'coquaternion': COQUATERNION_EXPRESSIONS,
+    'standard': COMPLEX_EXPRESSIONS,
+}
+
+
+def load_slowlog(path, calculator=None):
+    """
+    Lê as expressões de um ficheiro do registo de avaliações lentas.
+
+    Args:
+        path (str): Ficheiro JSON por linha produzido por slowlog.py
+        calculator (str, optional): Filtrar por tipo de calculadora
+
+    Returns:
+        dict: Listas de expressões (sem repetições) por tipo de calculadora
+    """
+    corpora = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            kind = entry.get('calculator')
+            if calculator is not None and kind != calculator:
+                continue
+            expressions = corpora.setdefault(kind, [])
+            if entry.get('expression') not in expressions:
+                expressions.append(entry.get('expression'))
+    return corpora
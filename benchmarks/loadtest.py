@@ -0,0 +1,282 @@
+"""
+Gerador de carga ponta-a-ponta para as rotas Flask da calculadora.
+
+Cada utilizador virtual mantém a sua própria sessão (cookie) e executa uma
+mistura ponderada de acções: abrir as páginas, submeter expressões do corpus
+nas três calculadoras, alternar o modo angular e limpar o histórico.
+A carga pode ser dirigida a um servidor local (--url) ou à aplicação em
+processo através do cliente de testes do Flask (por omissão).
+
+No fim, indica o débito e as latências p50/p95/p99 por rota.
+
+Uso:
+    python -m benchmarks.loadtest --concurrency 8 --duration 20
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --requests 5000 --output carga.json
+"""
+import argparse
+import http.client
+import http.cookies
+import json
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+
+from benchmarks.corpus import CORPORA
+
+# Acções e respectivos pesos na mistura por omissão
+DEFAULT_MIX = {
+    'post_quaternion': 30,
+    'post_coquaternion': 20,
+    'post_standard': 30,
+    'get_page': 12,
+    'toggle_angle_mode': 5,
+    'clear_history': 3,
+}
+
+PAGES = {'standard': '/', 'quaternion': '/quaternions', 'coquaternion': '/coquaternions'}
+
+
+class TestClientUser:
+    """Utilizador virtual que usa o cliente de testes do Flask (em processo)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        response.close()
+        return response.status_code
+
+
+class HttpUser:
+    """Utilizador virtual com uma ligação HTTP persistente a um servidor."""
+
+    def __init__(self, base_url, timeout=30):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.cookies = http.cookies.SimpleCookie()
+        self.connection = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = "; ".join(f"{k}={m.value}" for k, m in self.cookies.items())
+
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Ligação fechada pelo servidor: reabrir uma vez
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        return response.status
+
+
+def _choose_action(rng, mix):
+    actions, weights = zip(*mix.items())
+    return rng.choices(actions, weights)[0]
+
+
+def _prepare(action, rng):
+    """
+    Escolhe o pedido de uma acção de um utilizador virtual, sem o enviar.
+
+    Returns:
+        tuple: (rótulo da rota, método, caminho, formulário ou None)
+    """
+    if action.startswith('post_'):
+        calculator = action[len('post_'):]
+        expression = rng.choice(CORPORA[calculator])
+        path = PAGES[calculator]
+        return f"POST {path}", 'POST', path, {'expression': expression}
+    if action == 'get_page':
+        path = rng.choice(list(PAGES.values()))
+        return f"GET {path}", 'GET', path, None
+    if action == 'toggle_angle_mode':
+        return "GET /toggle_angle_mode", 'GET', '/toggle_angle_mode', None
+    if action == 'clear_history':
+        calculator = rng.choice(list(PAGES))
+        return "GET /clear_history/<calculator_type>", 'GET', f"/clear_history/{calculator}", None
+    raise ValueError(f"Acção desconhecida: {action}")
+
+
+def run_load(make_user, concurrency=4, duration=None, requests=None, mix=None, seed=0):
+    """
+    Executa a carga com vários utilizadores virtuais em paralelo.
+
+    Args:
+        make_user (callable): Cria um utilizador virtual (um por thread)
+        concurrency (int): Número de utilizadores virtuais simultâneos
+        duration (float, optional): Duração em segundos
+        requests (int, optional): Número total de pedidos (alternativa a duration)
+        mix (dict, optional): Pesos de cada acção (por omissão DEFAULT_MIX)
+        seed (int): Semente para a escolha reprodutível das acções
+
+    Returns:
+        tuple: (latências em segundos por rota, erros por rota, duração total)
+    """
+    mix = mix or DEFAULT_MIX
+    if duration is None and requests is None:
+        duration = 10.0
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    remaining = [requests]
+    clock = {}
+
+    def start_clock():
+        # Executado uma única vez, quando todos os utilizadores estão prontos
+        clock['start'] = time.perf_counter()
+        clock['deadline'] = clock['start'] + duration if duration is not None else None
+
+    start_barrier = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def take_ticket():
+        if remaining[0] is None:
+            return time.perf_counter() < clock['deadline']
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        user = make_user()
+        local_latencies, local_errors = {}, {}
+        # Cada utilizador começa por abrir uma página, como um browser
+        try:
+            user.request('GET', rng.choice(list(PAGES.values())))
+        finally:
+            start_barrier.wait()
+        while take_ticket():
+            # O rótulo é conhecido antes do envio: as falhas contam na rota do pedido
+            route, method, path, form = _prepare(_choose_action(rng, mix), rng)
+            started = time.perf_counter()
+            try:
+                failed = user.request(method, path, form) >= 400
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            local_latencies.setdefault(route, []).append(elapsed)
+            if failed:
+                local_errors[route] = local_errors.get(route, 0) + 1
+        with lock:
+            for route, values in local_latencies.items():
+                latencies.setdefault(route, []).extend(values)
+            for route, count in local_errors.items():
+                errors[route] = errors.get(route, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - clock['start']
+
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método da ordem mais próxima sobre valores ordenados."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Calcula débito e percentis de latência por rota e no total.
+
+    Returns:
+        dict: Estatísticas por rota (latências em milissegundos)
+    """
+    summary = {}
+    all_values = []
+    for route, values in latencies.items():
+        all_values.extend(values)
+        summary[route] = _stats(sorted(values), errors.get(route, 0), elapsed)
+    summary['TOTAL'] = _stats(sorted(all_values), sum(errors.values()), elapsed)
+    return summary
+
+
+def _stats(values, error_count, elapsed):
+    return {
+        'requests': len(values),
+        'errors': error_count,
+        'throughput_rps': len(values) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(values) * 1000 if values else 0.0,
+        'p50_ms': percentile(values, 0.50) * 1000,
+        'p95_ms': percentile(values, 0.95) * 1000,
+        'p99_ms': percentile(values, 0.99) * 1000,
+        'max_ms': values[-1] * 1000 if values else 0.0,
+    }
+
+
+def print_summary(summary, elapsed, stream=sys.stdout):
+    """Escreve a tabela de resultados."""
+    print(f"Duração: {elapsed:.2f} s", file=stream)
+    header = f"{'rota':<40} {'pedidos':>8} {'erros':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header, file=stream)
+    print("-" * len(header), file=stream)
+    routes = sorted(r for r in summary if r != 'TOTAL') + ['TOTAL']
+    for route in routes:
+        s = summary[route]
+        print(f"{route:<40} {s['requests']:>8} {s['errors']:>6} {s['throughput_rps']:>9.1f} "
+              f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}", file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerador de carga para as rotas da calculadora.")
+    parser.add_argument('--url', help="URL base de um servidor em execução (por omissão usa o cliente de testes)")
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help="utilizadores virtuais simultâneos")
+    parser.add_argument('--duration', '-d', type=float, help="duração da carga em segundos (por omissão 10)")
+    parser.add_argument('--requests', '-n', type=int, help="número total de pedidos, em alternativa à duração")
+    parser.add_argument('--mix', help="pesos das acções em JSON, p.ex. '{\"post_quaternion\": 1}'")
+    parser.add_argument('--seed', type=int, default=0, help="semente da escolha das acções")
+    parser.add_argument('--output', '-o', help="gravar o resumo neste ficheiro JSON")
+    args = parser.parse_args(argv)
+
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = json.loads(args.mix)
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            parser.error(f"acções desconhecidas: {', '.join(sorted(unknown))}")
+
+    if args.url:
+        make_user = lambda: HttpUser(args.url)
+    else:
+        from app import app
+        make_user = lambda: TestClientUser(app)
+
+    latencies, errors, elapsed = run_load(make_user, args.concurrency, args.duration, args.requests, mix, args.seed)
+    summary = summarize(latencies, errors, elapsed)
+    print_summary(summary, elapsed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'target': args.url or 'test-client', 'concurrency': args.concurrency,
+                       'duration_s': elapsed, 'mix': mix, 'routes': summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+Geração de código em linha recta para expressões compiladas com variáveis.
+
+Avaliar a árvore optimizada por expr_compiler cria um Quaternion ou
+Coquaternion por cada nó intermédio, e cada operação passa pelos testes
+isinstance de __add__, __mul__, etc. Este módulo traduz a árvore numa função
+Python que trabalha directamente sobre as quatro componentes (floats):
+
+    - somas, subtracções, produtos (regra de Hamilton ou do produto dos
+      coquaterniões, expandida em linha), divisões e inversos são escritos
+      componente a componente, pela mesma ordem de operações dos métodos das
+      classes, pelo que o resultado é idêntico ao bit;
+    - neg, conjugate, real, vectorial, inverse, divL e divR também são
+      expandidas; as restantes funções (exp, sin, pow, ...) recebem um objecto
+      e o resultado é decomposto de novo nas componentes;
+    - só o resultado final é reconstruído como objecto.
+
+A função gerada só cobre o caso comum (variáveis da classe da álgebra e
+tipos de resultado previstos). Em qualquer outro caso, ou em caso de erro,
+lança uma excepção e a avaliação é repetida pelo caminho eval, que
+reproduz o comportamento (e a mensagem de erro) originais.
+"""
+import ast
+import math
+
+# Fórmulas do produto, com as componentes do primeiro factor em a1..d1 e do segundo em a2..d2
+_PRODUCTS = {
+    'Quaternion': (
+        "{a1}*{a2} - {b1}*{b2} - {c1}*{c2} - {d1}*{d2}",
+        "{a1}*{b2} + {b1}*{a2} + {c1}*{d2} - {d1}*{c2}",
+        "{a1}*{c2} - {b1}*{d2} + {c1}*{a2} + {d1}*{b2}",
+        "{a1}*{d2} + {b1}*{c2} - {c1}*{b2} + {d1}*{a2}",
+    ),
+    'Coquaternion': (
+        "{a1}*{a2} - {b1}*{b2} + {c1}*{c2} + {d1}*{d2}",
+        "{a2}*{b1} + {a1}*{b2} + {c2}*{d1} - {c1}*{d2}",
+        "{a2}*{c1} + {a1}*{c2} + {b2}*{d1} - {b1}*{d2}",
+        "-({b2}*{c1}) + {b1}*{c2} + {a2}*{d1} + {a1}*{d2}",
+    ),
+}
+
+# Norma ao quadrado usada pelo inverso (euclidiana ou de Minkowski)
+_INVERSE_NORMS = {
+    'Quaternion': "{a}**2 + {b}**2 + {c}**2 + {d}**2",
+    'Coquaternion': "{a}**2 + {b}**2 - {c}**2 - {d}**2",
+}
+
+# Limiar abaixo do qual inverse() considera o elemento nulo
+_INVERSE_EPSILON = 1e-15
+
+# Funções do ambiente que devolvem um escalar quando aplicadas a um elemento da álgebra
+_SCALAR_RESULTS = frozenset(('norm', 'arg', 'absIJK', 'norm_mink'))
+
+# Funções do ambiente que devolvem um elemento da álgebra mesmo quando aplicadas a escalares
+_ALGEBRA_RESULTS = frozenset(('conjugate', 'real', 'vectorial', 'sign', 'acosh'))
+
+# Função do ambiente que converte um valor no elemento da álgebra (expr_compiler.COERCION)
+_COERCION = '_element'
+
+_COMPONENTS = ('a', 'b', 'c', 'd')
+
+
+class _Fallback(Exception):
+    """O caso não é coberto pelo código gerado: avaliar pelo caminho eval."""
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Generator:
+    """
+    Tradução da árvore em instruções Python.
+
+    Cada valor intermédio é ('S', expressão) para escalares (int ou float)
+    ou ('H', (a, b, c, d)) para elementos da álgebra, em que as expressões
+    são nomes locais ou literais.
+    """
+
+    def __init__(self, env, constants, variables, unit_class):
+        self.env = env
+        self.constants = constants
+        self.variables = variables
+        self.unit_class = unit_class
+        self.product = _PRODUCTS[unit_class.__name__]
+        self.inverse_norm = _INVERSE_NORMS[unit_class.__name__]
+        self.namespace = {'_cls': unit_class, '_Fallback': _Fallback}
+        self.prologue = []
+        self.lines = []
+        self.bound = {}
+        self.temporaries = {}
+        self.unpacked = set()
+        self.counter = 0
+
+    # Nomes e literais
+
+    def _fresh(self):
+        self.counter += 1
+        return f"_v{self.counter}"
+
+    def _global(self, value):
+        """Nome global da função gerada associado a um valor."""
+        key = id(value)
+        name = self.bound.get(key)
+        if name is None:
+            name = self.bound[key] = f"_g{len(self.bound)}"
+            self.namespace[name] = value
+        return name
+
+    def _literal(self, value):
+        if type(value) is float and not math.isfinite(value):
+            return self._global(value)
+        text = repr(value)
+        # Entre parênteses, para que -x**2 não seja lido como -(x**2)
+        return f"({text})" if text.startswith('-') else text
+
+    def _scalar(self, expression):
+        name = self._fresh()
+        self.lines.append(f"{name} = {expression}")
+        return ('S', name)
+
+    def _algebra(self, expressions):
+        names = []
+        prefix = self._fresh()
+        for component, expression in zip(_COMPONENTS, expressions):
+            # Componentes inalteradas (nomes ou literais) não precisam de cópia
+            if expression.isidentifier():
+                names.append(expression)
+                continue
+            literal = _literal_value(expression)
+            if literal is not None:
+                names.append(self._literal(literal))
+                continue
+            name = f"{prefix}{component}"
+            self.lines.append(f"{name} = {expression}")
+            names.append(name)
+        return ('H', tuple(names))
+
+    def _object(self, value):
+        """Expressão que constrói o objecto (ou o escalar) de um valor."""
+        kind, parts = value
+        if kind == 'S':
+            return parts
+        return f"_cls({', '.join(parts)})"
+
+    def _unpack(self, expression, kind):
+        """Avalia uma expressão opaca e decompõe o resultado, verificando o tipo previsto."""
+        if kind == 'S':
+            name = self._fresh()
+            self.lines.append(f"{name} = {expression}")
+            self.lines.append(f"if {name}.__class__ is not float and {name}.__class__ is not int: raise _Fallback")
+            return ('S', name)
+        prefix = self._fresh()
+        self.lines.append(f"{prefix} = {expression}")
+        self.lines.append(f"if {prefix}.__class__ is not _cls: raise _Fallback")
+        names = tuple(f"{prefix}{component}" for component in _COMPONENTS)
+        self.lines.append(f"{', '.join(names)} = {', '.join(f'{prefix}.{c}' for c in _COMPONENTS)}")
+        return ('H', names)
+
+    # Operações expandidas
+
+    def _multiply(self, left, right):
+        (a1, b1, c1, d1), (a2, b2, c2, d2) = left, right
+        names = dict(a1=a1, b1=b1, c1=c1, d1=d1, a2=a2, b2=b2, c2=c2, d2=d2)
+        return self._algebra([formula.format(**names) for formula in self.product])
+
+    def _inverse(self, parts):
+        a, b, c, d = parts
+        norm = self._fresh()
+        self.lines.append(f"{norm} = {self.inverse_norm.format(a=a, b=b, c=c, d=d)}")
+        self.lines.append(f"if abs({norm}) < {_INVERSE_EPSILON!r}: raise _Fallback")
+        return self._algebra([f"{a} / {norm}", f"-{b} / {norm}", f"-{c} / {norm}", f"-{d} / {norm}"])[1]
+
+    def _binary(self, op, left, right):
+        (lkind, lparts), (rkind, rparts) = left, right
+        if lkind == 'S' and rkind == 'S':
+            symbol = _SCALAR_SYMBOLS.get(type(op))
+            if symbol is None:
+                raise _Unsupported
+            expression = f"{lparts} {symbol} {rparts}"
+            # Potências de escalares podem ser complexas
+            return self._unpack(expression, 'S') if isinstance(op, ast.Pow) else self._scalar(expression)
+
+        if isinstance(op, (ast.Add, ast.Sub)):
+            symbol = '+' if isinstance(op, ast.Add) else '-'
+            if lkind == 'H' and rkind == 'H':
+                return self._algebra([f"{x} {symbol} {y}" for x, y in zip(lparts, rparts)])
+            if lkind == 'H':
+                a, b, c, d = lparts
+                return self._algebra([f"{a} {symbol} {rparts}", b, c, d])
+            a, b, c, d = rparts
+            if symbol == '+':
+                return self._algebra([f"{a} + {lparts}", b, c, d])
+            # s - q é calculado como (q - s) * -1
+            return self._algebra([f"({a} - {lparts}) * -1", f"{b} * -1", f"{c} * -1", f"{d} * -1"])
+
+        if isinstance(op, ast.Mult):
+            if lkind == 'H' and rkind == 'H':
+                return self._multiply(lparts, rparts)
+            parts, scalar = (lparts, rparts) if lkind == 'H' else (rparts, lparts)
+            return self._algebra([f"{x} * {scalar}" for x in parts])
+
+        if isinstance(op, ast.Div):
+            if lkind == 'H' and rkind == 'H':
+                return self._multiply(lparts, self._inverse(rparts))
+            if lkind == 'H':
+                # q / s é calculado como q * (1.0 / s); a divisão por zero lança a excepção
+                reciprocal = self._scalar(f"1.0 / {rparts}")[1]
+                return self._algebra([f"{x} * {reciprocal}" for x in lparts])
+            return self._algebra([f"{x} * {lparts}" for x in self._inverse(rparts)])
+
+        # Restantes operadores (potências, ...): pelos métodos das classes
+        symbol = _SCALAR_SYMBOLS.get(type(op))
+        if symbol is None:
+            raise _Unsupported
+        return self._unpack(f"{self._object(left)} {symbol} {self._object(right)}", 'H')
+
+    # Funções do ambiente
+
+    def _function(self, node):
+        """Devolve (nome no ambiente ou None, valor) da função chamada."""
+        func = node.func
+        if isinstance(func, ast.Name) and func.id not in self.variables:
+            if func.id in self.env:
+                return func.id, self.env[func.id]
+        elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) \
+                and func.value.id in self.env and func.value.id not in self.variables:
+            try:
+                return None, getattr(self.env[func.value.id], func.attr)
+            except AttributeError:
+                pass
+        raise _Unsupported
+
+    def _call(self, node):
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise _Unsupported
+        name, function = self._function(node)
+        if not callable(function):
+            raise _Unsupported
+        args = [self.visit(arg) for arg in node.args]
+        kinds = tuple(kind for kind, _ in args)
+
+        if kinds == ('H',):
+            a, b, c, d = args[0][1]
+            if name == _COERCION:
+                return args[0]
+            if name == 'neg':
+                return self._algebra([f"-{a}", f"-{b}", f"-{c}", f"-{d}"])
+            if name == 'conjugate':
+                return self._algebra([a, f"-{b}", f"-{c}", f"-{d}"])
+            if name == 'real':
+                return ('H', (a, '0.0', '0.0', '0.0'))
+            if name == 'vectorial':
+                return ('H', ('0.0', b, c, d))
+            if name == 'inverse':
+                return ('H', self._inverse(args[0][1]))
+        elif kinds == ('H', 'H'):
+            if name == 'divL':
+                return self._multiply(self._inverse(args[1][1]), args[0][1])
+            if name == 'divR':
+                return self._multiply(args[0][1], self._inverse(args[1][1]))
+
+        if 'H' in kinds:
+            kind = 'S' if name in _SCALAR_RESULTS else 'H'
+        else:
+            kind = 'H' if name in _ALGEBRA_RESULTS or name == _COERCION or function is self.unit_class else 'S'
+        arguments = ', '.join(self._object(arg) for arg in args)
+        return self._unpack(f"{self._global(function)}({arguments})", kind)
+
+    # Visitantes
+
+    def visit(self, node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (bool, int, float):
+                raise _Unsupported
+            return ('S', self._literal(node.value))
+        if isinstance(node, ast.Name):
+            return self._name(node.id)
+        if isinstance(node, ast.NamedExpr):
+            value = self.visit(node.value)
+            self.temporaries[node.target.id] = value
+            return value
+        if isinstance(node, ast.BinOp):
+            left = self.visit(node.left)
+            right = self.visit(node.right)
+            return self._binary(node.op, left, right)
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            symbol = _UNARY_SYMBOLS.get(type(node.op))
+            if symbol is None:
+                raise _Unsupported
+            if operand[0] == 'S':
+                return self._scalar(f"{symbol}{operand[1]}")
+            return self._unpack(f"{symbol}{self._object(operand)}", 'H')
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise _Unsupported
+
+    def _name(self, name):
+        if name in self.temporaries:
+            return self.temporaries[name]
+        if name in self.variables:
+            index = sorted(self.variables).index(name)
+            prefix = f"_x{index}"
+            parts = tuple(f"{prefix}{component}" for component in _COMPONENTS)
+            if prefix not in self.unpacked:
+                self.unpacked.add(prefix)
+                self.prologue.append(f"{prefix} = _vars[{name!r}]")
+                self.prologue.append(f"if {prefix}.__class__ is not _cls: raise _Fallback")
+                self.prologue.append(f"{', '.join(parts)} = {', '.join(f'{prefix}.{c}' for c in _COMPONENTS)}")
+            return ('H', parts)
+        if name in self.constants:
+            value = self.constants[name]
+        elif name in self.env:
+            value = self.env[name]
+        else:
+            raise _Unsupported
+        if type(value) is self.unit_class:
+            return ('H', tuple(self._literal(getattr(value, c)) for c in _COMPONENTS))
+        if type(value) in (bool, int, float):
+            return ('S', self._literal(value))
+        raise _Unsupported
+
+
+_SCALAR_SYMBOLS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.FloorDiv: '//', ast.Mod: '%', ast.Pow: '**',
+}
+
+_UNARY_SYMBOLS = {ast.USub: '-', ast.UAdd: '+'}
+
+
+def _literal_value(expression):
+    """Valor de uma expressão que é apenas um literal numérico (p.ex. -0.0), ou None."""
+    try:
+        value = ast.literal_eval(expression)
+    except (ValueError, SyntaxError):
+        return None
+    return value if type(value) in (bool, int, float) else None
+
+
+def generate(tree, env, constants, variables, unit_class):
+    """
+    Gera uma função que avalia a expressão sobre as componentes.
+
+    Args:
+        tree (ast.Expression): Árvore optimizada por expr_compiler.optimize
+        env (dict): Ambiente de avaliação
+        constants (dict): Constantes da árvore optimizada (_k0, _k1, ...)
+        variables (iterable): Nomes das variáveis, cujos valores são indicados
+            num dicionário em cada chamada
+        unit_class (type): Classe da álgebra (Quaternion ou Coquaternion)
+
+    Returns:
+        function: Função f(valores) que devolve o resultado ou lança uma
+            excepção nos casos não cobertos (a repetir pelo caminho eval);
+            None se a expressão tiver construções não suportadas
+    """
+    if unit_class is None or unit_class.__name__ not in _PRODUCTS:
+        return None
+    generator = _Generator(env, constants, frozenset(variables), unit_class)
+    try:
+        result = generator.visit(tree.body)
+    except _Unsupported:
+        return None
+    body = generator.prologue + generator.lines + [f"return {generator._object(result)}"]
+    source = "def _kernel(_vars):\n" + "".join(f"    {line}\n" for line in body)
+    exec(compile(source, '<codegen>', 'exec'), generator.namespace)
+    kernel = generator.namespace['_kernel']
+    kernel.source = source
+    return kernel
@@ -0,0 +1,461 @@
+"""
+Optimização das expressões reescritas antes da compilação.
+
+As expressões produzidas por _rewrite_hypercomplex_expr são código Python que
+constrói um objecto por cada unidade imaginária e por cada operação. Este
+módulo percorre a árvore sintáctica (ast) e, antes de a compilar:
+
+    - avalia as subárvores constantes (sem variáveis) uma única vez,
+      substituindo-as pelo valor, guardado em nomes _k0, _k1, ...;
+    - aplica identidades da álgebra: produtos de unidades adjacentes
+      (x*j*j passa a x*(j*j), e j*j é -1 nos quaterniões e +1 nos
+      coquaterniões), neg(neg(x)) = x, conjugate(conjugate(x)) = x e x*1 = x.
+      Só a reassociação de unidades pode alterar o resultado, e apenas no
+      sinal de componentes nulas ou com operandos infinitos.
+
+    - elimina as subexpressões repetidas: a primeira ocorrência guarda o
+      valor num temporário (_t0 := ...) e as seguintes reutilizam-no, pelo
+      que sin(q)*sin(q) ou exp(...) repetido são calculados uma só vez.
+
+As subárvores cuja avaliação falha ficam por optimizar, para que o erro
+ocorra na avaliação, tal como sem o passo de optimização.
+"""
+import ast
+import collections
+import operator
+import types
+
+import codegen
+
+# Prefixos dos nomes dos valores constantes e dos temporários no código optimizado
+CONSTANT_PREFIX = '_k'
+TEMPORARY_PREFIX = '_t'
+
+# Código comum às expressões inteiramente constantes, cujo valor fica em _k0
+_CONSTANT_CODE = compile(f"{CONSTANT_PREFIX}0", '<string>', 'eval')
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.MatMult: operator.matmul,
+}
+
+_UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.not_,
+    ast.Invert: operator.invert,
+}
+
+# Construções que introduzem nomes ou âmbitos próprios: expressões que as
+# contenham são compiladas sem optimização
+_UNSUPPORTED_NODES = (ast.NamedExpr, ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp,
+                      ast.GeneratorExp, ast.Await, ast.Yield, ast.YieldFrom)
+
+# Funções do ambiente cuja aplicação dupla é a identidade
+_INVOLUTIONS = ('neg', 'conjugate')
+
+# Função do ambiente que converte um valor no elemento da álgebra: substitui
+# conjugate(conjugate(x)), mantendo a conversão dos números. Por ter nome no
+# ambiente, quem troca as funções (vectores, números duais) pode interceptá-la
+COERCION = '_element'
+
+
+class CompiledExpression:
+    """
+    Expressão compilada, pronta a avaliar.
+
+    Attributes:
+        source (str): Expressão (reescrita) de origem
+        code (code): Código compilado
+        env (dict): Ambiente de avaliação (não é modificado)
+        constants (dict): Valores das subárvores avaliadas na compilação,
+            a juntar ao ambiente de avaliação
+        kernel (function): Função gerada por codegen, que avalia sobre as
+            componentes (None se a expressão não tiver variáveis ou não for
+            coberta)
+    """
+
+    __slots__ = ('source', 'code', 'env', 'constants', 'kernel')
+
+    def __init__(self, source, code, env, constants, kernel=None):
+        self.source = source
+        self.code = code
+        self.env = env
+        self.constants = constants
+        self.kernel = kernel
+
+    def evaluate(self, variables=None):
+        """
+        Avalia a expressão.
+
+        Args:
+            variables (dict, optional): Valores das variáveis indicadas na compilação
+
+        Returns:
+            Resultado da expressão
+        """
+        if self.kernel is not None:
+            try:
+                return self.kernel(variables)
+            except Exception:
+                # Caso não coberto pelo código gerado, ou erro: o caminho eval
+                # reproduz o resultado ou a excepção originais
+                pass
+        scope = dict(self.env)
+        scope.update(self.constants)
+        if variables:
+            scope.update(variables)
+        return eval(self.code, {"__builtins__": {}}, scope)
+
+
+def _is_unit(value, unit_class):
+    """Indica se o valor é ±1, ±i, ±j ou ±k da álgebra (produtos exactos)."""
+    if unit_class is None or type(value) is not unit_class:
+        return False
+    components = (value.a, value.b, value.c, value.d)
+    return sum(x != 0 for x in components) == 1 and all(x in (0.0, 1.0, -1.0) for x in components)
+
+
+def _is_one(node):
+    # Só o inteiro 1: x*1.0 converteria um inteiro x em float
+    return isinstance(node, ast.Constant) and type(node.value) is int and node.value == 1
+
+
+class _Optimizer(ast.NodeTransformer):
+    """Dobragem de constantes e simplificação algébrica, numa passagem pós-ordem."""
+
+    def __init__(self, env, variables, unit_class):
+        self.env = env
+        self.variables = frozenset(variables)
+        self.unit_class = unit_class
+        self.constants = {}
+
+    # Valores conhecidos na compilação
+
+    def _known(self, node):
+        """
+        Devolve (True, valor) se o nó tem valor conhecido na compilação.
+
+        Os nomes do ambiente que não são variáveis (funções, pi, e, classes)
+        são conhecidos, mas só os resultados de operações são substituídos.
+        """
+        if isinstance(node, ast.Constant):
+            return True, node.value
+        if isinstance(node, ast.Name) and node.id not in self.variables:
+            if node.id in self.constants:
+                return True, self.constants[node.id]
+            if node.id in self.env:
+                return True, self.env[node.id]
+        return False, None
+
+    def _all_known(self, nodes):
+        values = []
+        for node in nodes:
+            known, value = self._known(node)
+            if not known:
+                return None
+            values.append(value)
+        return values
+
+    def _constant(self, value, node):
+        """Substitui um nó pelo seu valor, se este for um número ou elemento da álgebra."""
+        if callable(value) or isinstance(value, types.ModuleType):
+            return node
+        if type(value) in (bool, int, float, complex):
+            replacement = ast.Constant(value)
+        else:
+            name = f"{CONSTANT_PREFIX}{len(self.constants)}"
+            self.constants[name] = value
+            replacement = ast.Name(name, ast.Load())
+        return ast.copy_location(replacement, node)
+
+    def _fold(self, node, compute, operands):
+        values = self._all_known(operands)
+        if values is None:
+            return None
+        try:
+            value = compute(*values)
+        except Exception:
+            # O erro é reproduzido na avaliação
+            return None
+        folded = self._constant(value, node)
+        return None if folded is node else folded
+
+    # Visitantes
+
+    def visit_Constant(self, node):
+        return node
+
+    def visit_Name(self, node):
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is not None:
+            folded = self._fold(node, op, (node.left, node.right))
+            if folded is not None:
+                return folded
+
+        if isinstance(node.op, ast.Mult):
+            # x*1 = 1*x = x
+            if _is_one(node.right):
+                return node.left
+            if _is_one(node.left):
+                return node.right
+            # (x*u)*v = x*(u*v) para unidades u, v: os produtos de unidades são exactos
+            # e multiplicar por uma unidade só permuta e troca o sinal das componentes
+            left = node.left
+            if isinstance(left, ast.BinOp) and isinstance(left.op, ast.Mult):
+                known_u, u = self._known(left.right)
+                known_v, v = self._known(node.right)
+                if known_u and known_v and _is_unit(u, self.unit_class) and _is_unit(v, self.unit_class):
+                    merged = ast.BinOp(left.left, ast.Mult(), self._constant(u * v, node.right))
+                    return ast.copy_location(merged, node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        folded = self._fold(node, _UNARY_OPERATORS[type(node.op)], (node.operand,))
+        return folded if folded is not None else node
+
+    def visit_Attribute(self, node):
+        self.generic_visit(node)
+        if isinstance(node.ctx, ast.Load):
+            folded = self._fold(node, lambda base: getattr(base, node.attr), (node.value,))
+            if folded is not None:
+                return folded
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            return node
+        folded = self._fold(node, lambda func, *args: func(*args), [node.func] + node.args)
+        if folded is not None:
+            return folded
+
+        # neg(neg(x)) = x e conjugate(conjugate(x)) = x
+        name = self._function_name(node)
+        if name in _INVOLUTIONS and len(node.args) == 1:
+            inner = node.args[0]
+            if isinstance(inner, ast.Call) and self._function_name(inner) == name and len(inner.args) == 1 \
+                    and not inner.keywords:
+                argument = inner.args[0]
+                if name == 'neg':
+                    return argument
+                # conjugate converte números no elemento da álgebra; manter essa conversão
+                if COERCION in self.env:
+                    coercion = ast.Name(COERCION, ast.Load())
+                    return ast.copy_location(ast.Call(coercion, [argument], []), node)
+        return node
+
+    def _function_name(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id not in self.variables and node.func.id in self.env:
+            return node.func.id
+        return None
+
+
+# Nós cujo valor vale a pena guardar num temporário quando se repetem
+_CSE_CANDIDATES = (ast.BinOp, ast.UnaryOp, ast.Call)
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _children(node):
+    """Filhos de um nó suportado, pela ordem de avaliação do Python."""
+    if isinstance(node, ast.BinOp):
+        return (node.left, node.right)
+    if isinstance(node, ast.UnaryOp):
+        return (node.operand,)
+    if isinstance(node, ast.Call):
+        return (node.func,) + tuple(node.args)
+    if isinstance(node, ast.Attribute):
+        return (node.value,)
+    return ()
+
+
+def _set_children(node, children):
+    if isinstance(node, ast.BinOp):
+        node.left, node.right = children
+    elif isinstance(node, ast.UnaryOp):
+        node.operand, = children
+    elif isinstance(node, ast.Call):
+        node.func, node.args = children[0], list(children[1:])
+    elif isinstance(node, ast.Attribute):
+        node.value, = children
+
+
+def _structure_keys(root):
+    """
+    Chaves estruturais (iguais para subárvores iguais) dos nós e número de
+    ocorrências das que são candidatas a temporário.
+
+    Raises:
+        _Unsupported: Se a árvore tiver construções não suportadas pela
+            eliminação (avaliação condicional, argumentos com nome, contentores)
+    """
+    keys = {}
+    counts = collections.Counter()
+
+    def key(node):
+        if isinstance(node, ast.Constant):
+            result = ('C', type(node.value), repr(node.value))
+        elif isinstance(node, ast.Name):
+            result = ('N', node.id)
+        elif isinstance(node, ast.BinOp):
+            result = ('B', type(node.op), key(node.left), key(node.right))
+        elif isinstance(node, ast.UnaryOp):
+            result = ('U', type(node.op), key(node.operand))
+        elif isinstance(node, ast.Attribute):
+            result = ('A', key(node.value), node.attr)
+        elif isinstance(node, ast.Call) and not node.keywords \
+                and not any(isinstance(arg, ast.Starred) for arg in node.args):
+            result = ('F',) + tuple(key(child) for child in _children(node))
+        else:
+            raise _Unsupported
+        keys[id(node)] = result
+        if isinstance(node, _CSE_CANDIDATES):
+            counts[result] += 1
+        return result
+
+    key(root)
+    return keys, counts
+
+
+def eliminate_common_subexpressions(tree):
+    """
+    Calcula uma só vez cada subexpressão repetida da árvore.
+
+    A primeira ocorrência, pela ordem de avaliação do Python (operando
+    esquerdo antes do direito, função antes dos argumentos), guarda o valor
+    num temporário e as seguintes reutilizam-no. Só se aplica a árvores sem
+    avaliação condicional (and, or, if, comparações encadeadas), em que todas
+    as ocorrências seriam de facto avaliadas; as funções do ambiente não têm
+    efeitos laterais, pelo que reutilizar o valor equivale a recalculá-lo.
+
+    Args:
+        tree (ast.Expression): Árvore da expressão
+
+    Returns:
+        ast.Expression: Árvore com temporários para as subexpressões repetidas
+    """
+    try:
+        keys, counts = _structure_keys(tree.body)
+    except _Unsupported:
+        return tree
+    repeated = {key for key, count in counts.items() if count > 1}
+    if not repeated:
+        return tree
+
+    temporaries = {}
+    uses = collections.Counter()
+
+    def eliminate(node):
+        key = keys.get(id(node))
+        if key in repeated:
+            name = temporaries.get(key)
+            if name is not None:
+                uses[name] += 1
+                return ast.copy_location(ast.Name(name, ast.Load()), node)
+            name = temporaries[key] = f"{TEMPORARY_PREFIX}{len(temporaries)}"
+        _set_children(node, [eliminate(child) for child in _children(node)])
+        if key not in repeated:
+            return node
+        target = ast.copy_location(ast.Name(name, ast.Store()), node)
+        return ast.copy_location(ast.NamedExpr(target, node), node)
+
+    def unwrap(node):
+        # Temporários cujas repetições estavam todas dentro de outro já eliminado
+        if isinstance(node, ast.NamedExpr):
+            inner = unwrap(node.value)
+            if uses[node.target.id]:
+                node.value = inner
+                return node
+            return inner
+        _set_children(node, [unwrap(child) for child in _children(node)])
+        return node
+
+    body = eliminate(tree.body)
+    if len(uses) < len(temporaries):
+        body = unwrap(body)
+    return ast.Expression(body)
+
+
+def optimize(tree, env, variables=(), unit_class=None):
+    """
+    Optimiza a árvore de uma expressão.
+
+    Args:
+        tree (ast.Expression): Árvore devolvida por ast.parse(..., mode='eval')
+        env (dict): Ambiente de avaliação (funções e constantes conhecidas)
+        variables (iterable): Nomes cujo valor só é conhecido na avaliação
+        unit_class (type, optional): Classe da álgebra (Quaternion ou Coquaternion)
+
+    Returns:
+        tuple: (árvore optimizada, dicionário de constantes)
+    """
+    if any(isinstance(node, _UNSUPPORTED_NODES) for node in ast.walk(tree)):
+        return tree, {}
+    optimizer = _Optimizer(env, variables, unit_class)
+    tree = ast.fix_missing_locations(optimizer.visit(tree))
+    tree = eliminate_common_subexpressions(tree)
+    # Os valores intermédios, já dobrados em constantes maiores, deixam de ser necessários
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    constants = {name: value for name, value in optimizer.constants.items() if name in used}
+    return tree, constants
+
+
+def compile_expression(source, env, variables=(), unit_class=None):
+    """
+    Analisa, optimiza e compila uma expressão.
+
+    Args:
+        source (str): Expressão em Python (já reescrita)
+        env (dict): Ambiente de avaliação
+        variables (iterable): Nomes cujo valor só é conhecido na avaliação
+        unit_class (type, optional): Classe da álgebra (Quaternion ou Coquaternion)
+
+    Returns:
+        CompiledExpression: Expressão compilada
+
+    Raises:
+        SyntaxError: Se a expressão não for Python válido
+    """
+    code = compile(source, '<string>', 'eval')
+    variables = frozenset(variables)
+    names = _code_names(code)
+    if names <= env.keys() and not names & variables:
+        # Expressão inteiramente constante: avaliá-la já, de uma só vez (a eliminação
+        # de subexpressões repetidas custaria mais do que poupa numa única avaliação)
+        try:
+            value = eval(code, {"__builtins__": {}}, dict(env))
+        except Exception:
+            # Dobrar o que for possível; o erro é reproduzido na avaliação
+            pass
+        else:
+            if not (callable(value) or isinstance(value, types.ModuleType)):
+                return CompiledExpression(source, _CONSTANT_CODE, env, {f"{CONSTANT_PREFIX}0": value})
+
+    tree = ast.parse(source, '<string>', 'eval')
+    tree, constants = optimize(tree, env, variables, unit_class)
+    # Com variáveis, a expressão é avaliada muitas vezes: gerar também o código sobre as componentes
+    kernel = codegen.generate(tree, env, constants, variables, unit_class) if variables else None
+    return CompiledExpression(source, compile(tree, '<string>', 'eval'), env, constants, kernel)
+
+
+def _code_names(code):
+    """Nomes globais e atributos usados por um objecto de código e pelos que contém."""
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= _code_names(constant)
+    return names
@@ -0,0 +1,57 @@
+"""
+Configuração do Gunicorn para servir a calculadora em produção.
+
+A aplicação é carregada (e aquecida, ver wsgi.py) no processo mestre antes
+do fork, pelo que os workers partilham por copy-on-write o NumPy, os
+templates compilados e o restante estado já inicializado.
+
+Variáveis de ambiente:
+    PORT: porta de escuta (por omissão 5000)
+    WEB_CONCURRENCY: número de processos worker (por omissão, um por CPU)
+    GUNICORN_THREADS: threads por worker (por omissão 2)
+    GUNICORN_TIMEOUT: tempo máximo de um pedido, em segundos (por omissão 30)
+    GUNICORN_MAX_REQUESTS: reciclar cada worker após este número de pedidos (0 desliga)
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = '-'
+
+
+def on_starting(server):
+    # Snapshots de métricas de execuções anteriores não devem ser somados aos actuais
+    import metrics
+    metrics.clear_directory()
+
+
+def when_ready(server):
+    # Mover os objectos criados no carregamento para fora do alcance do
+    # garbage collector, evitando que as recolhas nos workers tornem as
+    # páginas partilhadas em cópias privadas
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Métricas de cada worker começam do zero (o snapshot é por PID)
+    import metrics
+    metrics.reset()
+
+
+def worker_exit(server, worker):
+    # Gravar as métricas acumuladas desde o último snapshot periódico
+    import metrics
+    metrics.flush(force=True)
+
+
+def child_exit(server, worker):
+    # No mestre: fundir o snapshot do worker que saiu no dos workers retirados
+    import metrics
+    metrics.retire_worker(worker.pid)
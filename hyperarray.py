@@ -0,0 +1,859 @@
+"""
+Vectores de quaterniões e coquaterniões com avaliação diferida.
+
+Um QuaternionArray (ou CoquaternionArray) guarda N elementos num array
+NumPy (N, 4), com as componentes a, b, c, d em colunas. As operações não
+são calculadas de imediato: constroem um grafo de expressões, e só
+compute() o avalia. A avaliação é fundida e feita por blocos de linhas:
+para cada bloco, todos os nós do grafo são calculados em buffers do tamanho
+do bloco (que cabem na cache), e os buffers de nós que já não são
+necessários são reutilizados pelos seguintes. Assim, numa cadeia como
+(a*b + c).normalize().exp(), não há nenhum array temporário (N, 4): a
+memória extra é proporcional ao bloco e o array de entrada é lido uma só vez.
+
+As fórmulas são as das classes Quaternion e Coquaternion de hypercomplex.py
+(os produtos são calculados pela mesma ordem). Ao contrário dos métodos das
+classes, os elementos nulos ou singulares não lançam excepções: seguem as
+regras do NumPy (inf ou nan, com o aviso correspondente).
+
+As expressões da calculadora compiladas com variáveis
+(hypercomplex.compile_hypercomplex_expr) também podem ser avaliadas com
+vectores no lugar das variáveis, com evaluate_compiled.
+
+Exemplo:
+    q = QuaternionArray(np.random.rand(10**6, 4))
+    r = (q * q.conjugate() + 1).normalize().exp().compute()
+    r.to_numpy()   # array (10**6, 4)
+"""
+import numbers
+import operator
+
+import numpy as np
+
+from hypercomplex import Quaternion, UnitQuaternion, Coquaternion
+
+# Linhas por bloco na avaliação fundida: 4 componentes x 4096 floats = 128 KiB por buffer
+DEFAULT_BLOCK_SIZE = 4096
+
+# Limiar das classes abaixo do qual a parte vectorial é considerada nula
+_EPSILON = 1e-15
+
+# Produtos das classes, componente a componente: (sinal, componente do 1.º factor, do 2.º)
+_PRODUCTS = {
+    'Quaternion': (
+        ((1, 0, 0), (-1, 1, 1), (-1, 2, 2), (-1, 3, 3)),
+        ((1, 0, 1), (1, 1, 0), (1, 2, 3), (-1, 3, 2)),
+        ((1, 0, 2), (-1, 1, 3), (1, 2, 0), (1, 3, 1)),
+        ((1, 0, 3), (1, 1, 2), (-1, 2, 1), (1, 3, 0)),
+    ),
+    'Coquaternion': (
+        ((1, 0, 0), (-1, 1, 1), (1, 2, 2), (1, 3, 3)),
+        ((1, 1, 0), (1, 0, 1), (1, 3, 2), (-1, 2, 3)),
+        ((1, 2, 0), (1, 0, 2), (1, 3, 1), (-1, 1, 3)),
+        ((-1, 2, 1), (1, 1, 2), (1, 3, 0), (1, 0, 3)),
+    ),
+}
+
+# Sinais dos quadrados das componentes na norma usada pelo inverso
+_METRICS = {
+    'Quaternion': (1, 1, 1, 1),
+    'Coquaternion': (1, 1, -1, -1),
+}
+
+
+class _Node:
+    """
+    Nó do grafo de expressões.
+
+    Attributes:
+        kernel (callable): kernel(workspace, out, *valores) escreve o
+            resultado de um bloco em out; None para folhas e constantes
+        inputs (tuple): Nós de entrada
+        width (int): 4 para elementos da álgebra, 1 para reais
+        value: Array (N, 4) ou (N,) das folhas; número ou array (4, 1)
+            das constantes
+        constant (bool): True se o valor é o mesmo para todos os elementos
+    """
+
+    __slots__ = ('kernel', 'inputs', 'width', 'value', 'constant')
+
+    def __init__(self, kernel, inputs, width, value=None, constant=False):
+        self.kernel = kernel
+        self.inputs = inputs
+        self.width = width
+        self.value = value
+        self.constant = constant
+
+
+class _Workspace:
+    """Buffers (largura, bloco) reutilizados entre nós e entre blocos."""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.free = {1: [], 4: []}
+        self.allocated = 0
+
+    def acquire(self, width):
+        free = self.free[width]
+        if free:
+            return free.pop()
+        self.allocated += 1
+        return np.empty((width, self.block_size))
+
+    def release(self, buffer):
+        self.free[buffer.shape[0]].append(buffer)
+
+
+def _topological_order(root):
+    """Nós do grafo por ordem de avaliação (cada nó partilhado aparece uma só vez)."""
+    order, seen, stack = [], set(), [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.inputs) if id(child) not in seen)
+    return order
+
+
+def evaluate(root, length, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Avalia um grafo por blocos de linhas.
+
+    Args:
+        root (_Node): Nó cujo valor se pretende
+        length (int): Número de elementos
+        block_size (int): Linhas por bloco
+
+    Returns:
+        numpy.ndarray: Array (length, 4) ou (length,) com o resultado
+    """
+    if root.kernel is None:
+        return root.value
+    block_size = max(1, min(block_size, length))
+    order = _topological_order(root)
+    consumers = {}
+    for node in order:
+        for child in node.inputs:
+            consumers[id(child)] = consumers.get(id(child), 0) + 1
+
+    result = np.empty((length, root.width) if root.width == 4 else (length,))
+    workspace = _Workspace(block_size)
+    for start in range(0, length, block_size):
+        stop = min(length, start + block_size)
+        size = stop - start
+        values, buffers, remaining = {}, {}, dict(consumers)
+        for node in order:
+            if node.kernel is None:
+                values[id(node)] = _leaf_block(node, start, stop)
+                continue
+            buffer = workspace.acquire(node.width)
+            out = buffer[:, :size]
+            node.kernel(workspace, out, *(values[id(child)] for child in node.inputs))
+            values[id(node)] = out
+            buffers[id(node)] = buffer
+            # Os buffers das entradas sem mais consumidores ficam livres para os nós seguintes
+            for child in node.inputs:
+                remaining[id(child)] -= 1
+                if not remaining[id(child)] and id(child) in buffers:
+                    workspace.release(buffers.pop(id(child)))
+        output = values[id(root)]
+        if root.width == 4:
+            result[start:stop] = output.T
+        else:
+            result[start:stop] = output[0]
+        workspace.release(buffers.pop(id(root)))
+    return result
+
+
+def _leaf_block(node, start, stop):
+    """Valor de uma constante, ou vista (transposta) de uma folha no bloco."""
+    if node.constant:
+        return node.value
+    if node.width == 4:
+        return node.value[start:stop].T
+    return node.value[start:stop][np.newaxis, :]
+
+
+# Kernels (escrevem em out, com forma (largura, linhas do bloco))
+
+def _scratch(workspace, out):
+    """Buffer auxiliar de uma linha, com o tamanho do bloco corrente."""
+    buffer = workspace.acquire(1)
+    return buffer, buffer[0, :out.shape[1]]
+
+
+def _add(workspace, out, x, y):
+    np.add(x, y, out=out)
+
+
+def _subtract(workspace, out, x, y):
+    np.subtract(x, y, out=out)
+
+
+def _add_scalar(workspace, out, x, s):
+    # Só a parte real é afectada
+    out[...] = x
+    out[0:1] += s
+
+
+def _subtract_scalar(workspace, out, x, s):
+    out[...] = x
+    out[0:1] -= s
+
+
+def _scalar_subtract(workspace, out, s, x):
+    # s - q = (q - s) * -1
+    np.negative(x, out=out)
+    out[0:1] += s
+
+
+def _multiply_scalar(workspace, out, x, s):
+    np.multiply(x, s, out=out)
+
+
+def _scalar_multiply(workspace, out, s, x):
+    np.multiply(x, s, out=out)
+
+
+def _divide_scalar(workspace, out, x, s):
+    np.divide(x, s, out=out)
+
+
+def _negative(workspace, out, x):
+    np.negative(x, out=out)
+
+
+def _conjugate(workspace, out, x):
+    out[0] = x[0]
+    np.negative(x[1:], out=out[1:])
+
+
+def _real(workspace, out, x):
+    out[0] = x[0]
+    out[1:] = 0.0
+
+
+def _vectorial(workspace, out, x):
+    out[0] = 0.0
+    out[1:] = x[1:]
+
+
+def _product_kernel(algebra):
+    formulas = _PRODUCTS[algebra]
+
+    def multiply(workspace, out, x, y):
+        buffer, term = _scratch(workspace, out)
+        for row, formula in zip(out, formulas):
+            (sign, i, j), rest = formula[0], formula[1:]
+            np.multiply(x[i], y[j], out=row)
+            if sign < 0:
+                np.negative(row, out=row)
+            for sign, i, j in rest:
+                np.multiply(x[i], y[j], out=term)
+                (np.add if sign > 0 else np.subtract)(row, term, out=row)
+        workspace.release(buffer)
+    return multiply
+
+
+def _squared_norm(x, metric, out, term):
+    """Soma dos quadrados das componentes com os sinais da métrica, em out."""
+    np.square(x[0], out=out)
+    for sign, component in zip(metric[1:], x[1:]):
+        np.square(component, out=term)
+        (np.add if sign > 0 else np.subtract)(out, term, out=out)
+
+
+def _inverse_kernel(algebra):
+    metric = _METRICS[algebra]
+
+    def inverse(workspace, out, x):
+        norm_buffer, norm = _scratch(workspace, out)
+        term_buffer, term = _scratch(workspace, out)
+        _squared_norm(x, metric, norm, term)
+        np.divide(x[0], norm, out=out[0])
+        np.negative(x[1:], out=out[1:])
+        np.divide(out[1:], norm, out=out[1:])
+        workspace.release(norm_buffer)
+        workspace.release(term_buffer)
+    return inverse
+
+
+def _divide_kernel(algebra):
+    multiply, inverse = _product_kernel(algebra), _inverse_kernel(algebra)
+
+    def divide(workspace, out, x, y):
+        # x / y = x * y^-1
+        buffer = workspace.acquire(4)
+        inverted = buffer[:, :out.shape[1]]
+        inverse(workspace, inverted, y)
+        multiply(workspace, out, x, inverted)
+        workspace.release(buffer)
+    return divide
+
+
+def _scalar_divide_kernel(algebra):
+    inverse = _inverse_kernel(algebra)
+
+    def divide(workspace, out, s, x):
+        # s / q = s * q^-1
+        inverse(workspace, out, x)
+        np.multiply(out, s, out=out)
+    return divide
+
+
+def _norm_kernel(algebra):
+    metric = _METRICS[algebra]
+
+    def norm(workspace, out, x):
+        buffer, term = _scratch(workspace, out)
+        _squared_norm(x, metric, out[0], term)
+        if algebra == 'Coquaternion':
+            np.abs(out[0], out=out[0])
+        np.sqrt(out[0], out=out[0])
+        workspace.release(buffer)
+    return norm
+
+
+def _normalize_kernel(algebra):
+    metric = _METRICS[algebra]
+
+    def normalize(workspace, out, x):
+        # Quaternion.normalize (norma euclidiana) e Coquaternion.normalize_minkowski
+        # (nan se a norma de Minkowski ao quadrado for negativa)
+        norm_buffer, norm = _scratch(workspace, out)
+        term_buffer, term = _scratch(workspace, out)
+        _squared_norm(x, metric, norm, term)
+        np.sqrt(norm, out=norm)
+        np.divide(x, norm, out=out)
+        workspace.release(norm_buffer)
+        workspace.release(term_buffer)
+    return normalize
+
+
+def _renormalize_kernel(algebra):
+    metric = _METRICS[algebra]
+
+    def renormalize(workspace, out, x):
+        # x·(3 - |x|²)/2: aproxima x/|x| perto da norma 1, sem raiz quadrada
+        norm_buffer, norm = _scratch(workspace, out)
+        term_buffer, term = _scratch(workspace, out)
+        _squared_norm(x, metric, norm, term)
+        np.subtract(3.0, norm, out=norm)
+        np.multiply(norm, 0.5, out=norm)
+        np.multiply(x, norm, out=out)
+        workspace.release(norm_buffer)
+        workspace.release(term_buffer)
+    return renormalize
+
+
+def _quaternion_exp(workspace, out, x):
+    # exp(a + v) = e^a (cos|v| + v/|v| sin|v|), com v desprezável tratado como real
+    norm_buffer, norm = _scratch(workspace, out)
+    term_buffer, term = _scratch(workspace, out)
+    exp_buffer, exp_a = _scratch(workspace, out)
+    np.square(x[1], out=norm)
+    for component in x[2:]:
+        np.square(component, out=term)
+        np.add(norm, term, out=norm)
+    small = norm < _EPSILON ** 2
+    np.sqrt(norm, out=norm)
+    np.exp(x[0], out=exp_a)
+    np.cos(norm, out=term)
+    np.multiply(exp_a, term, out=out[0])
+    np.sin(norm, out=term)
+    np.multiply(exp_a, term, out=term)
+    norm[small] = 1.0
+    np.divide(term, norm, out=term)
+    np.multiply(x[1:], term, out=out[1:])
+    out[1:, small] = 0.0
+    for buffer in (norm_buffer, term_buffer, exp_buffer):
+        workspace.release(buffer)
+
+
+def _coquaternion_exp(workspace, out, x):
+    # Fórmulas de Coquaternion.exp consoante o tipo (T, L ou S) de b² - c² - d²
+    disc_buffer, disc = _scratch(workspace, out)
+    term_buffer, term = _scratch(workspace, out)
+    exp_buffer, exp_a = _scratch(workspace, out)
+    np.square(x[1], out=disc)
+    for component in x[2:]:
+        np.square(component, out=term)
+        np.subtract(disc, term, out=disc)
+    timelike = disc >= _EPSILON
+    spacelike = disc <= -_EPSILON
+    np.abs(disc, out=disc)
+    np.sqrt(disc, out=disc)
+    np.exp(x[0], out=exp_a)
+
+    # Parte real: e^a cos|v|, e^a cosh|v| ou e^a
+    np.copyto(term, 1.0)
+    np.cos(disc, out=term, where=timelike)
+    np.cosh(disc, out=term, where=spacelike)
+    np.multiply(exp_a, term, out=out[0])
+
+    # Parte vectorial: ω e^a sin|v|, ω e^a sinh|v| ou ω e^a, com ω = v/|v| (ou v se |v| for nulo)
+    np.sin(disc, out=term, where=timelike)
+    np.sinh(disc, out=term, where=spacelike)
+    np.copyto(term, 1.0, where=~(timelike | spacelike))
+    np.multiply(exp_a, term, out=term)
+    disc[disc < _EPSILON] = 1.0
+    np.divide(term, disc, out=term)
+    np.multiply(x[1:], term, out=out[1:])
+    for buffer in (disc_buffer, term_buffer, exp_buffer):
+        workspace.release(buffer)
+
+
+_EXP_KERNELS = {'Quaternion': _quaternion_exp, 'Coquaternion': _coquaternion_exp}
+
+# Kernels por classe, construídos uma única vez
+_KERNELS = {
+    algebra: {
+        'multiply': _product_kernel(algebra),
+        'divide': _divide_kernel(algebra),
+        'scalar_divide': _scalar_divide_kernel(algebra),
+        'inverse': _inverse_kernel(algebra),
+        'norm': _norm_kernel(algebra),
+        'normalize': _normalize_kernel(algebra),
+        'renormalize': _renormalize_kernel(algebra),
+        'exp': _EXP_KERNELS[algebra],
+    }
+    for algebra in _PRODUCTS
+}
+
+# Kernels dos reais (largura 1): as operações do NumPy aplicam-se directamente
+_REAL_KERNELS = {
+    'add': lambda workspace, out, x, y: np.add(x, y, out=out),
+    'subtract': lambda workspace, out, x, y: np.subtract(x, y, out=out),
+    'multiply': lambda workspace, out, x, y: np.multiply(x, y, out=out),
+    'divide': lambda workspace, out, x, y: np.divide(x, y, out=out),
+    'negative': lambda workspace, out, x: np.negative(x, out=out),
+    'sqrt': lambda workspace, out, x: np.sqrt(x, out=out),
+}
+
+
+def _constant(value):
+    return _Node(None, (), 1, value, constant=True)
+
+
+class _LazyArray:
+    """Base dos vectores diferidos: um nó do grafo e o número de elementos."""
+
+    __array_ufunc__ = None  # os arrays NumPy delegam nos operadores reflectidos
+
+    def __init__(self, node, length):
+        self._node = node
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def is_computed(self):
+        """True se o valor já está materializado (folha do grafo)."""
+        return self._node.kernel is None
+
+    def compute(self, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Avalia o grafo por blocos fundidos.
+
+        Args:
+            block_size (int): Linhas por bloco
+
+        Returns:
+            Vector do mesmo tipo, já materializado
+        """
+        if self.is_computed:
+            return self
+        return type(self)(evaluate(self._node, self._length, block_size))
+
+    def to_numpy(self, block_size=DEFAULT_BLOCK_SIZE):
+        """Array NumPy com os valores (avaliando o grafo, se necessário)."""
+        return self.compute(block_size)._node.value
+
+    def _derive(self, cls, kernel, *operands, width):
+        return cls._from_node(_Node(kernel, tuple(operands), width), self._length)
+
+    @classmethod
+    def _from_node(cls, node, length):
+        array = cls.__new__(cls)
+        _LazyArray.__init__(array, node, length)
+        return array
+
+    def _check_length(self, other):
+        if len(other) != self._length:
+            raise ValueError(f"Vectores com tamanhos diferentes: {self._length} e {len(other)}")
+
+
+class RealArray(_LazyArray):
+    """
+    Vector diferido de números reais (p.ex. as normas de um QuaternionArray).
+
+    Args:
+        data (array_like): Valores, com forma (N,)
+    """
+
+    def __init__(self, data):
+        data = np.ascontiguousarray(data, dtype=float)
+        if data.ndim != 1:
+            raise ValueError(f"Esperado um array (N,), recebido {data.shape}")
+        super().__init__(_Node(None, (), 1, data), len(data))
+
+    def __repr__(self):
+        state = 'calculado' if self.is_computed else 'diferido'
+        return f"RealArray(N={self._length}, {state})"
+
+    def _operand(self, other):
+        if isinstance(other, RealArray):
+            self._check_length(other)
+            return other._node
+        if isinstance(other, numbers.Real):
+            return _constant(float(other))
+        return None
+
+    def _binary(self, other, name, reflected=False):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        operands = (operand, self._node) if reflected else (self._node, operand)
+        return self._derive(RealArray, _REAL_KERNELS[name], *operands, width=1)
+
+    def __add__(self, other):
+        return self._binary(other, 'add')
+
+    def __radd__(self, other):
+        return self._binary(other, 'add', reflected=True)
+
+    def __sub__(self, other):
+        return self._binary(other, 'subtract')
+
+    def __rsub__(self, other):
+        return self._binary(other, 'subtract', reflected=True)
+
+    def __mul__(self, other):
+        return self._binary(other, 'multiply')
+
+    def __rmul__(self, other):
+        return self._binary(other, 'multiply', reflected=True)
+
+    def __truediv__(self, other):
+        return self._binary(other, 'divide')
+
+    def __rtruediv__(self, other):
+        return self._binary(other, 'divide', reflected=True)
+
+    def __neg__(self):
+        return self._derive(RealArray, _REAL_KERNELS['negative'], self._node, width=1)
+
+    def sqrt(self):
+        """Raiz quadrada de cada elemento."""
+        return self._derive(RealArray, _REAL_KERNELS['sqrt'], self._node, width=1)
+
+
+class _HypercomplexArray(_LazyArray):
+    """
+    Base de QuaternionArray e CoquaternionArray.
+
+    Um vector marcado como unitário (unit=True, ou o resultado de
+    normalize()) tem elementos de norma 1 (de Minkowski, nos coquaterniões):
+    o inverso é o conjugado, normalize() não faz nada e a divisão por outro
+    vector unitário é o produto pelo conjugado. A marca passa aos produtos,
+    conjugados e simétricos de vectores unitários; como em UnitQuaternion, as
+    cadeias de produtos são renormalizadas de RENORMALIZE_EVERY em
+    RENORMALIZE_EVERY produtos.
+
+    Args:
+        data (array_like): Array (N, 4) com as componentes a, b, c, d, ou
+            sequência de elementos da álgebra
+        unit (bool): Se os elementos já são unitários (não é verificado)
+    """
+
+    element_class = None
+
+    # Produtos encadeados entre renormalizações dos vectores unitários (0 desactiva)
+    RENORMALIZE_EVERY = UnitQuaternion.RENORMALIZE_EVERY
+
+    _unit = False
+    _products = 0
+
+    def __init__(self, data, unit=False):
+        if len(data) and isinstance(data[0], self.element_class):
+            data = [(x.a, x.b, x.c, x.d) for x in data]
+        data = np.ascontiguousarray(data, dtype=float)
+        if data.size == 0:
+            data = data.reshape(0, 4)
+        if data.ndim != 2 or data.shape[1] != 4:
+            raise ValueError(f"Esperado um array (N, 4), recebido {data.shape}")
+        super().__init__(_Node(None, (), 4, data), len(data))
+        self._unit = bool(unit)
+
+    @property
+    def is_unit(self):
+        """True se os elementos são unitários (ver a marca unit)."""
+        return self._unit
+
+    def _mark_unit(self, products=0):
+        """Marca o vector como unitário, com o número de produtos desde a última normalização."""
+        self._unit = True
+        self._products = products
+        return self
+
+    def compute(self, block_size=DEFAULT_BLOCK_SIZE):
+        result = super().compute(block_size)
+        if self._unit and result is not self:
+            result._mark_unit(self._products)
+        return result
+
+    def _is_unit_operand(self, other):
+        return (isinstance(other, type(self)) and other._unit) or isinstance(other, UnitQuaternion)
+
+    def _unit_product(self, product, other):
+        """Marca o produto de dois factores unitários (renormalizando a cadeia, se for caso disso)."""
+        if product is NotImplemented or not (self._unit and self._is_unit_operand(other)):
+            return product
+        products = max(self._products, getattr(other, '_products', 0)) + 1
+        if self.RENORMALIZE_EVERY and products >= self.RENORMALIZE_EVERY:
+            return product.renormalize()
+        return product._mark_unit(products)
+
+    @property
+    def _kernels(self):
+        return _KERNELS[self.element_class.__name__]
+
+    def __repr__(self):
+        state = 'calculado' if self.is_computed else 'diferido'
+        return f"{type(self).__name__}(N={self._length}, {state})"
+
+    def _element(self, row):
+        if self._unit and self.element_class is Quaternion:
+            return UnitQuaternion._unchecked(*(float(x) for x in row))
+        return self.element_class(*row)
+
+    def __getitem__(self, index):
+        """Elemento (objecto da álgebra) na posição indicada (UnitQuaternion num vector unitário)."""
+        return self._element(self.to_numpy()[index])
+
+    def __iter__(self):
+        return (self._element(row) for row in self.to_numpy())
+
+    def _operand(self, other):
+        """Nó e tipo ('H' ou 'S') de um operando, ou (None, None) se não suportado."""
+        if isinstance(other, type(self)):
+            self._check_length(other)
+            return other._node, 'H'
+        if isinstance(other, RealArray):
+            self._check_length(other)
+            return other._node, 'S'
+        if isinstance(other, self.element_class):
+            components = np.array([[other.a], [other.b], [other.c], [other.d]])
+            return _Node(None, (), 4, components, constant=True), 'H'
+        if isinstance(other, numbers.Real):
+            return _constant(float(other)), 'S'
+        return None, None
+
+    def _arithmetic(self, other, kernels, reflected=False):
+        """
+        Constrói o nó de uma operação binária.
+
+        Args:
+            kernels (dict): Kernel por tipos dos operandos ('HH', 'HS', 'SH')
+        """
+        operand, kind = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        kinds = kind + 'H' if reflected else 'H' + kind
+        operands = (operand, self._node) if reflected else (self._node, operand)
+        return self._derive(type(self), kernels[kinds], *operands, width=4)
+
+    def __add__(self, other):
+        return self._arithmetic(other, {'HH': _add, 'HS': _add_scalar})
+
+    def __radd__(self, other):
+        # A soma é comutativa: q + s
+        operand, kind = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        kernel = _add if kind == 'H' else _add_scalar
+        return self._derive(type(self), kernel, self._node, operand, width=4)
+
+    def __sub__(self, other):
+        return self._arithmetic(other, {'HH': _subtract, 'HS': _subtract_scalar})
+
+    def __rsub__(self, other):
+        return self._arithmetic(other, {'HH': _subtract, 'SH': _scalar_subtract}, reflected=True)
+
+    def __mul__(self, other):
+        product = self._arithmetic(other, {'HH': self._kernels['multiply'], 'HS': _multiply_scalar})
+        return self._unit_product(product, other)
+
+    def __rmul__(self, other):
+        product = self._arithmetic(other, {'HH': self._kernels['multiply'], 'SH': _scalar_multiply}, reflected=True)
+        return self._unit_product(product, other)
+
+    def __truediv__(self, other):
+        if self._unit and self._is_unit_operand(other):
+            return self * other.conjugate()
+        return self._arithmetic(other, {'HH': self._kernels['divide'], 'HS': _divide_scalar})
+
+    def __rtruediv__(self, other):
+        if self._unit:
+            # other / q = other * conj(q)
+            return self.conjugate().__rmul__(other)
+        return self._arithmetic(other, {'HH': self._kernels['divide'], 'SH': self._kernels['scalar_divide']},
+                                reflected=True)
+
+    def __neg__(self):
+        result = self._derive(type(self), _negative, self._node, width=4)
+        return result._mark_unit(self._products) if self._unit else result
+
+    def __pow__(self, exponent):
+        """
+        Potência inteira de cada elemento, por produtos (exponenciação binária,
+        como em Quaternion.__pow__); os expoentes negativos usam o inverso.
+
+        Args:
+            exponent (int): Expoente
+
+        Returns:
+            Vector diferido com as potências
+        """
+        if not isinstance(exponent, numbers.Integral) or isinstance(exponent, bool):
+            return NotImplemented
+        if exponent == 0:
+            identity = np.zeros((self._length, 4))
+            identity[:, 0] = 1.0
+            return type(self)(identity, unit=self._unit)
+        base = self.inverse() if exponent < 0 else self
+        result, n = None, abs(int(exponent))
+        while n:
+            if n % 2 == 1:
+                result = base if result is None else result * base
+            n //= 2
+            if n:
+                base = base * base
+        return result
+
+    def _unary(self, kernel, cls=None):
+        cls = cls or type(self)
+        return self._derive(cls, kernel, self._node, width=1 if cls is RealArray else 4)
+
+    def conjugate(self):
+        """Conjugado de cada elemento."""
+        result = self._unary(_conjugate)
+        return result._mark_unit(self._products) if self._unit else result
+
+    def real(self):
+        """Parte real de cada elemento, como elemento da álgebra."""
+        return self._unary(_real)
+
+    def vectorial(self):
+        """Parte vectorial de cada elemento."""
+        return self._unary(_vectorial)
+
+    def inverse(self):
+        """Inverso de cada elemento (o conjugado, num vector unitário)."""
+        if self._unit:
+            return self.conjugate()
+        return self._unary(self._kernels['inverse'])
+
+    def norm(self):
+        """Norma de cada elemento (de Minkowski, em valor absoluto, nos coquaterniões)."""
+        return self._unary(self._kernels['norm'], RealArray)
+
+    def normalize(self):
+        """Cada elemento dividido pela sua norma (de Minkowski, nos coquaterniões), como vector unitário."""
+        if self._unit:
+            return self
+        return self._unary(self._kernels['normalize'])._mark_unit()
+
+    def renormalize(self):
+        """
+        Corrige a deriva da norma de um vector quase unitário: x·(3 - |x|²)/2,
+        sem raiz quadrada (ver UnitQuaternion.renormalize).
+
+        Returns:
+            Vector marcado como unitário
+        """
+        return self._unary(self._kernels['renormalize'])._mark_unit()
+
+    def exp(self):
+        """Exponencial de cada elemento."""
+        return self._unary(self._kernels['exp'])
+
+
+class QuaternionArray(_HypercomplexArray):
+    """Vector diferido de quaterniões, guardado num array (N, 4)."""
+
+    element_class = Quaternion
+
+
+class CoquaternionArray(_HypercomplexArray):
+    """Vector diferido de coquaterniões, guardado num array (N, 4)."""
+
+    element_class = Coquaternion
+
+
+# Funções das expressões da calculadora com equivalente nos vectores
+_ARRAY_FUNCTIONS = {
+    'conjugate': lambda x: x.conjugate(),
+    'real': lambda x: x.real(),
+    'vectorial': lambda x: x.vectorial(),
+    'inverse': lambda x: x.inverse(),
+    'norm': lambda x: x.norm(),
+    'normalize': lambda x: x.normalize(),
+    'exp': lambda x: x.exp(),
+    'neg': operator.neg,
+    'divR': operator.truediv,
+    'pow': operator.pow,
+    # Conversão no elemento da álgebra (expr_compiler.COERCION): os vectores já o são
+    '_element': lambda x: x,
+}
+
+
+def _array_function(name, scalar_function):
+    """Função do ambiente que, com vectores, usa a operação diferida correspondente."""
+    array_function = _ARRAY_FUNCTIONS.get(name)
+
+    def function(*args):
+        if not any(isinstance(arg, _LazyArray) for arg in args):
+            return scalar_function(*args)
+        if array_function is None:
+            raise ValueError(f"A função {name} não está disponível nos vectores")
+        return array_function(*args)
+    return function
+
+
+def evaluate_compiled(compiled, values):
+    """
+    Avalia uma expressão compilada com variáveis, sendo algumas delas vectores.
+
+    Os operadores e as funções de _ARRAY_FUNCTIONS constroem o grafo diferido;
+    as subexpressões só com números usam o ambiente da calculadora.
+
+    Args:
+        compiled (expr_compiler.CompiledExpression): Expressão compilada
+        values (dict): Valores das variáveis (vectores, elementos ou números)
+
+    Returns:
+        Vector diferido com o resultado (ou número, se não depender de vectores)
+
+    Raises:
+        ValueError: Se a expressão usar uma função ou uma operação sem
+            equivalente nos vectores (p.ex. uma potência não inteira)
+    """
+    scope = {
+        name: _array_function(name, value) if callable(value) and not isinstance(value, type) else value
+        for name, value in compiled.env.items()
+    }
+    # As constantes são só valores (números e elementos): a conversão do optimizador
+    # em conjugate(conjugate(x)) é a função _element do ambiente
+    scope.update(compiled.constants)
+    scope.update(values)
+    try:
+        return eval(compiled.code, {"__builtins__": {}}, scope)
+    except TypeError as e:
+        raise ValueError(f"A expressão não é avaliável nos vectores: {e}")
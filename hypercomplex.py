@@ -12,7 +12,10 @@ ki = j, ik = -j
 import re
 import math
 import cmath 
-import numpy as np
+import time
+import functools
+
+import expr_compiler
 
 class Quaternion:
     """
@@ -696,7 +699,267 @@ class Quaternion:
     def __repr__(self):
         """Representação detalhada do objecto para depuração."""
         return f"Quaternion({self.a}, {self.b}, {self.c}, {self.d})"
-    
+
+class UnitQuaternion(Quaternion):
+    """
+    Quaternião unitário (|q| = 1), como os que representam rotações.
+
+    A norma é fixada na construção, pelo que o inverso é o conjugado e
+    normalize() devolve o próprio quaternião, sem as divisões nem a raiz
+    quadrada de Quaternion. ln e as potências reais usam as fórmulas da
+    esfera unitária, q = cos θ + sin θ·u, sem o logaritmo da norma.
+
+    O produto de dois UnitQuaternion é um UnitQuaternion. Os erros de
+    arredondamento afastam lentamente a norma de 1 ao longo de uma cadeia de
+    produtos, por isso o resultado é renormalizado de RENORMALIZE_EVERY em
+    RENORMALIZE_EVERY produtos encadeados (com uma correcção de primeira
+    ordem, sem raiz quadrada).
+
+    As operações que não preservam a norma (soma, produto por escalar, exp,
+    ...) devolvem Quaternion, como na classe base.
+    """
+
+    # Produtos encadeados entre renormalizações (0 desactiva a renormalização)
+    RENORMALIZE_EVERY = 64
+
+    def __init__(self, a=1, b=0, c=0, d=0):
+        """
+        Inicializa um quaternião unitário, normalizando as componentes.
+
+        Args:
+            a (float): Parte real (escalar)
+            b (float): Coeficiente de i
+            c (float): Coeficiente de j
+            d (float): Coeficiente de k
+
+        Raises:
+            ZeroDivisionError: Se o quaternião for nulo
+        """
+        super().__init__(a, b, c, d)
+        norm = math.sqrt(self.a**2 + self.b**2 + self.c**2 + self.d**2)
+        epsilon = 1e-15
+        if norm < epsilon:
+            raise ZeroDivisionError("Normalização de quaternião (aproximadamente) nulo")
+        self.a /= norm
+        self.b /= norm
+        self.c /= norm
+        self.d /= norm
+        # Produtos encadeados desde a última normalização
+        self._products = 0
+
+    @staticmethod
+    def _unchecked(a, b, c, d, products=0):
+        """Constrói um quaternião unitário a partir de componentes float que já o são (sem normalizar)."""
+        q = object.__new__(UnitQuaternion)
+        q.a = a
+        q.b = b
+        q.c = c
+        q.d = d
+        q._products = products
+        return q
+
+    @classmethod
+    def from_quaternion(cls, q):
+        """
+        Quaternião unitário com a direcção de um quaternião.
+
+        Args:
+            q (Quaternion): Quaternião não nulo
+
+        Returns:
+            UnitQuaternion: q / |q|
+        """
+        return cls(q.a, q.b, q.c, q.d)
+
+    @classmethod
+    def from_axis_angle(cls, axis, angle):
+        """
+        Rotação de um ângulo em torno de um eixo: cos(θ/2) + sin(θ/2)·u.
+
+        Args:
+            axis (sequence): Eixo (x, y, z), não necessariamente unitário
+            angle (float): Ângulo, em radianos
+
+        Returns:
+            UnitQuaternion: Quaternião da rotação
+
+        Raises:
+            ZeroDivisionError: Se o eixo for nulo
+        """
+        x, y, z = axis
+        norm = math.sqrt(x*x + y*y + z*z)
+        epsilon = 1e-15
+        if norm < epsilon:
+            raise ZeroDivisionError("Eixo de rotação (aproximadamente) nulo")
+        factor = math.sin(0.5 * angle) / norm
+        return cls._unchecked(math.cos(0.5 * angle), x * factor, y * factor, z * factor)
+
+    @classmethod
+    def from_ln(cls, q):
+        """
+        Exponencial de um quaternião puro: exp(θ·u) = cos θ + sin θ·u (inversa de ln).
+
+        Args:
+            q (Quaternion): Quaternião puro (a parte real é ignorada)
+
+        Returns:
+            UnitQuaternion: exp(vectorial(q))
+        """
+        theta = math.sqrt(q.b**2 + q.c**2 + q.d**2)
+        epsilon = 1e-15
+        factor = math.sin(theta) / theta if theta >= epsilon else 1.0
+        return cls._unchecked(math.cos(theta), q.b * factor, q.c * factor, q.d * factor)
+
+    def _polar(self):
+        """
+        Ângulo θ e factor θ/sin θ de q = cos θ + sin θ·u, com sin θ·u a parte
+        vectorial (o factor é None se esta for nula).
+        """
+        norm_v = math.sqrt(self.b**2 + self.c**2 + self.d**2)
+        theta = math.atan2(norm_v, self.a)
+        epsilon = 1e-15
+        if norm_v < epsilon:
+            return theta, None
+        return theta, theta / norm_v
+
+    def _chained(self, a, b, c, d, other):
+        """Resultado do produto por outro UnitQuaternion, renormalizado de RENORMALIZE_EVERY em RENORMALIZE_EVERY."""
+        products = (self._products if self._products > other._products else other._products) + 1
+        if products >= self.RENORMALIZE_EVERY > 0:
+            factor = 0.5 * (3.0 - (a*a + b*b + c*c + d*d))
+            return UnitQuaternion._unchecked(a * factor, b * factor, c * factor, d * factor)
+        return UnitQuaternion._unchecked(a, b, c, d, products)
+
+    def __mul__(self, other):
+        """
+        Multiplicação; o produto por outro UnitQuaternion é unitário.
+
+        Args:
+            other: Quaternião, escalar real/complexo
+
+        Returns:
+            UnitQuaternion ou Quaternion: Resultado da multiplicação
+        """
+        if not isinstance(other, UnitQuaternion):
+            return super().__mul__(other)
+        a1, b1, c1, d1 = self.a, self.b, self.c, self.d
+        a2, b2, c2, d2 = other.a, other.b, other.c, other.d
+
+        a = a1*a2 - b1*b2 - c1*c2 - d1*d2
+        b = a1*b2 + b1*a2 + c1*d2 - d1*c2
+        c = a1*c2 - b1*d2 + c1*a2 + d1*b2
+        d = a1*d2 + b1*c2 - c1*b2 + d1*a2
+
+        return self._chained(a, b, c, d, other)
+
+    def __truediv__(self, other):
+        """
+        Divisão à direita; por outro UnitQuaternion é o produto pelo seu conjugado.
+
+        Args:
+            other: Quaternião ou escalar
+
+        Returns:
+            UnitQuaternion ou Quaternion: Resultado da divisão à direita
+        """
+        if not isinstance(other, UnitQuaternion):
+            return super().__truediv__(other)
+        # Produto pelo conjugado a2 - b2·i - c2·j - d2·k
+        a1, b1, c1, d1 = self.a, self.b, self.c, self.d
+        a2, b2, c2, d2 = other.a, other.b, other.c, other.d
+
+        a = a1*a2 + b1*b2 + c1*c2 + d1*d2
+        b = -a1*b2 + b1*a2 - c1*d2 + d1*c2
+        c = -a1*c2 + b1*d2 + c1*a2 - d1*b2
+        d = -a1*d2 - b1*c2 + c1*b2 + d1*a2
+
+        return self._chained(a, b, c, d, other)
+
+    def renormalize(self):
+        """
+        Corrige a deriva da norma: q·(3 - |q|²)/2, que aproxima q/|q| com
+        erro da ordem de (|q|² - 1)², sem raiz quadrada.
+
+        Returns:
+            UnitQuaternion: Quaternião renormalizado
+        """
+        factor = 0.5 * (3.0 - (self.a**2 + self.b**2 + self.c**2 + self.d**2))
+        return UnitQuaternion._unchecked(self.a * factor, self.b * factor, self.c * factor, self.d * factor)
+
+    def conjugate(self):
+        """
+        Conjugado do quaternião: q* = a - bi - cj - dk
+
+        Returns:
+            UnitQuaternion: Conjugado (e inverso) do quaternião
+        """
+        return UnitQuaternion._unchecked(self.a, -self.b, -self.c, -self.d, self._products)
+
+    def inverse(self):
+        """
+        Inverso do quaternião unitário: o conjugado.
+
+        Returns:
+            UnitQuaternion: Inverso do quaternião
+        """
+        return UnitQuaternion._unchecked(self.a, -self.b, -self.c, -self.d, self._products)
+
+    def norm_squared(self):
+        """Norma ao quadrado (1)."""
+        return 1.0
+
+    def norm(self):
+        """Norma (1)."""
+        return 1.0
+
+    def normalize(self):
+        """O próprio quaternião, que já é unitário."""
+        return self
+
+    def ln(self):
+        """
+        Logaritmo natural de q = cos θ + sin θ·u: θ·u (a parte real, ln|q|, é nula).
+
+        Returns:
+            Quaternion: Quaternião puro θ·u
+        """
+        theta, factor = self._polar()
+        if factor is None:
+            # Como em _apply_complex_func_to_quaternion: ln(-1) = πi
+            return Quaternion(0.0, theta, 0.0, 0.0)
+        return Quaternion(0.0, factor * self.b, factor * self.c, factor * self.d)
+
+    def __pow__(self, exponent):
+        """
+        Potenciação. Com expoente real t, q^t = cos(tθ) + sin(tθ)·u é unitário.
+
+        Args:
+            exponent: O expoente (inteiro, real ou quaternião)
+
+        Returns:
+            UnitQuaternion ou Quaternion: Resultado da potenciação
+
+        Raises:
+            TypeError: Se o expoente não for um tipo suportado
+        """
+        if not isinstance(exponent, (int, float)):
+            return super().__pow__(exponent)
+        theta, factor = self._polar()
+        angle = exponent * theta
+        if factor is None:
+            return UnitQuaternion._unchecked(math.cos(angle), math.sin(angle), 0.0, 0.0)
+        scale = math.sin(angle) * factor / theta
+        return UnitQuaternion._unchecked(math.cos(angle), scale * self.b, scale * self.c, scale * self.d)
+
+    def sqrt(self):
+        """Raiz quadrada principal (unitária) do quaternião."""
+        return self ** 0.5
+
+    def __repr__(self):
+        """Representação detalhada do objecto para depuração."""
+        return f"UnitQuaternion({self.a}, {self.b}, {self.c}, {self.d})"
+
+
 class Coquaternion:
     """
     Classe que representa um coquaternião q = a + bi + cj + dk
@@ -1527,19 +1790,21 @@ class Coquaternion:
 
 # Funções de Parse para as Calculadoras
 
-def parse_quaternion_expr(expression):
+@functools.lru_cache(maxsize=1024)
+def _rewrite_hypercomplex_expr(expression, class_name):
     """
-    Parse e avalia expressões com quaterniões, suportando operações básicas,
-    potenciação (**), raiz quadrada (sqrt), divisões (divL, divR) e funções específicas.
+    Reescreve uma expressão da calculadora em código Python avaliável,
+    substituindo operadores, unidades imaginárias e negações unárias.
+    O formato é idêntico para quaterniões e coquaterniões; apenas muda
+    a classe usada para representar as unidades i, j e k. O resultado
+    é memorizado, pois as mesmas expressões repetem-se entre pedidos.
 
     Args:
-        expression (str): Expressão a ser avaliada
+        expression (str): Expressão introduzida pelo utilizador
+        class_name (str): 'Quaternion' ou 'Coquaternion'
 
     Returns:
-        Quaternion: Resultado da expressão
-
-    Raises:
-        ValueError: Se a expressão não puder ser avaliada
+        str: Expressão reescrita, pronta para eval()
     """
     # Substituições de operadores
     expression = expression.replace('×', '*')
@@ -1556,92 +1821,263 @@ def parse_quaternion_expr(expression):
     expression = re.sub(r'([a-oq-zA-OQ-Z_][a-oq-zA-OQ-Z0-9_]*)([ijk])(?!\w)', r'\1*\2', expression)
 
     # Substituir unidades imaginárias
-    expression = re.sub(r'\bi\b', 'Quaternion(0,1,0,0)', expression)
-    expression = re.sub(r'\bj\b', 'Quaternion(0,0,1,0)', expression)
-    expression = re.sub(r'\bk\b', 'Quaternion(0,0,0,1)', expression)
-
-    # Ambiente seguro para avaliação
-    safe_env = {
-        'Quaternion': Quaternion,
-        'math': math,
-        'pi': math.pi,
-        'e': math.e,
-        
-        # Funções específicas de Quaterniões
-        'conjugate': lambda q: q.conjugate() if isinstance(q, Quaternion) else Quaternion(q).conjugate(),
-        'norm': lambda q: q.norm() if isinstance(q, Quaternion) else abs(q),
-        'vectorial': lambda q: q.vectorial() if isinstance(q, Quaternion) else Quaternion(0,0,0,0),
-        'real': lambda q: q.real() if isinstance(q, Quaternion) else Quaternion(q),
-        'sqrt': lambda q: q.sqrt() if isinstance(q, Quaternion) else math.sqrt(q),
-        'inverse': lambda q: q.inverse() if isinstance(q, Quaternion) else 1.0/q,
-        'normalize': lambda q: q.normalize() if isinstance(q, Quaternion) else (q/abs(q) if q != 0 else 0),
-        'arg': lambda q: q.arg() if isinstance(q, Quaternion) else math.atan2(0, q) if q >= 0 else math.pi,
-
-        # Funções trigonométricas e hiperbólicas
-        'sin': lambda q: q.sin() if isinstance(q, Quaternion) else math.sin(q),
-        'cos': lambda q: q.cos() if isinstance(q, Quaternion) else math.cos(q),
-        'tan': lambda q: q.tan() if isinstance(q, Quaternion) else math.tan(q),
-        'asin': lambda q: q.asin() if isinstance(q, Quaternion) else math.asin(q),
-        'acos': lambda q: q.acos() if isinstance(q, Quaternion) else math.acos(q),
-        'atan': lambda q: q.atan() if isinstance(q, Quaternion) else math.atan(q),
-        'sinh': lambda q: q.sinh() if isinstance(q, Quaternion) else math.sinh(q),
-        'cosh': lambda q: q.cosh() if isinstance(q, Quaternion) else math.cosh(q),
-        'tanh': lambda q: q.tanh() if isinstance(q, Quaternion) else math.tanh(q),
-        'asinh': lambda q: q.asinh() if isinstance(q, Quaternion) else math.asinh(q),
-        'acosh': lambda q: q.acosh() if isinstance(q, Quaternion) else Quaternion(float(q)).acosh(),
-        'atanh': lambda q: q.atanh() if isinstance(q, Quaternion) else math.atanh(q),
-        'exp': lambda q: q.exp() if isinstance(q, Quaternion) else math.exp(q),
-        'ln': lambda q: q.ln() if isinstance(q, Quaternion) else math.log(q),
-        
-        # Divisões específicas
-        'divL': lambda q, p: (Quaternion(q) if not isinstance(q, Quaternion) else q).left_division(
-                            Quaternion(p) if not isinstance(p, Quaternion) else p),
-        'divR': lambda q, p: (Quaternion(q) if not isinstance(q, Quaternion) else q) / 
-                            (Quaternion(p) if not isinstance(p, Quaternion) else p),
-        
-        # Operações especiais
-        'neg': lambda q: Quaternion(-q.a, -q.b, -q.c, -q.d) if isinstance(q, Quaternion) else -q,
-        'absIJK': lambda q: q.vec_norm() if isinstance(q, Quaternion) else 0,
-        'sign': lambda q: q.vec_normalize() if isinstance(q, Quaternion) else Quaternion(0, 0, 0, 0),
-        'pow10': lambda q: q.ten_power() if isinstance(q, Quaternion) else math.pow(10, q),
-        'pow': lambda q, n: q.__pow__(n) if isinstance(q, Quaternion) else math.pow(q, n),
-    }
+    expression = re.sub(r'\bi\b', f'{class_name}(0,1,0,0)', expression)
+    expression = re.sub(r'\bj\b', f'{class_name}(0,0,1,0)', expression)
+    expression = re.sub(r'\bk\b', f'{class_name}(0,0,0,1)', expression)
 
-    try:
-        # Processar negações unárias
-        expression = re.sub(r'(\w|\)|\d)\s*-\s*', r'\1 __MINUS__ ', expression)
-        
-        neg_pattern = r'-(\w+\(.*?\))'
-        while re.search(neg_pattern, expression):
-            expression = re.sub(neg_pattern, r'neg(\1)', expression)
-        
-        expression = re.sub(r'-([ijk])\b', r'neg(\1)', expression)
-        expression = re.sub(r'(?<![a-zA-Z0-9_])-(\d+(\.\d+)?)', r'neg(\1)', expression)
-        expression = expression.replace('__MINUS__', '-')
-
-        # Processar negações de divisões
-        neg_func_pattern = r'-\s*(divL|divR)\s*\('
-        if re.search(neg_func_pattern, expression):
-            expression = re.sub(neg_func_pattern, r' - neg(\1(', expression)
+    # Processar negações unárias
+    expression = re.sub(r'(\w|\)|\d)\s*-\s*', r'\1 __MINUS__ ', expression)
+    
+    neg_pattern = r'-(\w+\(.*?\))'
+    while re.search(neg_pattern, expression):
+        expression = re.sub(neg_pattern, r'neg(\1)', expression)
+    
+    expression = re.sub(r'-([ijk])\b', r'neg(\1)', expression)
+    expression = re.sub(r'(?<![a-zA-Z0-9_])-(\d+(\.\d+)?)', r'neg(\1)', expression)
+    expression = expression.replace('__MINUS__', '-')
+
+    # Processar negações de divisões
+    neg_func_pattern = r'-\s*(divL|divR)\s*\('
+    if re.search(neg_func_pattern, expression):
+        expression = re.sub(neg_func_pattern, r' - neg(\1(', expression)
+        
+        for match in re.finditer(r'neg\((divL|divR)\(', expression):
+            start_pos = match.end() - 1
+            count = 1
+            close_pos = start_pos
             
-            for match in re.finditer(r'neg\((divL|divR)\(', expression):
-                start_pos = match.end() - 1
-                count = 1
-                close_pos = start_pos
-                
-                for i in range(start_pos + 1, len(expression)):
-                    if expression[i] == '(':
-                        count += 1
-                    elif expression[i] == ')':
-                        count -= 1
-                        if count == 0:
-                            close_pos = i
-                            break
-                        
-                if close_pos < len(expression) and count == 0:
-                    expression = expression[:close_pos+1] + ')' + expression[close_pos+1:]
-        
-        result = eval(expression, {"__builtins__": {}}, safe_env)
+            for i in range(start_pos + 1, len(expression)):
+                if expression[i] == '(':
+                    count += 1
+                elif expression[i] == ')':
+                    count -= 1
+                    if count == 0:
+                        close_pos = i
+                        break
+                    
+            if close_pos < len(expression) and count == 0:
+                expression = expression[:close_pos+1] + ')' + expression[close_pos+1:]
+
+    return expression
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expression(expression, class_name, variables=()):
+    """
+    Optimiza e compila (com memorização) uma expressão já reescrita.
+
+    As subárvores constantes são avaliadas aqui uma única vez (ver
+    expr_compiler), pelo que as avaliações seguintes fazem o mínimo trabalho.
+
+    Args:
+        expression (str): Expressão devolvida por _rewrite_hypercomplex_expr
+        class_name (str): 'Quaternion' ou 'Coquaternion'
+        variables (tuple): Nomes (ordenados) cujo valor é indicado em cada avaliação
+
+    Returns:
+        expr_compiler.CompiledExpression: Código e constantes prontos a avaliar
+
+    Raises:
+        SyntaxError: Se a expressão reescrita não for Python válido
+    """
+    env, unit_class = _ENVIRONMENTS[class_name]
+    return expr_compiler.compile_expression(expression, env, variables, unit_class)
+
+def clear_expression_caches():
+    """Descarta as expressões reescritas e compiladas memorizadas."""
+    _rewrite_hypercomplex_expr.cache_clear()
+    _compile_expression.cache_clear()
+
+def precompile_expression(expression, class_name):
+    """
+    Reescreve e compila uma expressão, deixando-a nas caches para avaliações futuras.
+
+    Args:
+        expression (str): Expressão introduzida pelo utilizador
+        class_name (str): 'Quaternion' ou 'Coquaternion'
+
+    Returns:
+        bool: True se a expressão reescrita compilou
+    """
+    try:
+        _compile_expression(_rewrite_hypercomplex_expr(expression, class_name), class_name)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+# Ambiente seguro para avaliação de expressões com quaterniões (copiado em cada
+# avaliação, para não partilhar estado entre pedidos)
+_QUATERNION_ENV = {
+    'Quaternion': Quaternion,
+    'math': math,
+    'pi': math.pi,
+    'e': math.e,
+    
+    # Funções específicas de Quaterniões
+    'conjugate': lambda q: q.conjugate() if isinstance(q, Quaternion) else Quaternion(q).conjugate(),
+    'norm': lambda q: q.norm() if isinstance(q, Quaternion) else abs(q),
+    'vectorial': lambda q: q.vectorial() if isinstance(q, Quaternion) else Quaternion(0,0,0,0),
+    'real': lambda q: q.real() if isinstance(q, Quaternion) else Quaternion(q),
+    'sqrt': lambda q: q.sqrt() if isinstance(q, Quaternion) else math.sqrt(q),
+    'inverse': lambda q: q.inverse() if isinstance(q, Quaternion) else 1.0/q,
+    'normalize': lambda q: q.normalize() if isinstance(q, Quaternion) else (q/abs(q) if q != 0 else 0),
+    'arg': lambda q: q.arg() if isinstance(q, Quaternion) else math.atan2(0, q) if q >= 0 else math.pi,
+
+    # Funções trigonométricas e hiperbólicas
+    'sin': lambda q: q.sin() if isinstance(q, Quaternion) else math.sin(q),
+    'cos': lambda q: q.cos() if isinstance(q, Quaternion) else math.cos(q),
+    'tan': lambda q: q.tan() if isinstance(q, Quaternion) else math.tan(q),
+    'asin': lambda q: q.asin() if isinstance(q, Quaternion) else math.asin(q),
+    'acos': lambda q: q.acos() if isinstance(q, Quaternion) else math.acos(q),
+    'atan': lambda q: q.atan() if isinstance(q, Quaternion) else math.atan(q),
+    'sinh': lambda q: q.sinh() if isinstance(q, Quaternion) else math.sinh(q),
+    'cosh': lambda q: q.cosh() if isinstance(q, Quaternion) else math.cosh(q),
+    'tanh': lambda q: q.tanh() if isinstance(q, Quaternion) else math.tanh(q),
+    'asinh': lambda q: q.asinh() if isinstance(q, Quaternion) else math.asinh(q),
+    'acosh': lambda q: q.acosh() if isinstance(q, Quaternion) else Quaternion(float(q)).acosh(),
+    'atanh': lambda q: q.atanh() if isinstance(q, Quaternion) else math.atanh(q),
+    'exp': lambda q: q.exp() if isinstance(q, Quaternion) else math.exp(q),
+    'ln': lambda q: q.ln() if isinstance(q, Quaternion) else math.log(q),
+    
+    # Divisões específicas
+    'divL': lambda q, p: (Quaternion(q) if not isinstance(q, Quaternion) else q).left_division(
+                        Quaternion(p) if not isinstance(p, Quaternion) else p),
+    'divR': lambda q, p: (Quaternion(q) if not isinstance(q, Quaternion) else q) / 
+                        (Quaternion(p) if not isinstance(p, Quaternion) else p),
+    
+    # Operações especiais
+    'neg': lambda q: Quaternion(-q.a, -q.b, -q.c, -q.d) if isinstance(q, Quaternion) else -q,
+    'absIJK': lambda q: q.vec_norm() if isinstance(q, Quaternion) else 0,
+    'sign': lambda q: q.vec_normalize() if isinstance(q, Quaternion) else Quaternion(0, 0, 0, 0),
+    'pow10': lambda q: q.ten_power() if isinstance(q, Quaternion) else math.pow(10, q),
+
+    # Conversão em Quaternion, usada pelo optimizador em conjugate(conjugate(x))
+    '_element': lambda q: q if isinstance(q, Quaternion) else Quaternion(q),
+    'pow': lambda q, n: q.__pow__(n) if isinstance(q, Quaternion) else math.pow(q, n),
+}
+
+# Ambiente específico para coquaterniões (copiado em cada avaliação)
+_COQUATERNION_ENV = {
+    'Coquaternion': Coquaternion,
+    'math': math,
+    'pi': math.pi,
+    'e': math.e,
+    
+    # Funções específicas de Coquaterniões
+    'conjugate': lambda q: q.conjugate() if isinstance(q, Coquaternion) else Coquaternion(q).conjugate(),
+    'norm': lambda q: q.norm() if isinstance(q, Coquaternion) else abs(q),
+    'vectorial': lambda q: q.vectorial() if isinstance(q, Coquaternion) else Coquaternion(0,0,0,0),
+    'real': lambda q: q.real() if isinstance(q, Coquaternion) else Coquaternion(q),
+    'sqrt': lambda q: q.sqrt() if hasattr(q, 'sqrt') and isinstance(q, Coquaternion) else math.sqrt(q),
+    'inverse': lambda q: q.inverse() if isinstance(q, Coquaternion) else 1.0/q,
+    'normalize': lambda q: q.normalize_minkowski() if isinstance(q, Coquaternion) else (q/abs(q) if q != 0 else 0),
+
+    # Funções trigonométricas e hiperbólicas
+    'sin': lambda q: q.sin() if isinstance(q, Coquaternion) else math.sin(q),
+    'cos': lambda q: q.cos() if isinstance(q, Coquaternion) else math.cos(q),
+    'tan': lambda q: q.tan() if isinstance(q, Coquaternion) else math.tan(q),
+    'sinh': lambda q: q.sinh() if isinstance(q, Coquaternion) else math.sinh(q),
+    'cosh': lambda q: q.cosh() if isinstance(q, Coquaternion) else math.cosh(q),
+    'tanh': lambda q: q.tanh() if isinstance(q, Coquaternion) else math.tanh(q),
+    'atan': lambda q: q.atan() if isinstance(q, Coquaternion) else math.atan(q),
+    'exp': lambda q: q.exp() if isinstance(q, Coquaternion) else math.exp(q),
+    'ln': lambda q: q.ln() if isinstance(q, Coquaternion) else math.log(q),
+    'log': lambda q: q.ln() if isinstance(q, Coquaternion) else math.log(q),
+    
+    # Divisões específicas
+    'divL': lambda q, p: (Coquaternion(q) if not isinstance(q, Coquaternion) else q).left_division(
+                        Coquaternion(p) if not isinstance(p, Coquaternion) else p),
+    'divR': lambda q, p: (Coquaternion(q) if not isinstance(q, Coquaternion) else q) / 
+                        (Coquaternion(p) if not isinstance(p, Coquaternion) else p),
+    
+    # Operações especiais
+    'neg': lambda q: Coquaternion(-q.a, -q.b, -q.c, -q.d) if isinstance(q, Coquaternion) else -q,
+    'absIJK': lambda q: q.vec_norm() if isinstance(q, Coquaternion) else 0,
+    'sign': lambda q: q._get_omega_q() if isinstance(q, Coquaternion) else Coquaternion(0, 0, 0, 0),
+    'norm_mink': lambda q: q.norm_minkowski() if isinstance(q, Coquaternion) else abs(q),
+    'normalize_mink': lambda q: q.normalize_minkowski() if isinstance(q, Coquaternion) else (q/abs(q) if q != 0 else 0),
+    'pow': lambda q, n: q.__pow__(n) if isinstance(q, Coquaternion) else math.pow(q, n),
+    'pow10': lambda q: q.ten_power() if isinstance(q, Coquaternion) else math.pow(10, q),
+
+    # Conversão em Coquaternion, usada pelo optimizador em conjugate(conjugate(x))
+    '_element': lambda q: q if isinstance(q, Coquaternion) else Coquaternion(q),
+}
+
+_ENVIRONMENTS = {
+    'Quaternion': (_QUATERNION_ENV, Quaternion),
+    'Coquaternion': (_COQUATERNION_ENV, Coquaternion),
+}
+
+def compile_hypercomplex_expr(expression, class_name, variables=()):
+    """
+    Reescreve e compila uma expressão com variáveis, para a avaliar várias vezes.
+
+    Ao contrário de parse_*_expr, não há parser alternativo: os erros de
+    sintaxe propagam-se e os de avaliação surgem em evaluate(). A compilação
+    é memorizada, pelo que pedir de novo a mesma expressão não a recompila.
+
+    Args:
+        expression (str): Expressão introduzida pelo utilizador
+        class_name (str): 'Quaternion' ou 'Coquaternion'
+        variables (iterable): Nomes cujo valor é indicado em cada avaliação
+
+    Returns:
+        expr_compiler.CompiledExpression: Expressão a avaliar com evaluate(valores)
+
+    Raises:
+        SyntaxError: Se a expressão reescrita não for Python válido
+    """
+    rewritten = _rewrite_hypercomplex_expr(expression, class_name)
+    return _compile_expression(rewritten, class_name, tuple(sorted(set(variables))))
+
+def is_reserved_name(name, class_name):
+    """
+    Indica se um nome não pode ser usado como variável ou função do utilizador.
+
+    Args:
+        name (str): Identificador
+        class_name (str): 'Quaternion' ou 'Coquaternion'
+
+    Returns:
+        bool: True se o nome pertence ao ambiente (funções, pi, e) ou é
+            alterado pela reescrita (unidades i, j, k)
+    """
+    env, _ = _ENVIRONMENTS[class_name]
+    return name in env or _rewrite_hypercomplex_expr(name, class_name) != name
+
+def parse_quaternion_expr(expression, stats=None, variables=None):
+    """
+    Parse e avalia expressões com quaterniões, suportando operações básicas,
+    potenciação (**), raiz quadrada (sqrt), divisões (divL, divR) e funções específicas.
+
+    Args:
+        expression (str): Expressão a ser avaliada
+        stats (dict, optional): Se fornecido, recebe o tempo (em segundos) de cada
+            etapa: 'rewrite', 'eval' e, quando usado, 'from_string'; recebe
+            também a expressão reescrita em 'rewritten'
+        variables (dict, optional): Valores das variáveis e funções do
+            utilizador (ver workspace), por nome
+
+    Returns:
+        Quaternion: Resultado da expressão
+
+    Raises:
+        ValueError: Se a expressão não puder ser avaliada
+    """
+    start = time.perf_counter()
+    expression = _rewrite_hypercomplex_expr(expression, 'Quaternion')
+
+    rewritten = time.perf_counter()
+    if stats is not None:
+        stats['rewrite'] = rewritten - start
+        stats['rewritten'] = expression
+
+    try:
+        if variables:
+            result = _compile_expression(expression, 'Quaternion', tuple(sorted(variables))).evaluate(variables)
+        else:
+            result = _compile_expression(expression, 'Quaternion').evaluate()
+        if stats is not None:
+            stats['eval'] = time.perf_counter() - rewritten
 
         if isinstance(result, Quaternion):
             return result
@@ -1656,6 +2092,10 @@ def parse_quaternion_expr(expression):
                 raise ValueError(f"Resultado da expressão é de tipo não suportado: {type(result)}")
 
     except Exception as e:
+        failed = time.perf_counter()
+        if stats is not None:
+            stats['eval'] = failed - rewritten
+            stats['eval_error'] = type(e).__name__
         original_expression = expression
         original_expression = original_expression.replace('Quaternion(0,1,0,0)','i')
         original_expression = original_expression.replace('Quaternion(0,0,1,0)','j')
@@ -1666,14 +2106,22 @@ def parse_quaternion_expr(expression):
             import traceback
             tb_str = traceback.format_exc()
             raise ValueError(f"Erro ao avaliar expressão '{original_expression}'.\nDetalhe: {str(e)}\nParser alternativo falhou: {str(e_parse)}\nTraceback: {tb_str}")
+        finally:
+            if stats is not None:
+                stats['from_string'] = time.perf_counter() - failed
 
-def parse_coquaternion_expr(expression):
+def parse_coquaternion_expr(expression, stats=None, variables=None):
     """
     Parse e avalia expressões com coquaterniões, suportando operações específicas
     da álgebra de coquaterniões com métrica de Minkowski.
 
     Args:
         expression (str): Expressão a ser avaliada
+        stats (dict, optional): Se fornecido, recebe o tempo (em segundos) de cada
+            etapa: 'rewrite', 'eval' e, quando usado, 'from_string'; recebe
+            também a expressão reescrita em 'rewritten'
+        variables (dict, optional): Valores das variáveis e funções do
+            utilizador (ver workspace), por nome
 
     Returns:
         Coquaternion: Resultado da expressão
@@ -1681,101 +2129,22 @@ def parse_coquaternion_expr(expression):
     Raises:
         ValueError: Se a expressão não puder ser avaliada
     """
-    # Substituições básicas (igual aos quaterniões)
-    expression = expression.replace('×', '*')
-    expression = expression.replace('^', '**')
-    
-    expression = re.sub(r'√(\d+)', r'sqrt(\1)', expression)
-    expression = re.sub(r'√\(([^)]+)\)', r'sqrt(\1)', expression)
-    
-    expression = re.sub(r'(\d+)([ijk])(?!\w)', r'\1*\2', expression)
-    expression = re.sub(r'([ijk])(\d+)(?!\w)', r'\1*\2', expression)
-    expression = re.sub(r'(\w+\([^()]*(?:\([^()]*\)[^()]*)*\))([ijk])(?!\w)', r'\1*\2', expression)
-    expression = re.sub(r'([a-oq-zA-OQ-Z_][a-oq-zA-OQ-Z0-9_]*)([ijk])(?!\w)', r'\1*\2', expression)
+    start = time.perf_counter()
+    # Reescrita igual à dos quaterniões, com unidades do tipo Coquaternion
+    expression = _rewrite_hypercomplex_expr(expression, 'Coquaternion')
 
-    # Substituir unidades por Coquaternion
-    expression = re.sub(r'\bi\b', 'Coquaternion(0,1,0,0)', expression)
-    expression = re.sub(r'\bj\b', 'Coquaternion(0,0,1,0)', expression)
-    expression = re.sub(r'\bk\b', 'Coquaternion(0,0,0,1)', expression)
-
-    # Ambiente específico para coquaterniões
-    safe_env = {
-        'Coquaternion': Coquaternion,
-        'math': math,
-        'pi': math.pi,
-        'e': math.e,
-        
-        # Funções específicas de Coquaterniões
-        'conjugate': lambda q: q.conjugate() if isinstance(q, Coquaternion) else Coquaternion(q).conjugate(),
-        'norm': lambda q: q.norm() if isinstance(q, Coquaternion) else abs(q),
-        'vectorial': lambda q: q.vectorial() if isinstance(q, Coquaternion) else Coquaternion(0,0,0,0),
-        'real': lambda q: q.real() if isinstance(q, Coquaternion) else Coquaternion(q),
-        'sqrt': lambda q: q.sqrt() if hasattr(q, 'sqrt') and isinstance(q, Coquaternion) else math.sqrt(q),
-        'inverse': lambda q: q.inverse() if isinstance(q, Coquaternion) else 1.0/q,
-        'normalize': lambda q: q.normalize_minkowski() if isinstance(q, Coquaternion) else (q/abs(q) if q != 0 else 0),
-
-        # Funções trigonométricas e hiperbólicas
-        'sin': lambda q: q.sin() if isinstance(q, Coquaternion) else math.sin(q),
-        'cos': lambda q: q.cos() if isinstance(q, Coquaternion) else math.cos(q),
-        'tan': lambda q: q.tan() if isinstance(q, Coquaternion) else math.tan(q),
-        'sinh': lambda q: q.sinh() if isinstance(q, Coquaternion) else math.sinh(q),
-        'cosh': lambda q: q.cosh() if isinstance(q, Coquaternion) else math.cosh(q),
-        'tanh': lambda q: q.tanh() if isinstance(q, Coquaternion) else math.tanh(q),
-        'atan': lambda q: q.atan() if isinstance(q, Coquaternion) else math.atan(q),
-        'exp': lambda q: q.exp() if isinstance(q, Coquaternion) else math.exp(q),
-        'ln': lambda q: q.ln() if isinstance(q, Coquaternion) else math.log(q),
-        'log': lambda q: q.ln() if isinstance(q, Coquaternion) else math.log(q),
-        
-        # Divisões específicas
-        'divL': lambda q, p: (Coquaternion(q) if not isinstance(q, Coquaternion) else q).left_division(
-                            Coquaternion(p) if not isinstance(p, Coquaternion) else p),
-        'divR': lambda q, p: (Coquaternion(q) if not isinstance(q, Coquaternion) else q) / 
-                            (Coquaternion(p) if not isinstance(p, Coquaternion) else p),
-        
-        # Operações especiais
-        'neg': lambda q: Coquaternion(-q.a, -q.b, -q.c, -q.d) if isinstance(q, Coquaternion) else -q,
-        'absIJK': lambda q: q.vec_norm() if isinstance(q, Coquaternion) else 0,
-        'sign': lambda q: q._get_omega_q() if isinstance(q, Coquaternion) else Coquaternion(0, 0, 0, 0),
-        'norm_mink': lambda q: q.norm_minkowski() if isinstance(q, Coquaternion) else abs(q),
-        'normalize_mink': lambda q: q.normalize_minkowski() if isinstance(q, Coquaternion) else (q/abs(q) if q != 0 else 0),
-        'pow': lambda q, n: q.__pow__(n) if isinstance(q, Coquaternion) else math.pow(q, n),
-        'pow10': lambda q: q.ten_power() if isinstance(q, Coquaternion) else math.pow(10, q),
-    }
+    rewritten = time.perf_counter()
+    if stats is not None:
+        stats['rewrite'] = rewritten - start
+        stats['rewritten'] = expression
 
     try:
-        # Processar negações (mesmo processamento dos quaterniões)
-        expression = re.sub(r'(\w|\)|\d)\s*-\s*', r'\1 __MINUS__ ', expression)
-        
-        neg_pattern = r'-(\w+\(.*?\))'
-        while re.search(neg_pattern, expression):
-            expression = re.sub(neg_pattern, r'neg(\1)', expression)
-        
-        expression = re.sub(r'-([ijk])\b', r'neg(\1)', expression)
-        expression = re.sub(r'(?<![a-zA-Z0-9_])-(\d+(\.\d+)?)', r'neg(\1)', expression)
-        expression = expression.replace('__MINUS__', '-')
-
-        neg_func_pattern = r'-\s*(divL|divR)\s*\('
-        if re.search(neg_func_pattern, expression):
-            expression = re.sub(neg_func_pattern, r' - neg(\1(', expression)
-            
-            for match in re.finditer(r'neg\((divL|divR)\(', expression):
-                start_pos = match.end() - 1
-                count = 1
-                close_pos = start_pos
-                
-                for i in range(start_pos + 1, len(expression)):
-                    if expression[i] == '(':
-                        count += 1
-                    elif expression[i] == ')':
-                        count -= 1
-                        if count == 0:
-                            close_pos = i
-                            break
-                        
-                if close_pos < len(expression) and count == 0:
-                    expression = expression[:close_pos+1] + ')' + expression[close_pos+1:]
-        
-        result = eval(expression, {"__builtins__": {}}, safe_env)
+        if variables:
+            result = _compile_expression(expression, 'Coquaternion', tuple(sorted(variables))).evaluate(variables)
+        else:
+            result = _compile_expression(expression, 'Coquaternion').evaluate()
+        if stats is not None:
+            stats['eval'] = time.perf_counter() - rewritten
 
         if isinstance(result, Coquaternion):
             return result
@@ -1790,6 +2159,10 @@ def parse_coquaternion_expr(expression):
                 raise ValueError(f"Resultado da expressão é de tipo não suportado: {type(result)}")
 
     except Exception as e:
+        failed = time.perf_counter()
+        if stats is not None:
+            stats['eval'] = failed - rewritten
+            stats['eval_error'] = type(e).__name__
         original_expression = expression
         original_expression = original_expression.replace('Coquaternion(0,1,0,0)','i')
         original_expression = original_expression.replace('Coquaternion(0,0,1,0)','j')
@@ -1799,4 +2172,7 @@ def parse_coquaternion_expr(expression):
         except Exception as e_parse:
             import traceback
             tb_str = traceback.format_exc()
-            raise ValueError(f"Erro ao avaliar expressão '{original_expression}'.\nDetalhe: {str(e)}\nParser alternativo falhou: {str(e_parse)}\nTraceback: {tb_str}")
\ No newline at end of file
+            raise ValueError(f"Erro ao avaliar expressão '{original_expression}'.\nDetalhe: {str(e)}\nParser alternativo falhou: {str(e_parse)}\nTraceback: {tb_str}")
+        finally:
+            if stats is not None:
+                stats['from_string'] = time.perf_counter() - failed
@@ -0,0 +1,164 @@
+"""
+Conjuntos de Julia de quaterniões (e coquaterniões), em cortes 2D e 3D.
+
+Cada ponto de partida q0 de uma grelha é iterado por q -> q*q + c (ou por um
+mapa do utilizador, escrito como as expressões da calculadora em q e c) até
+que a norma euclidiana das componentes exceda o raio de fuga. O resultado é o
+tempo de fuga de cada ponto (a iteração em que saiu), ou max_iter para os
+pontos que nunca saíram.
+
+As iterações correm sobre vectores de hyperarray: o mapa é compilado uma vez
+e aplicado a todos os pontos activos de uma só vez, com a avaliação fundida
+por blocos. Após cada iteração, uma máscara de fuga regista os pontos que
+divergiram, que são retirados dos vectores assim que forem um quarto dos
+restantes: o custo de cada passo acompanha os pontos ainda activos e não a
+grelha inteira.
+
+A grelha é um corte do espaço de quatro dimensões: duas (imagem) ou três
+(volume) componentes variam e as restantes ficam fixas.
+
+Exemplo:
+    times = julia_slice(Quaternion(-0.2, 0.6, 0.2, 0), [(-1.5, 1.5), (-1.5, 1.5)], (800, 800))
+    png = imaging.encode_png(imaging.escape_time_coloring(times, 64)[::-1])
+"""
+import numbers
+
+import numpy as np
+
+import hyperarray
+from hypercomplex import Quaternion, Coquaternion, compile_hypercomplex_expr
+
+# Mapa iterado por omissão
+DEFAULT_MAP = 'q*q + c'
+
+DEFAULT_MAX_ITER = 64
+DEFAULT_ESCAPE_RADIUS = 2.0
+
+# Os vectores são compactados quando os pontos vivos descem abaixo desta fracção
+_COMPACT_FRACTION = 0.75
+
+# Vector de hyperarray de cada álgebra
+_ARRAY_CLASSES = {Quaternion: hyperarray.QuaternionArray, Coquaternion: hyperarray.CoquaternionArray}
+
+
+def grid_points(bounds, size, axes=(0, 1), origin=(0.0, 0.0, 0.0, 0.0)):
+    """
+    Pontos de um corte 2D ou 3D do espaço das componentes (a, b, c, d).
+
+    Args:
+        bounds (sequence): (mínimo, máximo) de cada componente que varia
+        size (sequence): Número de pontos ao longo de cada componente
+        axes (sequence): Índices (0 a 3) das componentes que variam
+        origin (sequence): Valores das componentes fixas
+
+    Returns:
+        tuple: (array (N, 4) com os pontos, forma da grelha). A forma é a de
+            size invertida, p.ex. (altura, largura) para axes=(0, 1): o último
+            índice percorre a primeira componente, como as colunas de uma imagem
+
+    Raises:
+        ValueError: Se as dimensões não forem coerentes
+    """
+    if not len(axes) == len(bounds) == len(size) or len(axes) not in (2, 3):
+        raise ValueError("São precisos 2 ou 3 eixos, com um intervalo e um tamanho cada")
+    if len(set(axes)) != len(axes) or not all(0 <= axis < 4 for axis in axes):
+        raise ValueError(f"Eixos inválidos: {tuple(axes)}")
+    if min(size) < 1:
+        raise ValueError(f"Tamanho inválido: {tuple(size)}")
+    coordinates = [np.linspace(low, high, count) for (low, high), count in zip(bounds, size)]
+    # indexing='ij' sobre os eixos invertidos: o primeiro eixo varia mais depressa
+    meshes = np.meshgrid(*reversed(coordinates), indexing='ij')
+    shape = meshes[0].shape
+    points = np.empty(shape + (4,))
+    points[...] = np.asarray(origin, dtype=float)
+    for axis, mesh in zip(axes, reversed(meshes)):
+        points[..., axis] = mesh
+    return points.reshape(-1, 4), shape
+
+
+def escape_time(points, c, max_iter=DEFAULT_MAX_ITER, escape_radius=DEFAULT_ESCAPE_RADIUS,
+                expression=DEFAULT_MAP, algebra=Quaternion, block_size=hyperarray.DEFAULT_BLOCK_SIZE):
+    """
+    Tempo de fuga de cada ponto de partida sob o mapa indicado.
+
+    Args:
+        points (array_like): Pontos de partida, array (N, 4)
+        c: Parâmetro do mapa: elemento da álgebra, número, ou array (N, 4)
+            com um valor por ponto (p.ex. points=0 e c=grelha, para o
+            conjunto de Mandelbrot)
+        max_iter (int): Número máximo de iterações
+        escape_radius (float): Raio a partir do qual um ponto divergiu
+        expression (str): Mapa, como expressão da calculadora em q e c
+        algebra (type): Quaternion ou Coquaternion
+        block_size (int): Linhas por bloco na avaliação fundida
+
+    Returns:
+        np.ndarray: Array int32 (N,) com a iteração (1 a max_iter) em que
+            cada ponto fugiu, ou max_iter se não fugiu
+
+    Raises:
+        ValueError: Se o mapa não for válido ou não for avaliável nos vectores
+    """
+    array_class = _ARRAY_CLASSES[algebra]
+    try:
+        compiled = compile_hypercomplex_expr(expression, algebra.__name__, ('q', 'c'))
+    except SyntaxError as e:
+        raise ValueError(f"Erro de sintaxe no mapa '{expression}': {e.msg}")
+
+    z = np.array(points, dtype=float).reshape(-1, 4)
+    per_point = not isinstance(c, (numbers.Number, algebra))
+    if per_point:
+        c = np.array(c, dtype=float).reshape(-1, 4)
+        if len(c) != len(z):
+            raise ValueError(f"c tem {len(c)} valores para {len(z)} pontos")
+    elif isinstance(c, numbers.Number):
+        c = algebra(c)
+
+    times = np.full(len(z), max_iter, dtype=np.int32)
+    index = np.arange(len(z))
+    alive = np.ones(len(z), dtype=bool)
+    radius_squared = escape_radius ** 2
+    # Os pontos divergentes podem chegar a inf/nan antes de serem retirados
+    with np.errstate(all='ignore'):
+        for iteration in range(1, max_iter + 1):
+            parameter = array_class(c) if per_point else c
+            result = hyperarray.evaluate_compiled(compiled, {'q': array_class(z), 'c': parameter})
+            if not isinstance(result, array_class):
+                raise ValueError(f"O mapa '{expression}' tem de dar um {algebra.__name__} que dependa de q")
+            z = result.to_numpy(block_size)
+
+            # Máscara de fuga (nan também conta como fuga): os pontos que
+            # divergiram ficam com o tempo registado e deixam de estar vivos
+            escaped = ~(np.einsum('ij,ij->i', z, z) <= radius_squared)
+            escaped &= alive
+            times[index[escaped]] = iteration
+            alive &= ~escaped
+            remaining = np.count_nonzero(alive)
+            if not remaining:
+                break
+            # Retirar os pontos mortos dos vectores custa uma cópia; só compensa
+            # quando já são uma fracção apreciável
+            if remaining <= _COMPACT_FRACTION * len(z):
+                z, index = z[alive], index[alive]
+                if per_point:
+                    c = c[alive]
+                alive = np.ones(remaining, dtype=bool)
+    return times
+
+
+def julia_slice(c, bounds, size, axes=(0, 1), origin=(0.0, 0.0, 0.0, 0.0), **options):
+    """
+    Tempos de fuga do conjunto de Julia de c num corte 2D ou 3D.
+
+    Args:
+        c: Parâmetro do mapa (elemento da álgebra ou número)
+        bounds, size, axes, origin: Corte, como em grid_points
+        **options: max_iter, escape_radius, expression, algebra e
+            block_size, como em escape_time
+
+    Returns:
+        np.ndarray: Tempos de fuga com a forma da grelha (p.ex. (altura,
+            largura)), com a primeira linha no mínimo da segunda componente
+    """
+    points, shape = grid_points(bounds, size, axes, origin)
+    return escape_time(points, c, **options).reshape(shape)
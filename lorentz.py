@@ -0,0 +1,219 @@
+"""
+Transformações de Lorentz do espaço-tempo 2+1 com coquaterniões unitários.
+
+Um acontecimento (t, x, y) corresponde ao coquaternião puro t·i + x·j + y·k,
+cuja norma de Minkowski ao quadrado é o intervalo t² - x² - y² (e cuja
+classificação em tipo tempo, luz ou espaço é a de Coquaternion). Para um
+coquaternião q invertível, v -> q v q⁻¹ preserva o intervalo: é uma
+transformação de Lorentz, e q e -q (ou qualquer múltiplo real) dão a mesma.
+Os coquaterniões unitários (normalize_minkowski) com norma 1 dão as
+transformações próprias e ortócronas, geradas por:
+
+    boost(rapidez, direcção)   q = cosh(θ/2) + sinh(θ/2)·(-uy·j + ux·k)
+    rotation(ângulo)           q = cos(φ/2) + sin(φ/2)·i
+
+A sanduíche é convertida uma única vez numa matriz 3x3 (as imagens de i, j e
+k), e aplicar a transformação a N acontecimentos é um produto de matrizes
+(N, 3) x (3, 3) feito pelo BLAS, em vez de dois produtos de coquaterniões por
+acontecimento.
+
+Exemplo:
+    transform = LorentzTransform.boost(0.5) * LorentzTransform.rotation(math.pi / 4)
+    moved = transform.apply(events)     # events: array (N, 3) com (t, x, y)
+"""
+import math
+
+import numpy as np
+
+from hypercomplex import Coquaternion
+
+# Limiar de Coquaternion.inverse e da classificação
+_EPSILON = 1e-15
+
+# Imagens a calcular pela sanduíche: as unidades i, j e k
+_BASIS = ((0.0, 1.0, 0.0, 0.0), (0.0, 0.0, 1.0, 0.0), (0.0, 0.0, 0.0, 1.0))
+
+
+def _product(x, y):
+    """Produto de coquaterniões (fórmulas de Coquaternion.__mul__) sobre arrays de componentes."""
+    a1, b1, c1, d1 = x
+    a2, b2, c2, d2 = y
+    return (
+        a1*a2 - b1*b2 + c1*c2 + d1*d2,
+        a2*b1 + a1*b2 + c2*d1 - c1*d2,
+        a2*c1 + a1*c2 + b2*d1 - b1*d2,
+        -(b2*c1) + b1*c2 + a2*d1 + a1*d2,
+    )
+
+
+def sandwich_matrices(coquaternions):
+    """
+    Matrizes 3x3 das transformações v -> q v q⁻¹ de vários coquaterniões.
+
+    Args:
+        coquaternions (array_like): Array (T, 4) com as componentes a, b, c, d
+
+    Returns:
+        np.ndarray: Array (T, 3, 3); a coluna m da matriz t é a imagem da
+            unidade m (i, j, k) pelo coquaternião t
+
+    Raises:
+        ZeroDivisionError: Se algum coquaternião não for invertível (norma de
+            Minkowski nula, como em Coquaternion.inverse)
+    """
+    data = np.asarray(coquaternions, dtype=float).reshape(-1, 4)
+    a, b, c, d = data.T
+    norm_squared = a*a + b*b - c*c - d*d
+    if np.any(np.abs(norm_squared) < _EPSILON):
+        raise ZeroDivisionError("Inverso de coquaternião (aproximadamente) nulo segundo métrica de Minkowski")
+    q = (a, b, c, d)
+    inverse = (a / norm_squared, -b / norm_squared, -c / norm_squared, -d / norm_squared)
+    matrices = np.empty((len(data), 3, 3))
+    for column, unit in enumerate(_BASIS):
+        image = _product(_product(q, unit), inverse)
+        for row in range(3):
+            matrices[:, row, column] = image[row + 1]
+    return matrices
+
+
+def intervals(events):
+    """
+    Intervalo t² - x² - y² de cada acontecimento (norma de Minkowski ao quadrado).
+
+    Args:
+        events (array_like): Array (N, 3) com (t, x, y)
+
+    Returns:
+        np.ndarray: Array (N,)
+    """
+    events = np.asarray(events, dtype=float)
+    return events[:, 0] ** 2 - events[:, 1] ** 2 - events[:, 2] ** 2
+
+
+def classify(events):
+    """
+    Classificação de cada acontecimento, como em Coquaternion._classify_coquaternion.
+
+    Args:
+        events (array_like): Array (N, 3) com (t, x, y)
+
+    Returns:
+        np.ndarray: Array (N,) de 'T' (tipo tempo), 'L' (tipo luz) ou 'S'
+            (tipo espaço)
+    """
+    discriminant = intervals(events)
+    kinds = np.where(discriminant > 0, 'T', 'S')
+    kinds[np.abs(discriminant) < _EPSILON] = 'L'
+    return kinds
+
+
+class LorentzTransform:
+    """
+    Transformação de Lorentz v -> q v q⁻¹ dada por um coquaternião invertível.
+
+    Args:
+        coquaternion (Coquaternion): Coquaternião que define a transformação
+            (é normalizado; só a direcção importa)
+
+    Raises:
+        ZeroDivisionError: Se o coquaternião não for invertível
+    """
+
+    __slots__ = ('coquaternion', 'matrix')
+
+    def __init__(self, coquaternion):
+        q = coquaternion
+        scale = math.sqrt(abs(q.a**2 + q.b**2 - q.c**2 - q.d**2))
+        if scale < _EPSILON:
+            raise ZeroDivisionError("Inverso de coquaternião (aproximadamente) nulo segundo métrica de Minkowski")
+        self.coquaternion = Coquaternion(q.a / scale, q.b / scale, q.c / scale, q.d / scale)
+        q = self.coquaternion
+        self.matrix = sandwich_matrices([(q.a, q.b, q.c, q.d)])[0]
+
+    @classmethod
+    def boost(cls, rapidity, direction=0.0):
+        """
+        Boost de rapidez θ (velocidade tanh θ) numa direcção do plano (x, y).
+
+        Args:
+            rapidity (float): Rapidez θ
+            direction (float): Ângulo da direcção do boost com o eixo x, em radianos
+
+        Returns:
+            LorentzTransform: Transformação que leva (1, 0, 0) a
+                (cosh θ, sinh θ·cos α, sinh θ·sin α)
+        """
+        half = 0.5 * rapidity
+        ux, uy = math.cos(direction), math.sin(direction)
+        return cls(Coquaternion(math.cosh(half), 0.0, -math.sinh(half) * uy, math.sinh(half) * ux))
+
+    @classmethod
+    def rotation(cls, angle):
+        """
+        Rotação espacial no plano (x, y), no sentido directo.
+
+        Args:
+            angle (float): Ângulo, em radianos
+
+        Returns:
+            LorentzTransform: Transformação que leva (0, 1, 0) a (0, cos φ, sin φ)
+        """
+        half = 0.5 * angle
+        return cls(Coquaternion(math.cos(half), math.sin(half), 0.0, 0.0))
+
+    def __repr__(self):
+        return f"LorentzTransform({self.coquaternion})"
+
+    def __mul__(self, other):
+        """Composição: (A * B).apply(v) == A.apply(B.apply(v))."""
+        if not isinstance(other, LorentzTransform):
+            return NotImplemented
+        return LorentzTransform(self.coquaternion * other.coquaternion)
+
+    def inverse(self):
+        """Transformação inversa."""
+        return LorentzTransform(self.coquaternion.inverse())
+
+    def apply(self, events, out=None):
+        """
+        Aplica a transformação a um conjunto de acontecimentos.
+
+        Args:
+            events (array_like): Array (N, 3) com (t, x, y)
+            out (np.ndarray, optional): Array (N, 3) onde escrever o resultado
+
+        Returns:
+            np.ndarray: Acontecimentos transformados, array (N, 3)
+        """
+        events = np.asarray(events, dtype=float)
+        return np.matmul(events, self.matrix.T, out=out)
+
+    __call__ = apply
+
+
+def apply_each(coquaternions, events, block_size=65536):
+    """
+    Aplica a cada acontecimento a sua própria transformação.
+
+    Args:
+        coquaternions (array_like): Array (N, 4), um coquaternião por acontecimento
+        events (array_like): Array (N, 3) com (t, x, y)
+        block_size (int): Acontecimentos por bloco (limita as matrizes em memória)
+
+    Returns:
+        np.ndarray: Acontecimentos transformados, array (N, 3)
+
+    Raises:
+        ValueError: Se o número de coquaterniões e de acontecimentos diferir
+        ZeroDivisionError: Se algum coquaternião não for invertível
+    """
+    coquaternions = np.asarray(coquaternions, dtype=float).reshape(-1, 4)
+    events = np.asarray(events, dtype=float)
+    if len(coquaternions) != len(events):
+        raise ValueError(f"{len(coquaternions)} coquaterniões para {len(events)} acontecimentos")
+    result = np.empty_like(events)
+    for start in range(0, len(events), block_size):
+        stop = start + block_size
+        matrices = sandwich_matrices(coquaternions[start:stop])
+        result[start:stop] = np.einsum('nij,nj->ni', matrices, events[start:stop])
+    return result
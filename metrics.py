@@ -0,0 +1,385 @@
+"""
+Métricas de desempenho expostas no formato de texto do Prometheus.
+
+Cada thread acumula os seus contadores e histogramas num fragmento próprio,
+pelo que o caminho crítico não usa locks: apenas a thread dona escreve no
+fragmento. Os fragmentos são agregados quando o endpoint /metrics é consultado.
+
+Em modo multiprocesso (variável de ambiente METRICS_DIR definida), cada worker
+grava periodicamente um snapshot das suas métricas num ficheiro próprio e a
+consulta agrega os snapshots de todos os workers. A pasta é limpa no arranque
+do servidor (clear_directory) e o snapshot de um worker que termina é fundido
+num único ficheiro de workers retirados (retire_worker), pelo que os workers
+reciclados não são contados duas vezes nem acumulam ficheiros.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Limites superiores (em segundos) dos intervalos dos histogramas de latência
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_SECONDS = 'http_request_duration_seconds'
+STAGE_SECONDS = 'calculator_stage_duration_seconds'
+ERRORS_TOTAL = 'calculator_errors_total'
+CACHE_TOTAL = 'cache_requests_total'
+
+# Etapas da avaliação registadas no histograma por etapa
+STAGES = ('rewrite', 'eval', 'from_string', 'format', 'render')
+
+_METRIC_INFO = {
+    REQUEST_SECONDS: ('histogram', 'Latência dos pedidos HTTP por rota.'),
+    STAGE_SECONDS: ('histogram', 'Tempo gasto em cada etapa da avaliação de expressões.'),
+    ERRORS_TOTAL: ('counter', 'Erros de avaliação por calculadora e tipo de excepção.'),
+    CACHE_TOTAL: ('counter', 'Consultas às caches por resultado (hit/miss).'),
+}
+
+# Intervalo mínimo (segundos) entre gravações do snapshot em modo multiprocesso
+FLUSH_INTERVAL = 5.0
+
+
+class _Shard:
+    """Métricas acumuladas por uma única thread."""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.counters = {}
+        self.histograms = {}
+
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+# Métricas de threads já terminadas, fundidas para não acumular fragmentos
+_retired = _Shard()
+_last_flush = 0.0
+
+
+def _shard():
+    """
+    Devolve o fragmento da thread actual, criando-o na primeira utilização.
+
+    A criação (rara) é o único ponto que usa lock; aproveita-se para fundir
+    os fragmentos de threads terminadas, o que mantém a lista limitada mesmo
+    com servidores que criam uma thread por pedido.
+    """
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _Shard()
+        with _shards_lock:
+            alive = []
+            for other in _shards:
+                if other.thread.is_alive():
+                    alive.append(other)
+                else:
+                    _merge_into(_retired, other.counters, other.histograms)
+            alive.append(shard)
+            _shards[:] = alive
+        _local.shard = shard
+    return shard
+
+
+def _merge_into(target, counters, histograms):
+    """Soma contadores e histogramas a um fragmento de destino."""
+    for key, value in counters.items():
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, values in histograms.items():
+        current = target.histograms.get(key)
+        if current is None:
+            target.histograms[key] = list(values)
+        else:
+            for index, value in enumerate(values):
+                current[index] += value
+
+
+def inc(name, amount=1, **labels):
+    """
+    Incrementa um contador.
+
+    Args:
+        name (str): Nome da métrica
+        amount (float): Valor a somar
+        **labels: Etiquetas da série
+    """
+    counters = _shard().counters
+    key = (name, tuple(labels.items()))
+    counters[key] = counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    """
+    Regista uma observação (em segundos) num histograma de latência.
+
+    Args:
+        name (str): Nome da métrica
+        value (float): Valor observado
+        **labels: Etiquetas da série
+    """
+    histograms = _shard().histograms
+    key = (name, tuple(labels.items()))
+    hist = histograms.get(key)
+    if hist is None:
+        # Um contador por intervalo (o último é +Inf) seguido da soma
+        hist = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+    hist[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+    hist[-1] += value
+
+
+def observe_stages(calculator, stats):
+    """
+    Regista no histograma por etapa os tempos recolhidos durante uma avaliação.
+
+    Args:
+        calculator (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+        stats (dict): Tempos por etapa, tal como preenchidos pelas funções de avaliação
+    """
+    for stage in STAGES:
+        elapsed = stats.get(stage)
+        if elapsed is not None:
+            observe(STAGE_SECONDS, elapsed, calculator=calculator, stage=stage)
+
+
+def count_error(calculator, exception_name):
+    """Contabiliza um erro de avaliação pelo tipo de excepção."""
+    inc(ERRORS_TOTAL, calculator=calculator, exception=exception_name)
+
+
+def count_cache(cache, hit):
+    """Contabiliza uma consulta a uma cache."""
+    inc(CACHE_TOTAL, cache=cache, result='hit' if hit else 'miss')
+
+
+def reset():
+    """Descarta todas as métricas acumuladas neste processo."""
+    with _shards_lock:
+        for shard in _shards:
+            shard.counters.clear()
+            shard.histograms.clear()
+        _retired.counters.clear()
+        _retired.histograms.clear()
+
+
+def _local_snapshot():
+    """
+    Agrega os fragmentos deste processo.
+
+    As cópias de dicionários são atómicas sob o GIL, pelo que a leitura não
+    interfere com as threads que continuam a escrever nos seus fragmentos.
+    """
+    total = _Shard()
+    with _shards_lock:
+        shards = list(_shards) + [_retired]
+    for shard in shards:
+        histograms = {key: list(values) for key, values in shard.histograms.copy().items()}
+        _merge_into(total, shard.counters.copy(), histograms)
+    return total
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _write_snapshot(path, snapshot):
+    """Grava um fragmento em JSON, de forma atómica (ficheiro temporário e os.replace)."""
+    data = {
+        'counters': [[name, labels, value] for (name, labels), value in snapshot.counters.items()],
+        'histograms': [[name, labels, values] for (name, labels), values in snapshot.histograms.items()],
+    }
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshot(path):
+    """Contadores e histogramas de um snapshot gravado por _write_snapshot."""
+    with open(path) as f:
+        data = json.load(f)
+    counters = {(name, tuple(map(tuple, labels))): value for name, labels, value in data['counters']}
+    histograms = {(name, tuple(map(tuple, labels))): values for name, labels, values in data['histograms']}
+    return counters, histograms
+
+
+def flush(force=False):
+    """
+    Grava o snapshot deste worker em METRICS_DIR (modo multiprocesso).
+
+    Sem METRICS_DIR não faz nada. A gravação só ocorre se tiver passado
+    FLUSH_INTERVAL desde a anterior, a menos que force seja verdadeiro.
+    """
+    global _last_flush
+    directory = os.environ.get('METRICS_DIR')
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+
+    _write_snapshot(_snapshot_path(directory, os.getpid()), _local_snapshot())
+
+
+def clear_directory():
+    """
+    Apaga os snapshots de METRICS_DIR (no arranque do servidor, antes dos workers).
+
+    Sem METRICS_DIR não faz nada. Os ficheiros de execuções anteriores seriam,
+    de outro modo, somados aos dos workers actuais.
+    """
+    directory = os.environ.get('METRICS_DIR')
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.startswith('metrics-') and (filename.endswith('.json') or filename.endswith('.tmp')):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
+
+
+def retire_worker(pid):
+    """
+    Funde o snapshot de um worker que terminou no ficheiro dos workers retirados.
+
+    Chamado pelo processo mestre (um de cada vez) quando um worker sai. As
+    métricas do worker continuam a contar, mas num único ficheiro, em vez de
+    um por worker reciclado. Sem METRICS_DIR, ou sem snapshot, não faz nada.
+
+    Args:
+        pid (int): PID do worker
+    """
+    directory = os.environ.get('METRICS_DIR')
+    if not directory:
+        return
+    path = _snapshot_path(directory, pid)
+    # Renomear primeiro: durante a fusão o worker fica por contar, em vez de contar duas vezes
+    retiring = f"{path}.retiring"
+    try:
+        os.replace(path, retiring)
+    except FileNotFoundError:
+        return
+    retired_path = _snapshot_path(directory, 'retired')
+    total = _Shard()
+    for source in (retired_path, retiring):
+        try:
+            _merge_into(total, *_read_snapshot(source))
+        except (OSError, ValueError):
+            continue
+    _write_snapshot(retired_path, total)
+    os.remove(retiring)
+
+
+def _collect():
+    """Agrega as métricas deste processo com as dos restantes workers."""
+    total = _local_snapshot()
+    directory = os.environ.get('METRICS_DIR')
+    if not directory or not os.path.isdir(directory):
+        return total
+
+    own = os.path.basename(_snapshot_path(directory, os.getpid()))
+    for filename in os.listdir(directory):
+        if filename == own or not filename.startswith('metrics-') or not filename.endswith('.json'):
+            continue
+        try:
+            counters, histograms = _read_snapshot(os.path.join(directory, filename))
+        except (OSError, ValueError):
+            continue
+        _merge_into(total, counters, histograms)
+    return total
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+
+def render():
+    """
+    Produz a exposição de texto do Prometheus com todas as métricas agregadas.
+
+    Returns:
+        str: Texto no formato de exposição do Prometheus (versão 0.0.4)
+    """
+    total = _collect()
+    by_name = {}
+    for (name, labels), value in total.counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), values in total.histograms.items():
+        by_name.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text = _METRIC_INFO.get(name, ('untyped', name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+            cumulative += value[len(LATENCY_BUCKETS)]
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    # Taxa de acerto derivada para cada cache observada
+    caches = {}
+    for labels, value in by_name.get(CACHE_TOTAL, []):
+        label_map = dict(labels)
+        hits_total = caches.setdefault(label_map.get('cache', ''), [0, 0])
+        hits_total[0 if label_map.get('result') == 'hit' else 1] += value
+    if caches:
+        lines.append("# HELP cache_hit_ratio Fracção das consultas a cada cache resolvidas sem recálculo.")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache, (hits, misses) in sorted(caches.items()):
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f"cache_hit_ratio{_format_labels([('cache', cache)])} {ratio}")
+
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    Instrumenta a aplicação Flask: mede a latência de cada pedido por rota
+    e expõe o endpoint /metrics.
+
+    Args:
+        app (Flask): Aplicação a instrumentar
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.teardown_request
+    def _observe_request(exc=None):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe(REQUEST_SECONDS, time.perf_counter() - start, route=route, method=request.method)
+        flush()
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        """
+        Exposição das métricas no formato de texto do Prometheus.
+
+        Returns:
+            Response: Métricas agregadas de todas as threads e workers
+        """
+        return Response(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
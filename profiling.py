@@ -0,0 +1,204 @@
+"""
+Perfilagem a pedido de pedidos individuais com cProfile e tracemalloc.
+
+Um pedido é perfilado quando traz o token configurado no cabeçalho
+X-Profile ou no parâmetro de query _profile. O relatório (funções com
+maior tempo acumulado, pico de memória do pedido, incluindo os temporários
+já libertados, e locais cuja memória mais cresceu face a um snapshot
+tirado no início do pedido) é gravado em
+PROFILE_DIR, juntamente com o ficheiro .prof do cProfile, e pode ser
+consultado em /_profile/<id>, indicado no cabeçalho X-Profile-Report
+da resposta.
+
+Configuração (variáveis de ambiente ou app.config):
+    PROFILE_TOKEN: token que autoriza a perfilagem; sem valor, está desligada
+    PROFILE_DIR: pasta dos relatórios (por omissão, uma pasta temporária)
+    PROFILE_TOP: número de entradas de cada secção do relatório (por omissão 25)
+"""
+import hmac
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+HEADER = 'X-Profile'
+QUERY_ARG = '_profile'
+
+# tracemalloc é global ao processo: apenas um pedido perfilado de cada vez
+_profile_lock = threading.Lock()
+
+
+def _authorized(app, request):
+    """Verifica se o pedido traz o token de perfilagem configurado."""
+    token = app.config.get('PROFILE_TOKEN')
+    if not token:
+        return False
+    supplied = request.headers.get(HEADER) or request.args.get(QUERY_ARG)
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def _report_path(app, profile_id, extension):
+    return os.path.join(app.config['PROFILE_DIR'], f"{profile_id}.{extension}")
+
+
+def _without_tracemalloc(snapshot):
+    import tracemalloc
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+
+def build_report(profiler, snapshot, top=25, title="", baseline=None, peak=None):
+    """
+    Produz o relatório de texto de uma sessão de perfilagem.
+
+    Args:
+        profiler (cProfile.Profile): Perfilador já desactivado
+        snapshot (tracemalloc.Snapshot): Snapshot das alocações no fim do pedido, ou None
+        top (int): Número de entradas de cada secção
+        title (str): Linha de título do relatório
+        baseline (tracemalloc.Snapshot, optional): Snapshot do início do
+            pedido; com ele, os locais são ordenados pela memória alocada
+            durante o pedido, e não pela memória viva do processo
+        peak (int, optional): Pico de memória rastreada durante o pedido
+            acima da do início, em bytes
+
+    Returns:
+        str: Relatório com as funções por tempo acumulado e os locais de alocação
+    """
+    import pstats
+
+    out = io.StringIO()
+    if title:
+        out.write(f"{title}\n\n")
+
+    out.write(f"== Funções por tempo acumulado (top {top}) ==\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(top)
+
+    if peak is not None:
+        out.write(f"== Pico de memória durante o pedido: {peak / 1024:.1f} KiB acima do início ==\n")
+    if snapshot is not None and baseline is not None:
+        differences = _without_tracemalloc(snapshot).compare_to(_without_tracemalloc(baseline), 'lineno')
+        out.write(f"== Locais com mais memória alocada durante o pedido (top {top}) ==\n")
+        for stat in differences[:top]:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocos  "
+                      f"{frame.filename}:{frame.lineno}\n")
+    elif snapshot is not None:
+        out.write(f"== Locais com mais memória alocada (top {top}) ==\n")
+        for stat in _without_tracemalloc(snapshot).statistics('lineno')[:top]:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocos  {frame.filename}:{frame.lineno}\n")
+    return out.getvalue()
+
+
+def init_app(app):
+    """
+    Activa a perfilagem a pedido na aplicação Flask.
+
+    Args:
+        app (Flask): Aplicação a configurar
+    """
+    from flask import Response, abort, g, request
+
+    app.config.setdefault('PROFILE_TOKEN', os.environ.get('PROFILE_TOKEN'))
+    app.config.setdefault('PROFILE_DIR', os.environ.get(
+        'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'calculator-profiles')))
+    app.config.setdefault('PROFILE_TOP', int(os.environ.get('PROFILE_TOP', 25)))
+
+    @app.before_request
+    def _start_profile():
+        if not _authorized(app, request) or request.endpoint == 'profile_report':
+            return
+        if not _profile_lock.acquire(blocking=False):
+            g.profile_busy = True
+            return
+
+        import cProfile
+        import tracemalloc
+
+        g.profile_started_tracing = not tracemalloc.is_tracing()
+        if g.profile_started_tracing:
+            tracemalloc.start()
+        # Referências do pedido: o que já estava alocado (sobretudo se o
+        # rastreio já estava ligado) não é atribuído a este pedido
+        g.profile_baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        g.profile_memory_start = tracemalloc.get_traced_memory()[0]
+        g.profile_start = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            if g.pop('profile_busy', False):
+                response.headers['X-Profile-Busy'] = '1'
+            return response
+
+        import tracemalloc
+
+        try:
+            profiler.disable()
+            elapsed = time.perf_counter() - g.pop('profile_start')
+            peak = tracemalloc.get_traced_memory()[1] - g.pop('profile_memory_start')
+            snapshot = tracemalloc.take_snapshot()
+            if g.pop('profile_started_tracing', False):
+                tracemalloc.stop()
+        finally:
+            _profile_lock.release()
+
+        route = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{route}-{uuid.uuid4().hex[:8]}"
+        title = f"{request.method} {request.full_path} — {elapsed * 1000:.2f} ms (pid {os.getpid()})"
+        report = build_report(profiler, snapshot, app.config['PROFILE_TOP'], title,
+                              baseline=g.pop('profile_baseline'), peak=peak)
+
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        profiler.dump_stats(_report_path(app, profile_id, 'prof'))
+        with open(_report_path(app, profile_id, 'txt'), 'w', encoding='utf-8') as f:
+            f.write(report)
+
+        response.headers['X-Profile-Id'] = profile_id
+        response.headers['X-Profile-Report'] = f"/_profile/{profile_id}"
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc=None):
+        # Pedido terminado sem passar por after_request (excepção não tratada)
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        import tracemalloc
+
+        profiler.disable()
+        if g.pop('profile_started_tracing', False):
+            tracemalloc.stop()
+        _profile_lock.release()
+
+    @app.route("/_profile/<profile_id>")
+    def profile_report(profile_id):
+        """
+        Devolve o relatório de texto de um pedido perfilado.
+
+        Args:
+            profile_id (str): Identificador devolvido no cabeçalho X-Profile-Id
+
+        Returns:
+            Response: Relatório em texto simples
+        """
+        if not _authorized(app, request):
+            abort(403)
+        if not re.fullmatch(r'[A-Za-z0-9-]+', profile_id):
+            abort(404)
+        try:
+            with open(_report_path(app, profile_id, 'txt'), encoding='utf-8') as f:
+                return Response(f.read(), content_type='text/plain; charset=utf-8')
+        except FileNotFoundError:
+            abort(404)
@@ -0,0 +1,191 @@
+"""
+Transformada de Fourier de quaterniões (QFFT) para sinais e imagens.
+
+Para um eixo μ (quaternião puro unitário), as transformadas à esquerda e à
+direita de um sinal f de N amostras são
+
+    esquerda:  F(u) = Σ exp(-μ·2π·u·x/N) · f(x)
+    direita:   F(u) = Σ f(x) · exp(-μ·2π·u·x/N)
+
+e, nas imagens, o expoente é -μ·2π·(u·x/M + v·y/N). As inversas trocam o
+sinal do expoente e dividem pelo número de amostras.
+
+O cálculo não percorre objectos Quaternion: com ν um quaternião puro
+unitário perpendicular a μ, cada quaternião escreve-se f = f1 + f2·ν (ou
+f1 + ν·f2, na transformada à direita), com f1 e f2 no plano complexo
+{1, μ}. Como exp(-μθ) comuta com f1 e f2, a transformada é F1 + F2·ν (ou
+F1 + ν·F2), sendo F1 e F2 as FFT complexas de f1 e f2, calculadas com
+numpy.fft. O custo é o de duas FFT complexas.
+
+Os dados são arrays com as componentes a, b, c, d no último eixo: (N, 4)
+para sinais e (altura, largura, 4) para imagens. As imagens a cores (RGB)
+convertem-se em quaterniões puros r·i + g·j + b·k com from_rgb; o eixo por
+omissão, GRAY_AXIS = (i + j + k)/√3, é a direcção dos cinzentos, e a
+transformada separa a luminância da crominância.
+
+Exemplo (filtro passa-baixo de uma imagem a cores):
+    spectrum = qfft2(from_rgb(image))
+    spectrum[mask] = 0                  # máscara real: comuta com tudo
+    filtered = to_rgb(iqfft2(spectrum))
+"""
+import math
+
+import numpy as np
+
+from hypercomplex import Quaternion
+from hyperarray import QuaternionArray
+
+# Eixo dos cinzentos: (i + j + k)/√3
+GRAY_AXIS = (1 / math.sqrt(3),) * 3
+
+_SIDES = ('left', 'right')
+
+
+def _components(data):
+    """Array (..., 4) com as componentes de um array, QuaternionArray ou lista de Quaternion."""
+    if isinstance(data, QuaternionArray):
+        return data.to_numpy()
+    if len(data) and isinstance(data[0], Quaternion):
+        data = [(q.a, q.b, q.c, q.d) for q in data]
+    data = np.asarray(data, dtype=float)
+    if data.ndim < 2 or data.shape[-1] != 4:
+        raise ValueError(f"Esperado um array (..., 4) de componentes, recebido {data.shape}")
+    return data
+
+
+def transform_basis(mu=GRAY_AXIS):
+    """
+    Base ortonormada (μ, ν, μν) da parte vectorial associada a um eixo.
+
+    Args:
+        mu: Eixo: Quaternion puro ou vector (b, c, d); é normalizado
+
+    Returns:
+        np.ndarray: Matriz 3x3 com μ, ν e μν nas colunas
+
+    Raises:
+        ValueError: Se o eixo for nulo ou tiver parte real
+    """
+    if isinstance(mu, Quaternion):
+        if abs(mu.a) > 1e-12:
+            raise ValueError("O eixo da transformada tem de ser um quaternião puro")
+        mu = (mu.b, mu.c, mu.d)
+    mu = np.asarray(mu, dtype=float)
+    norm = np.linalg.norm(mu)
+    if mu.shape != (3,) or norm < 1e-15:
+        raise ValueError("O eixo da transformada tem de ser um vector (b, c, d) não nulo")
+    mu = mu / norm
+    # ν: perpendicular a μ, a partir do eixo coordenado menos alinhado com μ
+    helper = np.eye(3)[np.argmin(np.abs(mu))]
+    nu = np.cross(mu, helper)
+    nu /= np.linalg.norm(nu)
+    # Para quaterniões puros perpendiculares, μν = μ x ν
+    return np.stack([mu, nu, np.cross(mu, nu)], axis=1)
+
+
+def _data_axes(axes, ndim):
+    """Eixos do array a transformar, sem o eixo das componentes."""
+    normalized = tuple(axis % ndim for axis in axes)
+    if ndim - 1 in normalized or len(set(normalized)) != len(normalized):
+        raise ValueError(f"Eixos inválidos {tuple(axes)} para um array com {ndim} dimensões "
+                         "(o último eixo são as componentes)")
+    return normalized
+
+
+def _transform(data, mu, side, axes, inverse):
+    """Transformada directa ou inversa, à esquerda ou à direita, nos eixos indicados."""
+    if side not in _SIDES:
+        raise ValueError(f"side deve ser 'left' ou 'right', não {side!r}")
+    data = _components(data)
+    axes = _data_axes(axes, data.ndim)
+    # Mudança de base ortogonal a -> a, (b, c, d) -> (x, y, ±z), com (x, y, z)
+    # as coordenadas na base (μ, ν, μν): f = f1 + f2·ν (ou f1 + ν·f2) com
+    # f1 = a + x·μ e f2 = y + z·μ (à direita, y - z·μ)
+    change = np.eye(4)
+    change[1:, 1:] = transform_basis(mu)
+    if side == 'right':
+        change[:, 3] *= -1
+
+    # As colunas (a, x) e (y, ±z) contíguas são, vistas como complexos, f1 e f2
+    halves = (data @ change).view(complex)
+    fft = np.fft.ifftn if inverse else np.fft.fftn
+    spectrum = np.ascontiguousarray(fft(halves, axes=axes))
+    return spectrum.view(float) @ change.T
+
+
+def qfft(signal, mu=GRAY_AXIS, side='left', axis=-2):
+    """
+    QFFT de um sinal (ou de cada linha de um array) ao longo de um eixo.
+
+    Args:
+        signal: Array (..., 4) de componentes, QuaternionArray ou lista de Quaternion
+        mu: Eixo da transformada (Quaternion puro ou vector (b, c, d))
+        side (str): 'left' (exponencial à esquerda) ou 'right'
+        axis (int): Eixo do array a transformar (por omissão, o último
+            antes das componentes)
+
+    Returns:
+        np.ndarray: Espectro, array com a forma do sinal
+
+    Raises:
+        ValueError: Se o eixo, o lado ou a forma forem inválidos
+    """
+    return _transform(signal, mu, side, (axis,), inverse=False)
+
+
+def iqfft(spectrum, mu=GRAY_AXIS, side='left', axis=-2):
+    """Inversa de qfft (com o mesmo eixo e o mesmo lado)."""
+    return _transform(spectrum, mu, side, (axis,), inverse=True)
+
+
+def qfft2(image, mu=GRAY_AXIS, side='left', axes=(-3, -2)):
+    """
+    QFFT 2D de uma imagem de quaterniões.
+
+    Args:
+        image: Array (altura, largura, 4) de componentes
+        mu: Eixo da transformada (Quaternion puro ou vector (b, c, d))
+        side (str): 'left' ou 'right'
+        axes (tuple): Eixos do array a transformar
+
+    Returns:
+        np.ndarray: Espectro, array com a forma da imagem
+    """
+    return _transform(image, mu, side, axes, inverse=False)
+
+
+def iqfft2(spectrum, mu=GRAY_AXIS, side='left', axes=(-3, -2)):
+    """Inversa de qfft2 (com o mesmo eixo e o mesmo lado)."""
+    return _transform(spectrum, mu, side, axes, inverse=True)
+
+
+def from_rgb(image):
+    """
+    Imagem a cores como imagem de quaterniões puros r·i + g·j + b·k.
+
+    Args:
+        image (array_like): Array (altura, largura, 3); uint8 é convertido
+            para [0, 1]
+
+    Returns:
+        np.ndarray: Array (altura, largura, 4)
+    """
+    image = np.asarray(image)
+    scale = 1 / 255 if image.dtype == np.uint8 else 1.0
+    result = np.zeros(image.shape[:-1] + (4,))
+    result[..., 1:] = image * scale
+    return result
+
+
+def to_rgb(image):
+    """
+    Imagem de quaterniões como imagem a cores uint8 (componentes i, j, k).
+
+    Args:
+        image (array_like): Array (altura, largura, 4), com as cores em [0, 1]
+
+    Returns:
+        np.ndarray: Array uint8 (altura, largura, 3), pronto para imaging.encode_png
+    """
+    colors = np.clip(np.asarray(image)[..., 1:], 0.0, 1.0)
+    return (colors * 255 + 0.5).astype(np.uint8)
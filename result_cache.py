@@ -0,0 +1,533 @@
+"""
+Cache de resultados partilhada entre utilizadores.
+
+Muitos utilizadores submetem as mesmas expressões; o resultado formatado de
+cada avaliação bem-sucedida fica guardado numa chave formada pelo tipo de
+calculadora, pelo modo angular (só relevante na calculadora principal) e
+pela expressão canónica, de modo que diferenças de espaçamento ou grafias
+equivalentes (× e *, ^ e ** nos quaterniões) partilham a mesma entrada.
+
+A cache tem dois níveis:
+    - memória: LRU por processo, com tempo de vida e número máximo de entradas;
+    - partilhado (opcional): base de dados SQLite local, comum a todos os
+      workers da máquina, consultada quando a memória falha.
+
+Os erros de avaliação não são guardados. As consultas são contabilizadas na
+métrica cache_requests_total (caches 'result_memory' e 'result_shared').
+
+Para que os workers não arranquem a frio depois de cada deploy, as entradas
+mais consultadas da memória são gravadas periodicamente num snapshot (JSON
+comprimido com gzip) e recarregadas no arranque, aquecendo também a cache de
+expressões compiladas de hypercomplex.py. O snapshot e o nível partilhado
+registam a versão do avaliador (hash do código que produz os resultados) e
+são descartados quando esta muda.
+
+Configuração (variáveis de ambiente ou app.config):
+    RESULT_CACHE_SIZE: entradas em memória por processo (por omissão 1024; 0 desliga)
+    RESULT_CACHE_TTL: tempo de vida das entradas em segundos (por omissão 3600; 0 sem limite)
+    RESULT_CACHE_DB: ficheiro SQLite do nível partilhado; sem valor, está desligado
+    RESULT_CACHE_DB_SIZE: entradas máximas no nível partilhado (por omissão 10000)
+    RESULT_CACHE_SNAPSHOT: ficheiro do snapshot; sem valor, não é gravado nem carregado
+    RESULT_CACHE_SNAPSHOT_SIZE: entradas gravadas no snapshot (por omissão 512)
+    RESULT_CACHE_SNAPSHOT_INTERVAL: segundos entre gravações (por omissão 300)
+"""
+import atexit
+import collections
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger('calculator.cache')
+
+# Separador dos campos da chave (não aparece em expressões introduzidas no formulário)
+KEY_SEPARATOR = '\x1f'
+
+# Número de escritas no nível partilhado entre limpezas de entradas expiradas/excedentes
+PRUNE_INTERVAL = 200
+
+# Ficheiros cujo conteúdo determina os resultados guardados (ver evaluator_version):
+# o avaliador, o optimizador e o gerador de código das expressões compiladas e a
+# avaliação das instruções (workspace.Evaluator), por onde passam as entradas da cache
+EVALUATOR_SOURCES = ('hypercomplex.py', 'expr_compiler.py', 'codegen.py', 'workspace.py',
+                     'app.py', 'result_cache.py')
+
+# Formato do snapshot, incrementado se a estrutura mudar
+SNAPSHOT_FORMAT = 1
+
+# Grafias equivalentes por calculadora: apenas as que a própria reescrita já trata como iguais
+_EQUIVALENT_SPELLINGS = {
+    'standard': (),
+    'quaternion': (('×', '*'), ('^', '**')),
+    'coquaternion': (('×', '*'), ('^', '**')),
+}
+
+# Espaços significativos: entre dois caracteres de palavra ("2 3", "2 i") e entre
+# dois caracteres de operador ("2 * * 3" não é "2 ** 3"); os restantes não
+_WORD_CHAR = r'[\w.]'
+_OPERATOR_CHAR = r'[^\w\s.()\[\]{},]'
+_SIGNIFICANT_SPACE = re.compile(rf'(?<={_WORD_CHAR})\s+(?={_WORD_CHAR})|(?<={_OPERATOR_CHAR})\s+(?={_OPERATOR_CHAR})')
+_SPACE_RUN = re.compile(r'\s+')
+
+
+def _canonical_space(match):
+    """Um espaço no lugar de uma sequência significativa; nada nas restantes."""
+    return ' ' if _SIGNIFICANT_SPACE.match(match.string, match.start()) else ''
+
+
+def canonicalize(expression, calculator):
+    """
+    Forma canónica de uma expressão, usada como chave e avaliada em vez da original.
+
+    Remove os espaços que não separam dois números ou nomes nem dois
+    operadores, reduz os restantes a um só e substitui as grafias
+    equivalentes da calculadora.
+
+    Args:
+        expression (str): Expressão introduzida pelo utilizador
+        calculator (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+
+    Returns:
+        str: Expressão canónica
+    """
+    for spelling, canonical in _EQUIVALENT_SPELLINGS[calculator]:
+        expression = expression.replace(spelling, canonical)
+    return _SPACE_RUN.sub(_canonical_space, expression.strip())
+
+
+def make_key(calculator, expression, angle_mode=None):
+    """
+    Chave da cache para uma expressão.
+
+    Args:
+        calculator (str): Tipo de calculadora
+        expression (str): Expressão introduzida pelo utilizador
+        angle_mode (str, optional): Modo angular, apenas na calculadora principal
+
+    Returns:
+        str: Chave com calculadora, modo angular e expressão canónica
+    """
+    return KEY_SEPARATOR.join((calculator, angle_mode or '', canonicalize(expression, calculator)))
+
+
+class MemoryCache:
+    """LRU em memória com tempo de vida e contagem de acertos por entrada, segura entre threads."""
+
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Chave -> [valor, expiração (time.monotonic) ou None, acertos]
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Devolve o valor guardado, ou None se não existir ou tiver expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires, _ = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            entry[2] += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl=None, hits=0):
+        """
+        Guarda um valor, descartando as entradas usadas há mais tempo.
+
+        Args:
+            key (str): Chave
+            value (str): Valor a guardar
+            ttl (float, optional): Tempo de vida em segundos (por omissão o da cache)
+            hits (int): Acertos já acumulados pela entrada (ao carregar um snapshot)
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = [value, expires, hits]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def hottest(self, limit):
+        """
+        Entradas válidas mais consultadas, das mais usadas recentemente às
+        menos, em caso de empate.
+
+        Args:
+            limit (int): Número máximo de entradas
+
+        Returns:
+            list: Tuplos (chave, valor, segundos restantes ou None, acertos)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = [(key, value, None if expires is None else expires - now, hits)
+                       for key, (value, expires, hits) in reversed(self._entries.items())
+                       if expires is None or expires > now]
+        entries.sort(key=lambda entry: entry[3], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedCache:
+    """
+    Nível partilhado entre processos, numa base de dados SQLite local.
+
+    Cada thread usa a sua ligação, reaberta depois de um fork. As falhas da
+    base de dados (bloqueio, disco) são registadas e tratadas como falhas
+    da cache, sem afectar o pedido.
+
+    Cada linha guarda a versão do avaliador que a produziu e só as da versão
+    do processo são lidas: durante um reload gradual, os workers antigos
+    continuam a escrever na mesma base sem que os novos sirvam esses valores.
+    As linhas de outras versões não são apagadas à abertura (um worker antigo
+    apagaria as dos novos): saem pela validade ou pelo limite de entradas.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=3600.0, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        # Valor guardado em cada linha ('' se a versão não for indicada)
+        self._version = version or ''
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        import sqlite3
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(results)')]
+        if columns and 'version' not in columns:
+            # Tabela de uma versão anterior, sem a versão por linha: são só valores em cache
+            connection.execute('DROP TABLE IF EXISTS results')
+        connection.execute('CREATE TABLE IF NOT EXISTS results ('
+                           'key TEXT NOT NULL, version TEXT NOT NULL, value TEXT NOT NULL, '
+                           'expires REAL, stored REAL NOT NULL, PRIMARY KEY (key, version))')
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def get(self, key):
+        """
+        Devolve o valor guardado e o tempo de vida restante.
+
+        Returns:
+            tuple: (valor, segundos restantes ou None se não expira), ou None
+        """
+        import sqlite3
+
+        try:
+            row = self._connection().execute(
+                'SELECT value, expires FROM results WHERE key = ? AND version = ?',
+                (key, self._version)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Cache partilhada indisponível: %s", e)
+            return None
+        if row is None:
+            return None
+        value, expires = row
+        if expires is None:
+            return value, None
+        remaining = expires - time.time()
+        return (value, remaining) if remaining > 0 else None
+
+    def put(self, key, value):
+        """Guarda um valor, limpando periodicamente as entradas expiradas e excedentes."""
+        import sqlite3
+
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('INSERT OR REPLACE INTO results (key, version, value, expires, stored) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               (key, self._version, value, now + self.ttl if self.ttl else None, now))
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self.prune(connection, now)
+        except sqlite3.Error as e:
+            logger.warning("Cache partilhada indisponível: %s", e)
+
+    def prune(self, connection=None, now=None):
+        """Remove as entradas expiradas e as mais antigas acima do limite."""
+        connection = connection or self._connection()
+        connection.execute('DELETE FROM results WHERE expires <= ?', (now or time.time(),))
+        connection.execute('DELETE FROM results WHERE rowid IN '
+                           '(SELECT rowid FROM results ORDER BY stored DESC LIMIT -1 OFFSET ?)',
+                           (self.max_entries,))
+
+    def clear(self):
+        import sqlite3
+
+        try:
+            self._connection().execute('DELETE FROM results')
+        except sqlite3.Error as e:
+            logger.warning("Cache partilhada indisponível: %s", e)
+
+
+_memory = MemoryCache()
+_shared = None
+_bypass = False
+_snapshot = {'path': None, 'size': 512, 'interval': 300.0, 'last': 0.0, 'dirty': False}
+
+
+def evaluator_version():
+    """
+    Versão do avaliador: hash dos ficheiros que determinam os resultados,
+    das versões do Python e do NumPy.
+
+    Returns:
+        str: Identificador hexadecimal curto
+    """
+    from importlib import metadata
+
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in EVALUATOR_SOURCES:
+        with open(os.path.join(directory, name), 'rb') as f:
+            digest.update(f.read())
+    try:
+        numpy_version = metadata.version('numpy')
+    except metadata.PackageNotFoundError:
+        numpy_version = ''
+    digest.update(f"{platform.python_version()}|{numpy_version}".encode())
+    return digest.hexdigest()[:16]
+
+
+def configure(size=1024, ttl=3600.0, db_path=None, db_size=10000):
+    """
+    Reconfigura os dois níveis da cache, descartando as entradas em memória.
+
+    Args:
+        size (int): Entradas em memória (0 desliga o nível em memória)
+        ttl (float): Tempo de vida em segundos (0 sem limite)
+        db_path (str, optional): Ficheiro SQLite do nível partilhado (None desliga)
+        db_size (int): Entradas máximas no nível partilhado
+    """
+    global _memory, _shared
+    _memory = MemoryCache(size, ttl)
+    _shared = SharedCache(db_path, db_size, ttl, evaluator_version()) if db_path else None
+
+
+def get(key):
+    """
+    Procura um resultado na memória e, se falhar, no nível partilhado.
+
+    Args:
+        key (str): Chave devolvida por make_key
+
+    Returns:
+        str: Resultado guardado, ou None
+    """
+    value = _memory.get(key)
+    metrics.count_cache('result_memory', value is not None)
+    if value is not None or _shared is None:
+        return value
+
+    found = _shared.get(key)
+    metrics.count_cache('result_shared', found is not None)
+    if found is None:
+        return None
+    value, remaining = found
+    # Promover para a memória sem ultrapassar a validade da entrada partilhada
+    _memory.put(key, value, remaining)
+    return value
+
+
+def put(key, value):
+    """Guarda um resultado nos dois níveis."""
+    _memory.put(key, value)
+    _snapshot['dirty'] = True
+    if _shared is not None:
+        _shared.put(key, value)
+
+
+def clear():
+    """Esvazia os dois níveis da cache."""
+    _memory.clear()
+    if _shared is not None:
+        _shared.clear()
+
+
+def save_snapshot(path, limit=512):
+    """
+    Grava atomicamente as entradas mais consultadas da memória.
+
+    Args:
+        path (str): Ficheiro de destino
+        limit (int): Número máximo de entradas
+
+    Returns:
+        int: Número de entradas gravadas
+    """
+    now = time.time()
+    entries = [[key, value, None if remaining is None else now + remaining, hits]
+               for key, value, remaining, hits in _memory.hottest(limit)]
+    data = {'format': SNAPSHOT_FORMAT, 'version': evaluator_version(), 'created': now, 'entries': entries}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    _snapshot['dirty'] = False
+    return len(entries)
+
+
+def load_snapshot(path):
+    """
+    Carrega um snapshot para a memória e pré-compila as expressões hipercomplexas.
+
+    Entradas expiradas são ignoradas; um snapshot de outra versão do avaliador
+    (ou ilegível) é descartado por inteiro.
+
+    Args:
+        path (str): Ficheiro do snapshot
+
+    Returns:
+        int: Número de entradas carregadas
+    """
+    from hypercomplex import precompile_expression
+
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.warning("Snapshot da cache ilegível (%s): %s", path, e)
+        return 0
+    if data.get('format') != SNAPSHOT_FORMAT or data.get('version') != evaluator_version():
+        logger.info("Snapshot da cache de outra versão do avaliador descartado: %s", path)
+        return 0
+
+    now = time.time()
+    loaded = 0
+    # Das menos para as mais consultadas, para que estas fiquem no topo da LRU
+    for key, value, expires, hits in reversed(data['entries']):
+        if expires is not None and expires <= now:
+            continue
+        _memory.put(key, value, None if expires is None else expires - now, hits)
+        calculator, _, expression = key.split(KEY_SEPARATOR, 2)
+        if calculator in ('quaternion', 'coquaternion'):
+            precompile_expression(expression, calculator.capitalize())
+        loaded += 1
+    return loaded
+
+
+def snapshot_if_due(force=False):
+    """
+    Grava o snapshot se estiver configurado, houver entradas novas e tiver
+    passado o intervalo desde a gravação anterior (ou se force for verdadeiro).
+    """
+    path = _snapshot['path']
+    if not path or not _snapshot['dirty']:
+        return
+    now = time.monotonic()
+    if not force and now - _snapshot['last'] < _snapshot['interval']:
+        return
+    _snapshot['last'] = now
+    try:
+        save_snapshot(path, _snapshot['size'])
+    except OSError as e:
+        logger.warning("Não foi possível gravar o snapshot da cache (%s): %s", path, e)
+
+
+def get_or_compute(calculator, expression, compute, angle_mode=None):
+    """
+    Devolve o resultado guardado ou avalia a expressão canónica e guarda-o.
+
+    Args:
+        calculator (str): Tipo de calculadora
+        expression (str): Expressão introduzida pelo utilizador
+        compute (callable): Recebe a expressão canónica e devolve o resultado formatado;
+            as excepções propagam-se e o resultado não é guardado
+        angle_mode (str, optional): Modo angular, apenas na calculadora principal
+
+    Returns:
+        tuple: (resultado formatado, True se veio da cache)
+    """
+    if _bypass:
+        return compute(canonicalize(expression, calculator)), False
+    key = make_key(calculator, expression, angle_mode)
+    value = get(key)
+    if value is not None:
+        return value, True
+    value = compute(canonicalize(expression, calculator))
+    put(key, value)
+    return value, False
+
+
+@contextlib.contextmanager
+def bypassed():
+    """
+    Desliga a cache (consulta e escrita) durante o bloco, p.ex. no aquecimento,
+    que tem de exercitar a avaliação mesmo que os resultados já estejam guardados.
+    """
+    global _bypass
+    previous, _bypass = _bypass, True
+    try:
+        yield
+    finally:
+        _bypass = previous
+
+
+def init_app(app):
+    """
+    Configura a cache a partir de app.config, usando as variáveis de
+    ambiente como valores por omissão.
+
+    Args:
+        app (Flask): Aplicação a configurar
+    """
+    app.config.setdefault('RESULT_CACHE_SIZE', int(os.environ.get('RESULT_CACHE_SIZE', 1024)))
+    app.config.setdefault('RESULT_CACHE_TTL', float(os.environ.get('RESULT_CACHE_TTL', 3600)))
+    app.config.setdefault('RESULT_CACHE_DB', os.environ.get('RESULT_CACHE_DB'))
+    app.config.setdefault('RESULT_CACHE_DB_SIZE', int(os.environ.get('RESULT_CACHE_DB_SIZE', 10000)))
+    app.config.setdefault('RESULT_CACHE_SNAPSHOT', os.environ.get('RESULT_CACHE_SNAPSHOT'))
+    app.config.setdefault('RESULT_CACHE_SNAPSHOT_SIZE', int(os.environ.get('RESULT_CACHE_SNAPSHOT_SIZE', 512)))
+    app.config.setdefault('RESULT_CACHE_SNAPSHOT_INTERVAL',
+                          float(os.environ.get('RESULT_CACHE_SNAPSHOT_INTERVAL', 300)))
+    configure(app.config['RESULT_CACHE_SIZE'], app.config['RESULT_CACHE_TTL'],
+              app.config['RESULT_CACHE_DB'] or None, app.config['RESULT_CACHE_DB_SIZE'])
+
+    path = app.config['RESULT_CACHE_SNAPSHOT'] or None
+    _snapshot.update(path=path, size=app.config['RESULT_CACHE_SNAPSHOT_SIZE'],
+                     interval=app.config['RESULT_CACHE_SNAPSHOT_INTERVAL'], last=time.monotonic(), dirty=False)
+    if not path:
+        return
+    loaded = load_snapshot(path)
+    if loaded:
+        app.logger.info("Cache de resultados: %d entradas carregadas de %s", loaded, path)
+
+    @app.teardown_request
+    def _snapshot_cache(exc=None):
+        snapshot_if_due()
+
+    # Só grava à saída se o processo tiver guardado resultados novos (não o mestre do Gunicorn)
+    atexit.register(snapshot_if_due, force=True)
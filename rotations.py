@@ -0,0 +1,461 @@
+"""
+Estatísticas de rotações representadas por quaterniões unitários.
+
+Um quaternião unitário q = cos(θ/2) + sin(θ/2)·u representa a rotação de
+ângulo θ em torno do eixo u, e -q representa a mesma rotação. Por isso, as
+estatísticas deste módulo não dependem do sinal de cada amostra:
+
+    mean_rotation        rotação média (Markley et al., 2007): o vector
+                         próprio do maior valor próprio de M = Σ wᵢ qᵢ qᵢᵀ,
+                         opcionalmente com pesos
+    angular_distances    ângulo da rotação que leva uma referência a cada amostra
+    dispersion           ângulos (médio, quadrático médio e máximo) das
+                         amostras em torno da média
+    distance_matrix      ângulos entre todos os pares de duas colecções
+    RotationIndex        índice para procurar as rotações mais próximas (k
+                         vizinhos ou raio) entre milhões de referências
+
+As amostras são arrays (N, 4) com as componentes a, b, c, d (ou um
+QuaternionArray, ou uma sequência de Quaternion) e são normalizadas como em
+Quaternion.normalize. Todas as funções percorrem os dados por blocos de
+linhas, pelo que aceitam arrays em disco (np.load(..., mmap_mode='r')) com
+milhões de amostras, usando memória proporcional ao bloco.
+"""
+import collections
+import math
+
+import numpy as np
+
+from hypercomplex import Quaternion
+from hyperarray import QuaternionArray
+
+# Linhas por bloco: 65536 x 4 floats = 2 MiB por bloco de amostras
+DEFAULT_BLOCK_SIZE = 65536
+
+# Limiar de Quaternion.normalize abaixo do qual um quaternião é nulo
+_EPSILON = 1e-15
+
+Dispersion = collections.namedtuple('Dispersion', 'mean rms_angle mean_angle max_angle')
+Dispersion.__doc__ = """
+Dispersão de um conjunto de rotações em torno da média.
+
+Attributes:
+    mean (Quaternion): Rotação média usada como referência
+    rms_angle (float): Raiz do ângulo quadrático médio, em radianos
+    mean_angle (float): Ângulo médio, em radianos
+    max_angle (float): Maior ângulo, em radianos
+"""
+
+
+def as_components(quaternions):
+    """
+    Componentes de uma colecção de quaterniões, sem cópia se já for um array.
+
+    Args:
+        quaternions: Array (N, 4), QuaternionArray ou sequência de Quaternion
+
+    Returns:
+        np.ndarray: Array (N, 4) com as componentes a, b, c, d
+
+    Raises:
+        ValueError: Se não tiver a forma (N, 4)
+    """
+    if isinstance(quaternions, QuaternionArray):
+        return quaternions.to_numpy()
+    if len(quaternions) and isinstance(quaternions[0], Quaternion):
+        quaternions = [(q.a, q.b, q.c, q.d) for q in quaternions]
+    data = np.asanyarray(quaternions, dtype=float)
+    if data.ndim != 2 or data.shape[1] != 4:
+        raise ValueError(f"Esperado um array (N, 4), recebido {data.shape}")
+    return data
+
+
+def _normalized(block):
+    """Cópia de um bloco (n, 4) com cada linha normalizada (Quaternion.normalize)."""
+    norms = np.sqrt(np.einsum('ij,ij->i', block, block))
+    if np.any(norms < _EPSILON):
+        raise ZeroDivisionError("Normalização de quaternião (aproximadamente) nulo")
+    return block / norms[:, np.newaxis]
+
+
+def _blocks(data, block_size):
+    """Blocos normalizados (início, fim, bloco) de um array (N, 4)."""
+    for start in range(0, len(data), block_size):
+        stop = min(len(data), start + block_size)
+        yield start, stop, _normalized(np.asarray(data[start:stop]))
+
+
+def _weights(weights, length):
+    """Pesos como array (N,), validados (None para pesos iguais)."""
+    if weights is None:
+        return None
+    weights = np.asanyarray(weights, dtype=float)
+    if weights.shape != (length,):
+        raise ValueError(f"São precisos {length} pesos, recebidos {weights.shape}")
+    if np.any(weights < 0):
+        raise ValueError("Os pesos não podem ser negativos")
+    return weights
+
+
+def mean_rotation(quaternions, weights=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Rotação média (média de Markley), com ou sem pesos.
+
+    A média é o quaternião unitário que maximiza Σ wᵢ (qᵢ·m)², ou seja, o
+    vector próprio do maior valor próprio da matriz 4x4 M = Σ wᵢ qᵢ qᵢᵀ,
+    acumulada bloco a bloco. Como qᵢ qᵢᵀ = (-qᵢ)(-qᵢ)ᵀ, o sinal de cada
+    amostra é indiferente.
+
+    Args:
+        quaternions: Amostras (ver as_components)
+        weights (array_like, optional): Peso de cada amostra (não negativo)
+        block_size (int): Linhas por bloco
+
+    Returns:
+        Quaternion: Rotação média, unitária e com parte real não negativa
+
+    Raises:
+        ValueError: Se não houver amostras ou os pesos forem inválidos
+        ZeroDivisionError: Se alguma amostra for nula
+    """
+    data = as_components(quaternions)
+    weights = _weights(weights, len(data))
+    if not len(data) or (weights is not None and not weights.sum() > 0):
+        raise ValueError("A média precisa de pelo menos uma amostra com peso positivo")
+    scatter = np.zeros((4, 4))
+    for start, stop, block in _blocks(data, block_size):
+        weighted = block if weights is None else block * np.asarray(weights[start:stop])[:, np.newaxis]
+        scatter += weighted.T @ block
+    # eigh devolve os valores próprios por ordem crescente
+    mean = np.linalg.eigh(scatter)[1][:, -1]
+    if mean[0] < 0:
+        mean = -mean
+    return Quaternion(*mean)
+
+
+def _reference(reference):
+    """Componentes normalizadas de uma rotação de referência."""
+    if not isinstance(reference, Quaternion):
+        reference = Quaternion(*reference)
+    reference = reference.normalize()
+    return np.array([reference.a, reference.b, reference.c, reference.d])
+
+
+def _angles_to(block, reference):
+    """
+    Ângulos das rotações conjugate(r)*q de um bloco normalizado, em [0, pi].
+
+    Com p = conjugate(r)*q, o ângulo é 2·min(arg(p), pi - arg(p)), calculado
+    como 2·atan2(|vec(p)|, |real(p)|), que é exacto também perto de zero.
+    """
+    a, v = reference[0], reference[1:]
+    real = block @ reference
+    # vec(conjugate(r)*q) = a·vec(q) - q.a·v - v x vec(q)
+    vector = a * block[:, 1:] - block[:, :1] * v - np.cross(v, block[:, 1:])
+    return 2 * np.arctan2(np.sqrt(np.einsum('ij,ij->i', vector, vector)), np.abs(real))
+
+
+def angular_distances(quaternions, reference, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Ângulo geodésico entre uma rotação de referência e cada amostra.
+
+    Args:
+        quaternions: Amostras (ver as_components)
+        reference (Quaternion): Rotação de referência (é normalizada)
+        block_size (int): Linhas por bloco
+
+    Returns:
+        np.ndarray: Ângulos (N,), em radianos, entre 0 e pi
+    """
+    data = as_components(quaternions)
+    reference = _reference(reference)
+    angles = np.empty(len(data))
+    for start, stop, block in _blocks(data, block_size):
+        angles[start:stop] = _angles_to(block, reference)
+    return angles
+
+
+def dispersion(quaternions, weights=None, mean=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Dispersão das rotações em torno da média.
+
+    Args:
+        quaternions: Amostras (ver as_components)
+        weights (array_like, optional): Peso de cada amostra
+        mean (Quaternion, optional): Referência; por omissão, a média de
+            mean_rotation com os mesmos pesos
+        block_size (int): Linhas por bloco
+
+    Returns:
+        Dispersion: Média e ângulos (ponderados) em torno dela
+
+    Raises:
+        ValueError: Se não houver amostras com peso positivo
+    """
+    data = as_components(quaternions)
+    weights = _weights(weights, len(data))
+    if mean is None:
+        mean = mean_rotation(data, weights, block_size)
+    reference = _reference(mean)
+    total = squares = weight_sum = 0.0
+    largest = 0.0
+    for start, stop, block in _blocks(data, block_size):
+        angles = _angles_to(block, reference)
+        block_weights = np.ones(len(angles)) if weights is None else np.asarray(weights[start:stop])
+        total += block_weights @ angles
+        squares += block_weights @ np.square(angles)
+        weight_sum += block_weights.sum()
+        # O máximo só considera amostras com peso
+        if np.any(block_weights > 0):
+            largest = max(largest, angles[block_weights > 0].max())
+    if not weight_sum > 0:
+        raise ValueError("A dispersão precisa de pelo menos uma amostra com peso positivo")
+    return Dispersion(mean, float(np.sqrt(squares / weight_sum)), float(total / weight_sum), float(largest))
+
+
+def distance_matrix(first, second=None, block_size=1024, out=None):
+    """
+    Ângulos geodésicos entre todos os pares de rotações de duas colecções.
+
+    O ângulo entre p e q é 2·arccos(|p·q|), igual ao de angular_distances a
+    menos da precisão do arccos perto de 1 (cerca de 1e-7 rad para rotações
+    quase iguais). A matriz é calculada por blocos de block_size x block_size;
+    com out em disco (np.memmap), a memória usada não depende de N.
+
+    Args:
+        first: Amostras (ver as_components), N linhas
+        second (optional): Outra colecção, M linhas; por omissão, first
+        block_size (int): Lado dos blocos
+        out (np.ndarray, optional): Array (N, M) onde escrever o resultado
+
+    Returns:
+        np.ndarray: Matriz (N, M) de ângulos, em radianos, entre 0 e pi
+
+    Raises:
+        ValueError: Se out não tiver a forma (N, M)
+    """
+    rows = as_components(first)
+    columns = rows if second is None else as_components(second)
+    if out is None:
+        out = np.empty((len(rows), len(columns)))
+    elif out.shape != (len(rows), len(columns)):
+        raise ValueError(f"out deve ter a forma {(len(rows), len(columns))}, tem {out.shape}")
+    for row_start, row_stop, row_block in _blocks(rows, block_size):
+        for column_start, column_stop, column_block in _blocks(columns, block_size):
+            cosines = np.abs(row_block @ column_block.T)
+            np.minimum(cosines, 1.0, out=cosines)
+            np.arccos(cosines, out=cosines)
+            out[row_start:row_stop, column_start:column_stop] = 2 * cosines
+    return out
+
+
+def _angles(cosines):
+    """Ângulos 2·arccos(|cos|) a partir dos produtos internos."""
+    cosines = np.minimum(np.abs(cosines), 1.0)
+    return 2 * np.arccos(cosines)
+
+
+class RotationIndex:
+    """
+    Índice de vizinhos mais próximos para rotações (quaterniões em S³, com q
+    e -q identificados).
+
+    As referências são agrupadas em células em torno de centróides (algumas
+    iterações de k-means com o ângulo geodésico) e cada célula guarda o seu
+    raio, o maior ângulo entre o centróide e os seus elementos. Como o ângulo
+    entre rotações é uma métrica, nenhum elemento de uma célula está mais
+    perto da consulta do que ângulo(consulta, centróide) - raio: as células
+    são visitadas por ordem deste limite inferior e a procura termina quando
+    ele excede o k-ésimo melhor ângulo, pelo que o resultado é exacto. Só as
+    células próximas são percorridas, com produtos matriciais do NumPy.
+
+    Args:
+        references: Rotações de referência (ver as_components), N linhas
+        cells (int, optional): Número de células (por omissão, cerca de √N)
+        iterations (int): Iterações de refinamento dos centróides
+        seed (int): Semente da escolha inicial dos centróides
+        block_size (int): Linhas por bloco na construção
+
+    Raises:
+        ValueError: Se não houver referências
+        ZeroDivisionError: Se alguma referência for nula
+    """
+
+    # Formato do ficheiro gravado por save()
+    FORMAT_VERSION = 1
+
+    # Margem (em radianos) dos limites inferiores, para cobrir os erros de
+    # arredondamento do arccos perto de 1
+    _SLACK = 1e-6
+
+    # Elementos da matriz de produtos referências x centróides por bloco (8 MiB)
+    _ASSIGN_ELEMENTS = 2 ** 20
+
+    def __init__(self, references=None, cells=None, iterations=2, seed=0, block_size=DEFAULT_BLOCK_SIZE):
+        if references is None:
+            # Construção a partir de um ficheiro (ver load)
+            return
+        data = as_components(references)
+        if not len(data):
+            raise ValueError("O índice precisa de pelo menos uma referência")
+        data = np.concatenate([block for _, _, block in _blocks(data, block_size)])
+        cells = max(1, min(len(data), cells or int(round(math.sqrt(len(data))))))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(data), cells, replace=False)]
+
+        for _ in range(iterations):
+            labels, cosines = self._assign(data, centroids, block_size)
+            # Novo centróide: soma dos elementos com o sinal alinhado ao actual
+            aligned = data * np.where(cosines < 0, -1.0, 1.0)[:, np.newaxis]
+            sums = np.stack([np.bincount(labels, aligned[:, j], cells) for j in range(4)], axis=1)
+            norms = np.sqrt(np.einsum('ij,ij->i', sums, sums))
+            filled = norms > _EPSILON
+            centroids[filled] = sums[filled] / norms[filled, np.newaxis]
+
+        labels, cosines = self._assign(data, centroids, block_size)
+        order = np.argsort(labels, kind='stable')
+        offsets = np.searchsorted(labels[order], np.arange(cells + 1))
+        # Raio de cada célula: maior ângulo ao centróide (0 nas células vazias)
+        filled = offsets[:-1] < offsets[1:]
+        radii = np.zeros(cells)
+        radii[filled] = np.maximum.reduceat(_angles(cosines[order]), offsets[:-1][filled])
+        self.references = data[order]
+        self.order = order
+        self.offsets = offsets
+        self.centroids = centroids
+        self.radii = radii
+
+    @classmethod
+    def _assign(cls, data, centroids, block_size):
+        """Célula (centróide de maior |cos|) e cos com sinal de cada referência."""
+        labels = np.empty(len(data), dtype=np.intp)
+        # A escolha da célula usa float32 (metade da memória a percorrer); um
+        # empate mal decidido só torna a célula um pouco maior, porque o raio
+        # vem do cos exacto ao centróide escolhido
+        single = centroids.T.astype(np.float32)
+        # A matriz de produtos de cada bloco tem block_size x células elementos
+        block_size = max(1, min(block_size, cls._ASSIGN_ELEMENTS // len(centroids)))
+        for start in range(0, len(data), block_size):
+            products = data[start:start + block_size].astype(np.float32) @ single
+            np.abs(products, out=products)
+            labels[start:start + block_size] = np.argmax(products, axis=1)
+        cosines = np.einsum('ij,ij->i', data, centroids[labels])
+        return labels, cosines
+
+    def __len__(self):
+        return len(self.references)
+
+    def __repr__(self):
+        return f"RotationIndex(N={len(self)}, células={len(self.centroids)})"
+
+    def _lower_bounds(self, query):
+        """Limite inferior do ângulo entre a consulta e os elementos de cada célula."""
+        return _angles(self.centroids @ query) - self.radii - self._SLACK
+
+    def _cell(self, cell):
+        start, stop = self.offsets[cell], self.offsets[cell + 1]
+        return self.references[start:stop], self.order[start:stop]
+
+    def query(self, queries, k=1):
+        """
+        As k rotações de referência mais próximas de cada consulta.
+
+        Args:
+            queries: Rotações a procurar (ver as_components; um Quaternion
+                isolado conta como uma consulta)
+            k (int): Número de vizinhos
+
+        Returns:
+            tuple: (ângulos, índices), arrays (M, k) por ordem crescente de
+                ângulo, com os índices das referências na ordem original
+
+        Raises:
+            ValueError: Se k não estiver entre 1 e o número de referências
+        """
+        if not 1 <= k <= len(self):
+            raise ValueError(f"k deve estar entre 1 e {len(self)}")
+        queries = _normalized(as_components([queries] if isinstance(queries, Quaternion) else queries))
+        angles = np.empty((len(queries), k))
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        for row, query in enumerate(queries):
+            bounds = self._lower_bounds(query)
+            best_cosines, best_indices = np.empty(0), np.empty(0, dtype=np.intp)
+            # Ângulo do k-ésimo melhor até agora (infinito enquanto houver menos de k)
+            limit = math.inf
+            for cell in np.argsort(bounds):
+                if bounds[cell] > limit:
+                    break
+                members, original = self._cell(cell)
+                if not len(members):
+                    continue
+                best_cosines = np.concatenate((best_cosines, np.abs(members @ query)))
+                best_indices = np.concatenate((best_indices, original))
+                if len(best_cosines) > k:
+                    keep = np.argpartition(-best_cosines, k - 1)[:k]
+                    best_cosines, best_indices = best_cosines[keep], best_indices[keep]
+                if len(best_cosines) == k:
+                    limit = _angles(best_cosines.min())
+            ranking = np.argsort(-best_cosines, kind='stable')
+            angles[row] = _angles(best_cosines[ranking])
+            indices[row] = best_indices[ranking]
+        return angles, indices
+
+    def query_radius(self, queries, radius):
+        """
+        Todas as rotações de referência a um ângulo não superior a radius.
+
+        Args:
+            queries: Rotações a procurar (ver query)
+            radius (float): Ângulo máximo, em radianos
+
+        Returns:
+            list: Por consulta, um par (ângulos, índices) por ordem crescente
+                de ângulo
+        """
+        queries = _normalized(as_components([queries] if isinstance(queries, Quaternion) else queries))
+        results = []
+        for query in queries:
+            found_angles, found_indices = [], []
+            for cell in np.flatnonzero(self._lower_bounds(query) <= radius):
+                members, original = self._cell(cell)
+                cell_angles = _angles(members @ query)
+                inside = cell_angles <= radius
+                found_angles.append(cell_angles[inside])
+                found_indices.append(original[inside])
+            cell_angles = np.concatenate(found_angles) if found_angles else np.empty(0)
+            original = np.concatenate(found_indices) if found_indices else np.empty(0, dtype=np.intp)
+            ranking = np.argsort(cell_angles, kind='stable')
+            results.append((cell_angles[ranking], original[ranking]))
+        return results
+
+    def save(self, path):
+        """
+        Grava o índice num ficheiro .npz (sem pickle).
+
+        Args:
+            path (str): Caminho do ficheiro
+        """
+        np.savez(path, version=self.FORMAT_VERSION, references=self.references, order=self.order,
+                 offsets=self.offsets, centroids=self.centroids, radii=self.radii)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Lê um índice gravado por save().
+
+        Args:
+            path (str): Caminho do ficheiro
+
+        Returns:
+            RotationIndex: Índice pronto a consultar
+
+        Raises:
+            ValueError: Se o ficheiro for de outra versão do formato
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != cls.FORMAT_VERSION:
+                raise ValueError(f"Versão do índice não suportada: {int(data['version'])}")
+            index = cls()
+            for name in ('references', 'order', 'offsets', 'centroids', 'radii'):
+                setattr(index, name, data[name])
+        return index
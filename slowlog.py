@@ -0,0 +1,103 @@
+"""
+Registo estruturado (JSON por linha) das avaliações de expressões lentas.
+
+Qualquer avaliação cujo tempo total (reescrita, avaliação e parser alternativo)
+exceda o limiar configurado é registada com a expressão original, a expressão
+reescrita, os tempos de cada etapa, o tipo de calculadora e o desfecho.
+As entradas podem ser reaproveitadas como corpus dos benchmarks de regressão.
+
+Configuração (variáveis de ambiente ou app.config):
+    SLOW_EXPR_THRESHOLD_MS: limiar em milissegundos; sem valor, o registo está desligado
+    SLOW_LOG_FILE: ficheiro de destino; sem valor, as entradas vão para stderr
+"""
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger('calculator.slowlog')
+
+# Etapas que contam para o tempo de avaliação
+EVAL_STAGES = ('rewrite', 'eval', 'from_string')
+
+_threshold = None
+
+
+def configure(threshold_ms=None, path=None):
+    """
+    Define o limiar do registo e, opcionalmente, o ficheiro de destino.
+
+    Args:
+        threshold_ms (float, optional): Limiar em milissegundos (None desliga o registo)
+        path (str, optional): Ficheiro onde acrescentar as entradas
+    """
+    global _threshold
+    _threshold = None if threshold_ms is None else float(threshold_ms) / 1000.0
+
+    # Um único handler próprio: ficheiro se indicado, caso contrário stderr
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+
+def record(calculator, expression, stats, error=None, angle_mode=None):
+    """
+    Regista a avaliação se o seu tempo total exceder o limiar.
+
+    Args:
+        calculator (str): Tipo de calculadora ('standard', 'quaternion', 'coquaternion')
+        expression (str): Expressão original introduzida pelo utilizador
+        stats (dict): Tempos por etapa e expressão reescrita ('rewritten')
+        error (Exception, optional): Excepção que fez falhar a avaliação
+        angle_mode (str, optional): Modo angular, apenas na calculadora principal
+
+    Returns:
+        bool: True se a avaliação foi registada
+    """
+    if _threshold is None:
+        return False
+    elapsed = sum(stats.get(stage, 0.0) for stage in EVAL_STAGES)
+    if elapsed < _threshold:
+        return False
+
+    if error is not None:
+        outcome = 'error'
+    elif 'eval_error' in stats:
+        outcome = 'fallback'
+    else:
+        outcome = 'ok'
+
+    entry = {
+        'timestamp': time.time(),
+        'calculator': calculator,
+        'expression': expression,
+        'rewritten': stats.get('rewritten'),
+        'timings_ms': {stage: round(stats[stage] * 1000, 4) for stage in EVAL_STAGES + ('format',) if stage in stats},
+        'total_ms': round(elapsed * 1000, 4),
+        'outcome': outcome,
+    }
+    if angle_mode is not None:
+        entry['angle_mode'] = angle_mode
+    if error is not None or 'eval_error' in stats:
+        entry['error'] = stats.get('eval_error', type(error).__name__)
+    logger.info(json.dumps(entry, ensure_ascii=False))
+    return True
+
+
+def init_app(app):
+    """
+    Configura o registo a partir de app.config, usando as variáveis de
+    ambiente como valores por omissão.
+
+    Args:
+        app (Flask): Aplicação a configurar
+    """
+    app.config.setdefault('SLOW_EXPR_THRESHOLD_MS', os.environ.get('SLOW_EXPR_THRESHOLD_MS'))
+    app.config.setdefault('SLOW_LOG_FILE', os.environ.get('SLOW_LOG_FILE'))
+    threshold = app.config['SLOW_EXPR_THRESHOLD_MS']
+    configure(threshold if threshold not in (None, '') else None, app.config['SLOW_LOG_FILE'])
@@ -117,6 +117,11 @@ function moveCursorRight() {
 function submitForm() {
     const form = document.querySelector('form');
     if (form) {
+        // requestSubmit dispara o evento 'submit', que trata da submissão em segundo plano
+        if (form.requestSubmit) {
+            form.requestSubmit();
+            return;
+        }
         setTimeout(function() {
             resultDisplayed = true;
             expressionFromHistoryForResult = null;
@@ -126,6 +131,122 @@ function submitForm() {
     }
 }
 
+// Número máximo de entradas do histórico (igual ao limite do servidor)
+const HISTORY_LIMIT = 20;
+let submissionPending = false;
+
+/**
+ * Cria o elemento de uma entrada do histórico, igual ao gerado pelos templates
+ * @param {Object} entry - Entrada com 'expression', 'result' e, se guardou
+ *                         o resultado em ans, 'ans'
+ * @returns {HTMLElement} - Elemento da entrada
+ */
+function createHistoryItem(entry) {
+    const item = document.createElement('div');
+    item.className = 'history-item';
+    if (entry.ans) {
+        item.dataset.ans = 'true';
+    }
+
+    const expression = document.createElement('div');
+    expression.className = 'history-expression';
+    expression.textContent = entry.expression;
+
+    const result = document.createElement('div');
+    result.className = 'history-result';
+    result.textContent = '= ' + entry.result;
+
+    const actions = document.createElement('div');
+    actions.className = 'history-actions';
+
+    const exprButton = document.createElement('button');
+    exprButton.type = 'button';
+    exprButton.className = 'history-action-btn expr-btn';
+    exprButton.textContent = 'Usar Expressão';
+    exprButton.addEventListener('click', function() {
+        useHistoryItem(entry.expression, true);
+    });
+
+    const resultButton = document.createElement('button');
+    resultButton.type = 'button';
+    resultButton.className = 'history-action-btn result-btn';
+    resultButton.textContent = 'Usar Resultado';
+    resultButton.addEventListener('click', function() {
+        useHistoryResult(resultButton, entry.result, entry.expression);
+    });
+
+    actions.appendChild(exprButton);
+    actions.appendChild(resultButton);
+    item.appendChild(expression);
+    item.appendChild(result);
+    item.appendChild(actions);
+    return item;
+}
+
+/**
+ * Acrescenta uma entrada no topo do painel de histórico, sem recarregar a página
+ * @param {Object} entry - Entrada com 'expression' e 'result'
+ */
+function prependHistoryItem(entry) {
+    const items = document.querySelector('.history-items');
+    if (!items) {
+        return;
+    }
+    const empty = items.querySelector('.history-empty');
+    if (empty) {
+        empty.remove();
+    }
+    items.insertBefore(createHistoryItem(entry), items.firstChild);
+
+    const all = items.querySelectorAll('.history-item');
+    for (let i = HISTORY_LIMIT; i < all.length; i++) {
+        all[i].remove();
+    }
+}
+
+/**
+ * Submete a expressão em segundo plano e actualiza o ecrã e o histórico.
+ * Se o pedido falhar, recorre à submissão normal do formulário.
+ * @param {HTMLFormElement} form - Formulário da calculadora
+ */
+function submitInBackground(form) {
+    if (submissionPending) {
+        return;
+    }
+    submissionPending = true;
+
+    fetch(form.getAttribute('action') || window.location.pathname, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'Accept': 'application/json' },
+        credentials: 'same-origin'
+    })
+        .then(function(response) {
+            const type = response.headers.get('Content-Type') || '';
+            if (!response.ok || !type.includes('application/json')) {
+                throw new Error('Resposta inesperada: ' + response.status);
+            }
+            return response.json();
+        })
+        .then(function(data) {
+            const display = document.getElementById('display');
+            display.value = data.result;
+            display.setSelectionRange(display.value.length, display.value.length);
+            resultDisplayed = !data.error;
+            expressionFromHistoryForResult = null;
+            if (data.entry) {
+                prependHistoryItem(data.entry);
+            }
+            schedulePreview();
+        })
+        .catch(function() {
+            form.submit();
+        })
+        .finally(function() {
+            submissionPending = false;
+        });
+}
+
 /**
  * Verifica se uma tecla é válida para a calculadora
  * @param {string} key - Tecla pressionada
@@ -146,6 +267,30 @@ function isCalculatorKey(key) {
     return validKeys.includes(key);
 }
 
+/**
+ * Verifica se o carácter antes do cursor é uma letra (a tecla continua um nome)
+ * @param {HTMLInputElement} display - Ecrã da calculadora
+ * @returns {boolean} - Verdadeiro se a tecla deve ser escrita tal como está
+ */
+function continuesIdentifier(display) {
+    if (resultDisplayed) {
+        return false;
+    }
+    const cursorPos = display.selectionStart || 0;
+    return /[A-Za-z_]/.test(display.value.charAt(cursorPos - 1));
+}
+
+/**
+ * Verifica se o ecrã contém só o início de uma atribuição ou definição de
+ * função ('q' ou 'f(x, y)'), caso em que '=' é escrito em vez de calcular
+ * @param {string} text - Conteúdo do ecrã
+ * @returns {boolean} - Verdadeiro se '=' deve ser escrito
+ */
+function isDefinitionHead(text) {
+    const match = /^\s*([A-Za-z_]\w*)\s*(\(\s*[A-Za-z_]\w*(\s*,\s*[A-Za-z_]\w*)*\s*\))?\s*$/.exec(text);
+    return match !== null && !['ans', 'pi', 'e', 'i', 'j', 'k'].includes(match[1]);
+}
+
 /**
  * Processa entrada de teclado
  * @param {string} key - Tecla pressionada
@@ -160,6 +305,13 @@ function handleKeyboardInput(key) {
         resultDisplayed = false;
         return;
     }
+
+    // Depois de uma letra, as teclas de atalho e a vírgula fazem parte do nome
+    // (variável, função ou lista de argumentos)
+    if ((/^[A-Za-z_]$/.test(key) || key === ',') && continuesIdentifier(display)) {
+        appendToDisplay(key);
+        return;
+    }
     
     switch(key) {
         case '0': case '1': case '2': case '3': case '4':
@@ -205,7 +357,12 @@ function handleKeyboardInput(key) {
             break;
             
         case '=':
-            submitForm();
+            if (!resultDisplayed && isDefinitionHead(display.value)) {
+                display.setSelectionRange(display.value.length, display.value.length);
+                appendToDisplay('=');
+            } else {
+                submitForm();
+            }
             break;
             
         case 's':
@@ -221,6 +378,12 @@ function handleKeyboardInput(key) {
         case 'l':
             appendToDisplay('log(');
             break;
+
+        default:
+            // Restantes letras: nomes de variáveis e funções do utilizador
+            if (/^[A-Za-z_]$/.test(key)) {
+                appendToDisplay(key);
+            }
     }
     
     if (display && resultDisplayed === false) {
@@ -259,8 +422,1233 @@ function useHistoryItem(value, isExpression, originalExpression = null) {
     }
 }
 
-// Eventos carregados quando o DOM estiver pronto
-document.addEventListener('DOMContentLoaded', function() {
+/**
+ * Utiliza o resultado de um item do histórico. Se for o cálculo mais recente e
+ * tiver ficado guardado em ans, usa 'ans' (o valor exacto, sem o reinterpretar
+ * a partir do texto); caso contrário, o texto do resultado.
+ * @param {HTMLElement} button - Botão 'Usar Resultado' do item
+ * @param {string} result - Texto do resultado
+ * @param {string} expression - Expressão que gerou o resultado
+ */
+function useHistoryResult(button, result, expression) {
+    const item = button.closest('.history-item');
+    const latest = item && item.parentNode.querySelector('.history-item') === item;
+    if (latest && item.dataset.ans === 'true') {
+        useHistoryItem('ans', false);
+    } else {
+        useHistoryItem(result, false, expression);
+    }
+}
+
+// ---------------------------------------------------------------------------
+// Avaliação local de expressões com quaterniões e coquaterniões
+// ---------------------------------------------------------------------------
+// Espelha hypercomplex.py para mostrar uma pré-visualização do resultado
+// enquanto o utilizador escreve. A expressão é reescrita com as mesmas regras
+// de _rewrite_hypercomplex_expr e avaliada com a semântica do Python (inteiros,
+// reais e as classes Quaternion/Coquaternion), incluindo o recurso a
+// from_string quando a avaliação falha. O servidor continua a ser a referência:
+// o resultado só é registado no histórico após a submissão.
+// A paridade com o Python é verificada por tools/js_parity.py.
+
+const HC_EPSILON = 1e-15;
+const FORMAT_EPSILON = 1e-12;
+
+/** Erro de avaliação (equivale a uma excepção no Python) */
+class EvaluationError extends Error {}
+
+/** Construção que o avaliador local não cobre; não há pré-visualização */
+class UnsupportedExpression extends Error {}
+
+/**
+ * Converte um escalar do Python (BigInt para int, Number para float) em Number
+ * @param {bigint|number} x - Escalar
+ * @returns {number} - Valor real
+ */
+function toFloat(x) {
+    if (typeof x === 'bigint') {
+        const value = Number(x);
+        if (!isFinite(value)) {
+            throw new EvaluationError('int too large to convert to float');
+        }
+        return value;
+    }
+    return x;
+}
+
+function isScalar(x) {
+    return typeof x === 'number' || typeof x === 'bigint';
+}
+
+function isNegativeZeroOrLess(x) {
+    return x < 0 || Object.is(x, -0);
+}
+
+function copysign(x, y) {
+    return isNegativeZeroOrLess(y) ? -Math.abs(x) : Math.abs(x);
+}
+
+/**
+ * Aplica uma função do módulo math do Python: erros de domínio e overflow
+ * (resultado não finito a partir de um argumento finito) levantam excepção
+ */
+function pyMath(fn, ...args) {
+    const values = args.map(toFloat);
+    const result = fn(...values);
+    if (values.every(isFinite) && !isFinite(result)) {
+        throw new EvaluationError('math domain error');
+    }
+    return result;
+}
+
+// Funções complexas com os algoritmos do módulo cmath do CPython
+// (números complexos representados como [real, imag])
+const CM_LOG_LARGE_DOUBLE = Math.log(Number.MAX_VALUE / 4);
+
+const cmath = {
+    sqrt([x, y]) {
+        if (x === 0 && y === 0) {
+            return [0, y];
+        }
+        const ax = Math.abs(x) / 8;
+        const s = 2 * Math.sqrt(ax + Math.hypot(ax, Math.abs(y) / 8));
+        const d = Math.abs(y) / (2 * s);
+        return x >= 0 ? [s, copysign(d, y)] : [d, copysign(s, y)];
+    },
+    exp([x, y]) {
+        const l = Math.exp(x);
+        return [l * Math.cos(y), l * Math.sin(y)];
+    },
+    log([x, y]) {
+        const ax = Math.abs(x);
+        const ay = Math.abs(y);
+        if (ax === 0 && ay === 0) {
+            throw new EvaluationError('math domain error');
+        }
+        const h = Math.hypot(ax, ay);
+        let real;
+        if (h >= 0.71 && h <= 1.73) {
+            const am = Math.max(ax, ay);
+            const an = Math.min(ax, ay);
+            real = Math.log1p((am - 1) * (am + 1) + an * an) / 2;
+        } else {
+            real = Math.log(h);
+        }
+        return [real, Math.atan2(y, x)];
+    },
+    sinh([x, y]) {
+        return [Math.cos(y) * Math.sinh(x), Math.sin(y) * Math.cosh(x)];
+    },
+    cosh([x, y]) {
+        return [Math.cos(y) * Math.cosh(x), Math.sin(y) * Math.sinh(x)];
+    },
+    tanh([x, y]) {
+        if (Math.abs(x) > CM_LOG_LARGE_DOUBLE) {
+            return [copysign(1, x), 4 * Math.sin(y) * Math.cos(y) * Math.exp(-2 * Math.abs(x))];
+        }
+        const tx = Math.tanh(x);
+        const ty = Math.tan(y);
+        const cx = 1 / Math.cosh(x);
+        const txty = tx * ty;
+        const denom = 1 + txty * txty;
+        return [tx * (1 + ty * ty) / denom, ((ty / denom) * cx) * cx];
+    },
+    sin([x, y]) {
+        const s = cmath.sinh([-y, x]);
+        return [s[1], -s[0]];
+    },
+    cos([x, y]) {
+        return cmath.cosh([-y, x]);
+    },
+    tan([x, y]) {
+        const s = cmath.tanh([-y, x]);
+        return [s[1], -s[0]];
+    },
+    asinh([x, y]) {
+        const s1 = cmath.sqrt([1 + y, -x]);
+        const s2 = cmath.sqrt([1 - y, x]);
+        return [Math.asinh(s1[0] * s2[1] - s2[0] * s1[1]), Math.atan2(y, s1[0] * s2[0] - s1[1] * s2[1])];
+    },
+    asin([x, y]) {
+        const s = cmath.asinh([-y, x]);
+        return [s[1], -s[0]];
+    },
+    acos([x, y]) {
+        const s1 = cmath.sqrt([1 - x, -y]);
+        const s2 = cmath.sqrt([1 + x, y]);
+        return [2 * Math.atan2(s1[0], s2[0]), Math.asinh(s2[0] * s1[1] - s2[1] * s1[0])];
+    },
+    acosh([x, y]) {
+        const s1 = cmath.sqrt([x - 1, y]);
+        const s2 = cmath.sqrt([x + 1, y]);
+        return [Math.asinh(s1[0] * s2[0] + s1[1] * s2[1]), 2 * Math.atan2(s1[1], s2[0])];
+    },
+    atanh([x, y]) {
+        if (x < 0) {
+            const r = cmath.atanh([-x, -y]);
+            return [-r[0], -r[1]];
+        }
+        const ay = Math.abs(y);
+        if (x === 1 && ay === 0) {
+            throw new EvaluationError('math domain error');
+        }
+        return [
+            Math.log1p(4 * x / ((1 - x) * (1 - x) + ay * ay)) / 4,
+            -Math.atan2(-2 * y, (1 - x) * (1 + x) - ay * ay) / 2
+        ];
+    },
+    atan([x, y]) {
+        const s = cmath.atanh([-y, x]);
+        return [s[1], -s[0]];
+    }
+};
+
+/** Aplica uma função de cmath, levantando excepção em overflow como o CPython */
+function pyCmath(name, z) {
+    const result = cmath[name](z);
+    if (isFinite(z[0]) && isFinite(z[1]) && !(isFinite(result[0]) && isFinite(result[1]))) {
+        throw new EvaluationError('math range error');
+    }
+    return result;
+}
+
+/**
+ * Formata um componente como Quaternion.__str__ (format_num)
+ * @param {number} n - Componente
+ * @returns {string} - Texto do componente
+ */
+function formatComponent(n) {
+    if (!isFinite(n)) {
+        throw new EvaluationError('cannot convert float to integer');
+    }
+    const rounded = Math.round(n);
+    if (Math.abs(n - rounded) < FORMAT_EPSILON) {
+        return BigInt(rounded).toString();
+    }
+    // Equivalente a f"{n:.6g}" seguido de rstrip('0').rstrip('.')
+    const exponent = Number(n.toExponential(5).split('e')[1]);
+    let text;
+    if (exponent >= -4 && exponent < 6) {
+        text = n.toFixed(5 - exponent);
+        if (text.includes('.')) {
+            text = text.replace(/0+$/, '').replace(/\.$/, '');
+        }
+    } else {
+        const [mantissa, exp] = n.toExponential(5).split('e');
+        const trimmed = mantissa.includes('.') ? mantissa.replace(/0+$/, '').replace(/\.$/, '') : mantissa;
+        const sign = exp[0] === '-' ? '-' : '+';
+        const digits = exp.replace(/^[+-]/, '').padStart(2, '0');
+        text = `${trimmed}e${sign}${digits}`;
+    }
+    text = text.replace(/0+$/, '').replace(/\.$/, '');
+    return text === '-0' ? '0' : text;
+}
+
+/**
+ * Base comum de Quaternion e Coquaternion: componentes, soma, subtracção,
+ * conjugado, partes real e vectorial e representação em texto
+ */
+class Hypercomplex {
+    constructor(a = 0, b = 0, c = 0, d = 0) {
+        this.a = Hypercomplex.component(a);
+        this.b = Hypercomplex.component(b);
+        this.c = Hypercomplex.component(c);
+        this.d = Hypercomplex.component(d);
+    }
+
+    static component(x) {
+        if (!isScalar(x)) {
+            throw new EvaluationError('float() argument must be a string or a real number');
+        }
+        return toFloat(x);
+    }
+
+    make(a, b, c, d) {
+        return new this.constructor(a, b, c, d);
+    }
+
+    add(other) {
+        if (isScalar(other)) {
+            return this.make(this.a + toFloat(other), this.b, this.c, this.d);
+        }
+        return this.make(this.a + other.a, this.b + other.b, this.c + other.c, this.d + other.d);
+    }
+
+    sub(other) {
+        if (isScalar(other)) {
+            return this.make(this.a - toFloat(other), this.b, this.c, this.d);
+        }
+        return this.make(this.a - other.a, this.b - other.b, this.c - other.c, this.d - other.d);
+    }
+
+    scale(k) {
+        return this.make(this.a * k, this.b * k, this.c * k, this.d * k);
+    }
+
+    mul(other) {
+        if (isScalar(other)) {
+            return this.scale(toFloat(other));
+        }
+        return this.product(other);
+    }
+
+    div(other) {
+        if (isScalar(other)) {
+            if (other == 0) {
+                throw new EvaluationError('division by zero');
+            }
+            return this.mul(1.0 / toFloat(other));
+        }
+        return this.mul(other.inverse());
+    }
+
+    leftDivision(other) {
+        if (isScalar(other)) {
+            if (other == 0) {
+                throw new EvaluationError('division by zero');
+            }
+            return this.mul(1.0 / toFloat(other));
+        }
+        return other.inverse().mul(this);
+    }
+
+    conjugate() {
+        return this.make(this.a, -this.b, -this.c, -this.d);
+    }
+
+    real() {
+        return this.make(this.a, 0, 0, 0);
+    }
+
+    vectorial() {
+        return this.make(0, this.b, this.c, this.d);
+    }
+
+    tenPower() {
+        return this.mul(Math.log(10)).exp();
+    }
+
+    toString() {
+        const parts = [];
+        const components = [[this.b, 'i'], [this.c, 'j'], [this.d, 'k']];
+        const vectorZero = components.every(([value]) => Math.abs(value) < FORMAT_EPSILON);
+        if (Math.abs(this.a) > FORMAT_EPSILON || vectorZero) {
+            parts.push(formatComponent(this.a));
+        }
+        for (const [value, unit] of components) {
+            if (Math.abs(value) > FORMAT_EPSILON) {
+                const sign = value > 0 ? '+' : '-';
+                const magnitude = Math.abs(value);
+                const term = Math.abs(magnitude - 1) < FORMAT_EPSILON ? unit : formatComponent(magnitude) + unit;
+                parts.push(parts.length ? sign + term : (sign === '-' ? '-' : '') + term);
+            }
+        }
+        const result = parts.join('');
+        return result.startsWith('+') ? result.slice(1) : (result || '0');
+    }
+}
+
+/** Quaternião com a álgebra de Hamilton (espelha hypercomplex.Quaternion) */
+class Quaternion extends Hypercomplex {
+    product(o) {
+        return new Quaternion(
+            this.a * o.a - this.b * o.b - this.c * o.c - this.d * o.d,
+            this.a * o.b + this.b * o.a + this.c * o.d - this.d * o.c,
+            this.a * o.c - this.b * o.d + this.c * o.a + this.d * o.b,
+            this.a * o.d + this.b * o.c - this.c * o.b + this.d * o.a
+        );
+    }
+
+    normSquared() {
+        return this.a ** 2 + this.b ** 2 + this.c ** 2 + this.d ** 2;
+    }
+
+    norm() {
+        return Math.sqrt(this.normSquared());
+    }
+
+    inverse() {
+        const n = this.normSquared();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Inverso de quaternião (aproximadamente) nulo');
+        }
+        const conj = this.conjugate();
+        return new Quaternion(conj.a / n, conj.b / n, conj.c / n, conj.d / n);
+    }
+
+    normalize() {
+        const n = this.norm();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Normalização de quaternião (aproximadamente) nulo');
+        }
+        return new Quaternion(this.a / n, this.b / n, this.c / n, this.d / n);
+    }
+
+    arg() {
+        const n = this.norm();
+        if (Math.abs(n) < HC_EPSILON) {
+            return 0.0;
+        }
+        return Math.acos(Math.max(-1.0, Math.min(1.0, this.a / n)));
+    }
+
+    vecNorm() {
+        return Math.sqrt(this.b ** 2 + this.c ** 2 + this.d ** 2);
+    }
+
+    vecNormalize() {
+        const n = this.vecNorm();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Normalização de parte vectorial (aproximadamente) nula');
+        }
+        return new Quaternion(0, this.b / n, this.c / n, this.d / n);
+    }
+
+    pow(exponent) {
+        if (typeof exponent === 'bigint') {
+            if (exponent === 2n) {
+                return this.mul(this);
+            } else if (exponent === 0n) {
+                return new Quaternion(1, 0, 0, 0);
+            } else if (exponent === 1n) {
+                return this;
+            } else if (exponent < 0n) {
+                if (exponent === -1n) {
+                    return this.inverse();
+                }
+                if (exponent < -100000n) {
+                    throw new UnsupportedExpression('expoente demasiado grande');
+                }
+                const inv = this.inverse();
+                let res = new Quaternion(1, 0, 0, 0);
+                for (let n = 0n; n < -exponent; n++) {
+                    res = res.mul(inv);
+                }
+                return res;
+            }
+            let res = new Quaternion(1, 0, 0, 0);
+            let temp = this;
+            let n = exponent;
+            while (n > 0n) {
+                if (n % 2n === 1n) {
+                    res = res.mul(temp);
+                }
+                temp = temp.mul(temp);
+                n /= 2n;
+            }
+            return res;
+        } else if (typeof exponent === 'number') {
+            return this.ln().mul(exponent).exp();
+        } else if (exponent instanceof Quaternion) {
+            return exponent.mul(this.ln()).exp();
+        }
+        throw new EvaluationError('Expoente para potenciação de quaternião deve ser inteiro, float ou quaternião.');
+    }
+
+    applyComplex(name) {
+        const s = this.a;
+        const normVSq = this.b ** 2 + this.c ** 2 + this.d ** 2;
+        if (normVSq < HC_EPSILON ** 2) {
+            const r = pyCmath(name, [s, 0.0]);
+            return new Quaternion(r[0], r[1], 0.0, 0.0);
+        }
+        const normV = Math.sqrt(normVSq);
+        const [ac, bc] = pyCmath(name, [s, normV]);
+        if (!isFinite(bc) && !isNaN(bc)) {
+            const units = [this.b / normV, this.c / normV, this.d / normV];
+            const [rb, rc, rd] = units.map(u => (Math.abs(u) > HC_EPSILON ? copysign(Infinity, bc * u) : 0.0));
+            return new Quaternion(ac, rb, rc, rd);
+        }
+        const factor = bc / normV;
+        return new Quaternion(ac, factor * this.b, factor * this.c, factor * this.d);
+    }
+}
+
+for (const name of ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'sinh', 'cosh', 'tanh',
+                    'asinh', 'acosh', 'atanh', 'exp', 'sqrt']) {
+    Quaternion.prototype[name] = function() {
+        return this.applyComplex(name);
+    };
+}
+Quaternion.prototype.ln = function() {
+    return this.applyComplex('log');
+};
+
+/** Coquaternião com métrica de Minkowski (espelha hypercomplex.Coquaternion) */
+class Coquaternion extends Hypercomplex {
+    product(o) {
+        return new Coquaternion(
+            this.a * o.a - this.b * o.b + this.c * o.c + this.d * o.d,
+            o.a * this.b + this.a * o.b + o.c * this.d - this.c * o.d,
+            o.a * this.c + this.a * o.c + o.b * this.d - this.b * o.d,
+            -(o.b * this.c) + this.b * o.c + o.a * this.d + this.a * o.d
+        );
+    }
+
+    minkowskiSquared() {
+        return this.a ** 2 + this.b ** 2 - this.c ** 2 - this.d ** 2;
+    }
+
+    inverse() {
+        const n = this.minkowskiSquared();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Inverso de coquaternião (aproximadamente) nulo segundo métrica de Minkowski');
+        }
+        const conj = this.conjugate();
+        return new Coquaternion(conj.a / n, conj.b / n, conj.c / n, conj.d / n);
+    }
+
+    vecNorm() {
+        return Math.sqrt(Math.abs(this.b ** 2 - this.c ** 2 - this.d ** 2));
+    }
+
+    vecNormalize() {
+        const n = this.vecNorm();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Normalização de parte vectorial (aproximadamente) nula');
+        }
+        return new Coquaternion(0, this.b / n, this.c / n, this.d / n);
+    }
+
+    norm() {
+        return Math.sqrt(Math.abs(this.minkowskiSquared()));
+    }
+
+    classify() {
+        const discriminant = this.b ** 2 - this.c ** 2 - this.d ** 2;
+        if (Math.abs(discriminant) < HC_EPSILON) {
+            return 'L';
+        }
+        return discriminant > 0 ? 'T' : 'S';
+    }
+
+    omega() {
+        const n = this.vecNorm();
+        if (Math.abs(n) < HC_EPSILON) {
+            return this.vectorial();
+        }
+        return new Coquaternion(0, this.b / n, this.c / n, this.d / n);
+    }
+
+    /**
+     * Combina parte real e múltiplo de ωq, segundo a classificação T/L/S
+     * @param {Object} formulas - Para cada classe, função (q0, ||q||) => [real, coeficiente de ωq]
+     */
+    byClass(formulas) {
+        const classification = this.classify();
+        const [real, factor] = formulas[classification](this.a, this.vecNorm());
+        const vec = this.omega().mul(factor);
+        return new Coquaternion(real, vec.b, vec.c, vec.d);
+    }
+
+    exp() {
+        const e0 = pyMath(Math.exp, this.a);
+        return this.byClass({
+            T: (q0, n) => [e0 * Math.cos(n), e0 * Math.sin(n)],
+            S: (q0, n) => [e0 * pyMath(Math.cosh, n), e0 * pyMath(Math.sinh, n)],
+            L: () => [e0, e0]
+        });
+    }
+
+    sin() {
+        return this.byClass({
+            T: (q0, n) => [Math.sin(q0) * pyMath(Math.cosh, n), Math.cos(q0) * pyMath(Math.sinh, n)],
+            S: (q0, n) => [Math.sin(q0) * Math.cos(n), Math.cos(q0) * Math.sin(n)],
+            L: (q0) => [Math.sin(q0), Math.cos(q0)]
+        });
+    }
+
+    cos() {
+        return this.byClass({
+            T: (q0, n) => [Math.cos(q0) * pyMath(Math.cosh, n), -Math.sin(q0) * pyMath(Math.sinh, n)],
+            S: (q0, n) => [Math.cos(q0) * Math.cos(n), -Math.sin(q0) * Math.sin(n)],
+            L: (q0) => [Math.cos(q0), -Math.sin(q0)]
+        });
+    }
+
+    sinh() {
+        return this.byClass({
+            T: (q0, n) => [pyMath(Math.sinh, q0) * Math.cos(n), pyMath(Math.cosh, q0) * Math.sin(n)],
+            S: (q0, n) => [pyMath(Math.sinh, q0) * pyMath(Math.cosh, n), pyMath(Math.cosh, q0) * pyMath(Math.sinh, n)],
+            L: (q0) => [pyMath(Math.sinh, q0), pyMath(Math.cosh, q0)]
+        });
+    }
+
+    cosh() {
+        return this.byClass({
+            T: (q0, n) => [pyMath(Math.cosh, q0) * Math.cos(n), pyMath(Math.sinh, q0) * Math.sin(n)],
+            S: (q0, n) => [pyMath(Math.cosh, q0) * pyMath(Math.cosh, n), pyMath(Math.sinh, q0) * pyMath(Math.sinh, n)],
+            L: (q0) => [pyMath(Math.cosh, q0), pyMath(Math.sinh, q0)]
+        });
+    }
+
+    tanh() {
+        return this.sinh().div(this.cosh());
+    }
+
+    tan() {
+        return this.sin().div(this.cos());
+    }
+
+    ln() {
+        if ([this.a, this.b, this.c, this.d].every(x => Math.abs(x) < HC_EPSILON)) {
+            throw new EvaluationError('Logaritmo de coquaternião nulo é indefinido');
+        }
+        const normSquared = this.minkowskiSquared();
+        return this.byClass({
+            T: (q0, n) => {
+                if (normSquared <= 0) {
+                    throw new EvaluationError('Norma de Minkowski para coquaternião timelike no logaritmo');
+                }
+                return [pyMath(Math.log, Math.sqrt(normSquared)), Math.atan2(n, q0)];
+            },
+            S: (q0, n) => {
+                if (q0 <= 0 || normSquared <= 0) {
+                    throw new EvaluationError('Logaritmo de coquaternião spacelike fora do domínio');
+                }
+                const ratio = n / q0;
+                if (Math.abs(ratio) >= 1) {
+                    throw new EvaluationError('Argumento de arctanh fora do domínio válido');
+                }
+                return [pyMath(Math.log, Math.sqrt(normSquared)), Math.atanh(ratio)];
+            },
+            L: (q0) => {
+                if (q0 <= 0) {
+                    throw new EvaluationError('Parte real deve ser positiva para coquaternião lightlike no logaritmo');
+                }
+                return [Math.log(q0), 1.0 / q0];
+            }
+        });
+    }
+
+    atan() {
+        const omega = this.omega();
+        const omegaQ = omega.mul(this);
+        const one = new Coquaternion(1, 0, 0, 0);
+        return omega.mul(-1).mul(one.add(omegaQ).div(one.sub(omegaQ)).ln());
+    }
+
+    normMinkowski() {
+        const n = this.minkowskiSquared();
+        if (n < 0) {
+            throw new EvaluationError('Norma de Minkowski ao quadrado é negativa');
+        }
+        return Math.sqrt(n);
+    }
+
+    normalizeMinkowski() {
+        const n = this.normMinkowski();
+        if (Math.abs(n) < HC_EPSILON) {
+            throw new EvaluationError('Normalização de coquaternião com norma de Minkowski nula');
+        }
+        return new Coquaternion(this.a / n, this.b / n, this.c / n, this.d / n);
+    }
+
+    pow(exponent) {
+        if (typeof exponent === 'bigint') {
+            if (exponent === 0n) {
+                return new Coquaternion(1, 0, 0, 0);
+            } else if (exponent === 1n) {
+                return this;
+            } else if (exponent === 2n) {
+                return this.mul(this);
+            } else if (exponent === -1n) {
+                return this.inverse();
+            }
+        }
+        if (!isScalar(exponent)) {
+            throw new EvaluationError('Erro no cálculo da potência');
+        }
+        return this.ln().mul(exponent).exp();
+    }
+
+    sqrt() {
+        return this.pow(0.5);
+    }
+}
+
+// --- Aritmética com a semântica do Python -----------------------------------
+
+/** Operação binária entre escalares do Python (int como BigInt, float como Number) */
+function scalarBinop(op, x, y) {
+    const ints = typeof x === 'bigint' && typeof y === 'bigint';
+    switch (op) {
+        case '+': return ints ? x + y : toFloat(x) + toFloat(y);
+        case '-': return ints ? x - y : toFloat(x) - toFloat(y);
+        case '*': return ints ? x * y : toFloat(x) * toFloat(y);
+        case '/':
+            if (y == 0) {
+                throw new EvaluationError('division by zero');
+            }
+            return toFloat(x) / toFloat(y);
+        case '**': {
+            if (ints && y >= 0n) {
+                if (y > 10000n && (x > 1n || x < -1n)) {
+                    throw new UnsupportedExpression('potência inteira demasiado grande');
+                }
+                return x ** y;
+            }
+            const base = toFloat(x);
+            const exponent = toFloat(y);
+            if (base === 0 && exponent < 0) {
+                throw new EvaluationError('0.0 cannot be raised to a negative power');
+            }
+            if (base < 0 && !Number.isInteger(exponent) && isFinite(exponent)) {
+                // O Python devolve um número complexo
+                throw new UnsupportedExpression('potência com resultado complexo');
+            }
+            return pyMath(Math.pow, base, exponent);
+        }
+    }
+    throw new UnsupportedExpression(op);
+}
+
+/** Operação binária com o despacho do Python (__op__ e __rop__) */
+function binop(op, x, y) {
+    const xh = x instanceof Hypercomplex;
+    const yh = y instanceof Hypercomplex;
+    if (!xh && !yh) {
+        if (!isScalar(x) || !isScalar(y)) {
+            throw new EvaluationError('unsupported operand type(s)');
+        }
+        return scalarBinop(op, x, y);
+    }
+    if ((xh && !yh && !isScalar(y)) || (yh && !xh && !isScalar(x))) {
+        throw new EvaluationError('unsupported operand type(s)');
+    }
+    if (xh) {
+        switch (op) {
+            case '+': return x.add(y);
+            case '-': return x.sub(y);
+            case '*': return x.mul(y);
+            case '/': return x.div(y);
+            case '**': return x.pow(y);
+        }
+    }
+    // Escalar à esquerda: métodos __r*__
+    switch (op) {
+        case '+': return y.add(x);
+        case '-': return y.sub(x).mul(-1n);
+        case '*': return y.mul(x);
+        case '/': return y.inverse().mul(x);
+    }
+    throw new EvaluationError('unsupported operand type(s)');
+}
+
+function unaryMinus(x) {
+    if (!isScalar(x)) {
+        throw new EvaluationError('bad operand type for unary -');
+    }
+    return -x;
+}
+
+function pyAbs(x) {
+    if (typeof x === 'bigint') {
+        return x < 0n ? -x : x;
+    }
+    return Math.abs(x);
+}
+
+/**
+ * Ambiente de avaliação equivalente ao safe_env de parse_quaternion_expr
+ * ou de parse_coquaternion_expr
+ */
+function buildEnvironment(algebra) {
+    const Cls = algebra === 'coquaternion' ? Coquaternion : Quaternion;
+    const className = algebra === 'coquaternion' ? 'Coquaternion' : 'Quaternion';
+    const isH = q => q instanceof Cls;
+    const asH = q => (isH(q) ? q : new Cls(q));
+    const method = (name, scalarFn) => q => (isH(q) ? q[name]() : scalarFn(q));
+    const real = fn => q => pyMath(fn, q);
+
+    const env = {
+        pi: Math.PI,
+        e: Math.E,
+        conjugate: q => asH(q).conjugate(),
+        norm: method('norm', pyAbs),
+        vectorial: method('vectorial', () => new Cls(0, 0, 0, 0)),
+        real: method('real', q => new Cls(q)),
+        sqrt: method('sqrt', real(Math.sqrt)),
+        inverse: method('inverse', q => scalarBinop('/', 1.0, q)),
+        sin: method('sin', real(Math.sin)),
+        cos: method('cos', real(Math.cos)),
+        tan: method('tan', real(Math.tan)),
+        sinh: method('sinh', real(Math.sinh)),
+        cosh: method('cosh', real(Math.cosh)),
+        tanh: method('tanh', real(Math.tanh)),
+        atan: method('atan', real(Math.atan)),
+        exp: method('exp', real(Math.exp)),
+        ln: method('ln', real(Math.log)),
+        divL: (q, p) => asH(q).leftDivision(asH(p)),
+        divR: (q, p) => asH(q).div(asH(p)),
+        neg: q => (isH(q) ? new Cls(-q.a, -q.b, -q.c, -q.d) : unaryMinus(q)),
+        absIJK: q => (isH(q) ? q.vecNorm() : 0n),
+        pow10: q => (isH(q) ? q.tenPower() : pyMath(Math.pow, 10, q)),
+        pow: (q, n) => {
+            if (isH(q)) {
+                return q.pow(n);
+            }
+            if (!isScalar(n)) {
+                throw new EvaluationError('must be real number');
+            }
+            return pyMath(Math.pow, q, n);
+        }
+    };
+    env[className] = (...args) => {
+        if (args.length > 4) {
+            throw new EvaluationError('too many arguments');
+        }
+        return new Cls(...args);
+    };
+    const normalizeScalar = q => (q != 0 ? scalarBinop('/', q, pyAbs(q)) : 0n);
+
+    if (Cls === Quaternion) {
+        Object.assign(env, {
+            normalize: method('normalize', normalizeScalar),
+            arg: q => (isH(q) ? q.arg() : (q >= 0 ? Math.atan2(0, toFloat(q)) : Math.PI)),
+            asin: method('asin', real(Math.asin)),
+            acos: method('acos', real(Math.acos)),
+            asinh: method('asinh', real(Math.asinh)),
+            acosh: q => (isH(q) ? q.acosh() : new Quaternion(toFloat(q)).acosh()),
+            atanh: method('atanh', real(Math.atanh)),
+            sign: q => (isH(q) ? q.vecNormalize() : new Quaternion(0, 0, 0, 0))
+        });
+    } else {
+        Object.assign(env, {
+            normalize: method('normalizeMinkowski', normalizeScalar),
+            log: method('ln', real(Math.log)),
+            sign: q => (isH(q) ? q.omega() : new Coquaternion(0, 0, 0, 0)),
+            norm_mink: method('normMinkowski', pyAbs),
+            normalize_mink: method('normalizeMinkowski', normalizeScalar)
+        });
+    }
+    return env;
+}
+
+// --- Reescrita e análise sintáctica ------------------------------------------
+
+/**
+ * Reescreve a expressão com as mesmas regras de _rewrite_hypercomplex_expr
+ * @param {string} expression - Expressão introduzida pelo utilizador
+ * @param {string} className - 'Quaternion' ou 'Coquaternion'
+ * @returns {string} - Expressão reescrita (sintaxe Python)
+ */
+function rewriteHypercomplexExpr(expression, className) {
+    expression = expression.split('×').join('*');
+    expression = expression.split('^').join('**');
+
+    expression = expression.replace(/√(\d+)/g, 'sqrt($1)');
+    expression = expression.replace(/√\(([^)]+)\)/g, 'sqrt($1)');
+
+    expression = expression.replace(/(\d+)([ijk])(?!\w)/g, '$1*$2');
+    expression = expression.replace(/([ijk])(\d+)(?!\w)/g, '$1*$2');
+    expression = expression.replace(/(\w+\([^()]*(?:\([^()]*\)[^()]*)*\))([ijk])(?!\w)/g, '$1*$2');
+    expression = expression.replace(/([a-oq-zA-OQ-Z_][a-oq-zA-OQ-Z0-9_]*)([ijk])(?!\w)/g, '$1*$2');
+
+    expression = expression.replace(/\bi\b/g, `${className}(0,1,0,0)`);
+    expression = expression.replace(/\bj\b/g, `${className}(0,0,1,0)`);
+    expression = expression.replace(/\bk\b/g, `${className}(0,0,0,1)`);
+
+    expression = expression.replace(/(\w|\)|\d)\s*-\s*/g, '$1 __MINUS__ ');
+
+    const negPattern = /-(\w+\(.*?\))/;
+    while (negPattern.test(expression)) {
+        expression = expression.replace(/-(\w+\(.*?\))/g, 'neg($1)');
+    }
+
+    expression = expression.replace(/-([ijk])\b/g, 'neg($1)');
+    expression = expression.replace(/(?<![a-zA-Z0-9_])-(\d+(\.\d+)?)/g, 'neg($1)');
+    expression = expression.split('__MINUS__').join('-');
+
+    const negFuncPattern = /-\s*(divL|divR)\s*\(/g;
+    if (/-\s*(divL|divR)\s*\(/.test(expression)) {
+        expression = expression.replace(negFuncPattern, ' - neg($1(');
+        // Como no Python, as posições vêm da expressão antes das inserções
+        const matches = [...expression.matchAll(/neg\((divL|divR)\(/g)];
+        for (const match of matches) {
+            const startPos = match.index + match[0].length - 1;
+            let count = 1;
+            let closePos = startPos;
+            for (let i = startPos + 1; i < expression.length; i++) {
+                if (expression[i] === '(') {
+                    count++;
+                } else if (expression[i] === ')') {
+                    count--;
+                    if (count === 0) {
+                        closePos = i;
+                        break;
+                    }
+                }
+            }
+            if (closePos < expression.length && count === 0) {
+                expression = expression.slice(0, closePos + 1) + ')' + expression.slice(closePos + 1);
+            }
+        }
+    }
+    return expression;
+}
+
+const PYTHON_KEYWORDS = new Set(['and', 'or', 'not', 'in', 'is', 'if', 'else', 'lambda', 'None', 'True',
+                                 'False', 'for', 'await', 'yield']);
+
+/**
+ * Divide uma expressão (sintaxe Python) em símbolos
+ * @param {string} source - Expressão reescrita
+ * @returns {Array} - Lista de símbolos {type, value}
+ */
+function tokenize(source) {
+    const tokens = [];
+    const pattern = /\s*(?:(\d[\d_]*\.?[\d_]*(?:[eE][+-]?\d[\d_]*)?|\.\d[\d_]*(?:[eE][+-]?\d[\d_]*)?)|([A-Za-z_]\w*)|(\*\*|[-+*\/(),]))/y;
+    let pos = 0;
+    while (pos < source.length) {
+        if (/^\s*$/.test(source.slice(pos))) {
+            break;
+        }
+        pattern.lastIndex = pos;
+        const match = pattern.exec(source);
+        if (!match) {
+            throw new UnsupportedExpression(`símbolo não suportado na posição ${pos}`);
+        }
+        pos = pattern.lastIndex;
+        if (match[1] !== undefined) {
+            const text = match[1];
+            const next = source[pos];
+            if (next !== undefined && /[A-Za-z_0-9.]/.test(next)) {
+                if (/[jJ]/.test(next)) {
+                    throw new UnsupportedExpression('literal complexo');
+                }
+                throw new SyntaxError('invalid decimal literal');
+            }
+            if (/_$|_[eE._]|[eE.]_|__/.test(text) || /^0+[1-9]/.test(text) && !/[.eE]/.test(text)) {
+                throw new SyntaxError('invalid literal');
+            }
+            const clean = text.replace(/_/g, '');
+            tokens.push({ type: 'number', value: /[.eE]/.test(clean) ? Number(clean) : BigInt(clean) });
+        } else if (match[2] !== undefined) {
+            if (PYTHON_KEYWORDS.has(match[2])) {
+                throw new UnsupportedExpression(`palavra reservada: ${match[2]}`);
+            }
+            tokens.push({ type: 'name', value: match[2] });
+        } else {
+            tokens.push({ type: 'op', value: match[3] });
+        }
+    }
+    return tokens;
+}
+
+/**
+ * Analisa uma expressão com a gramática (e precedências) das expressões do Python
+ * @param {string} source - Expressão reescrita
+ * @returns {Object} - Árvore sintáctica
+ */
+function parseExpression(source) {
+    const tokens = tokenize(source);
+    let index = 0;
+    const peek = () => tokens[index];
+    const isOp = (value) => peek() && peek().type === 'op' && peek().value === value;
+    const expect = (value) => {
+        if (!isOp(value)) {
+            throw new SyntaxError(`esperado '${value}'`);
+        }
+        index++;
+    };
+
+    function expressionList() {
+        const items = [sum()];
+        let tuple = false;
+        while (isOp(',')) {
+            index++;
+            tuple = true;
+            if (!peek() || isOp(')')) {
+                break;
+            }
+            items.push(sum());
+        }
+        return tuple ? { type: 'tuple', items } : items[0];
+    }
+
+    function sum() {
+        let node = product();
+        while (isOp('+') || isOp('-')) {
+            const op = tokens[index++].value;
+            node = { type: 'binop', op, left: node, right: product() };
+        }
+        return node;
+    }
+
+    function product() {
+        let node = unary();
+        while (isOp('*') || isOp('/')) {
+            const op = tokens[index++].value;
+            node = { type: 'binop', op, left: node, right: unary() };
+        }
+        return node;
+    }
+
+    function unary() {
+        if (isOp('-') || isOp('+')) {
+            const op = tokens[index++].value;
+            return { type: 'unary', op, operand: unary() };
+        }
+        return power();
+    }
+
+    function power() {
+        const base = primary();
+        if (isOp('**')) {
+            index++;
+            return { type: 'binop', op: '**', left: base, right: unary() };
+        }
+        return base;
+    }
+
+    function primary() {
+        let node = atom();
+        while (isOp('(')) {
+            index++;
+            const args = [];
+            while (!isOp(')')) {
+                args.push(sum());
+                if (!isOp(',')) {
+                    break;
+                }
+                index++;
+            }
+            expect(')');
+            node = { type: 'call', callee: node, args };
+        }
+        return node;
+    }
+
+    function atom() {
+        const token = tokens[index++];
+        if (!token) {
+            throw new SyntaxError('fim inesperado da expressão');
+        }
+        if (token.type === 'number') {
+            return { type: 'number', value: token.value };
+        }
+        if (token.type === 'name') {
+            return { type: 'name', name: token.value };
+        }
+        if (token.value === '(') {
+            if (isOp(')')) {
+                index++;
+                return { type: 'tuple', items: [] };
+            }
+            const inner = expressionList();
+            expect(')');
+            return inner;
+        }
+        throw new SyntaxError(`símbolo inesperado '${token.value}'`);
+    }
+
+    if (!tokens.length) {
+        throw new SyntaxError('expressão vazia');
+    }
+    const tree = expressionList();
+    if (index < tokens.length) {
+        throw new SyntaxError(`símbolo inesperado '${tokens[index].value}'`);
+    }
+    return tree;
+}
+
+/** Avalia a árvore sintáctica no ambiente dado */
+function evaluateTree(node, env) {
+    switch (node.type) {
+        case 'number':
+            return node.value;
+        case 'name':
+            if (!Object.prototype.hasOwnProperty.call(env, node.name)) {
+                throw new EvaluationError(`name '${node.name}' is not defined`);
+            }
+            return env[node.name];
+        case 'tuple':
+            node.items.forEach(item => evaluateTree(item, env));
+            return { tuple: true };
+        case 'unary': {
+            const operand = evaluateTree(node.operand, env);
+            if (!isScalar(operand)) {
+                throw new EvaluationError(`bad operand type for unary ${node.op}`);
+            }
+            return node.op === '-' ? -operand : operand;
+        }
+        case 'binop':
+            return binop(node.op, evaluateTree(node.left, env), evaluateTree(node.right, env));
+        case 'call': {
+            const callee = evaluateTree(node.callee, env);
+            const args = node.args.map(arg => evaluateTree(arg, env));
+            if (typeof callee !== 'function') {
+                throw new EvaluationError('object is not callable');
+            }
+            if (callee.length && args.length !== callee.length) {
+                throw new EvaluationError('wrong number of arguments');
+            }
+            return callee(...args);
+        }
+    }
+    throw new UnsupportedExpression(node.type);
+}
+
+/**
+ * Interpreta uma string simples de componentes (espelha Quaternion.from_string)
+ * @param {string} s - Texto como "1 + 2i - 3k"
+ * @param {Function} Cls - Quaternion ou Coquaternion
+ * @returns {Hypercomplex} - Valor lido
+ */
+function fromString(s, Cls) {
+    const parseFloatPy = (text) => {
+        const t = text.trim();
+        if (/^[+-]?(inf|infinity|nan)$/i.test(t)) {
+            return Number(t.replace(/inf(inity)?/i, 'Infinity').replace(/nan/i, 'NaN'));
+        }
+        if (!/^[+-]?(\d(_?\d)*(\.(\d(_?\d)*)?)?|\.\d(_?\d)*)([eE][+-]?\d(_?\d)*)?$/.test(t)) {
+            throw new EvaluationError(`could not convert string to float: '${text}'`);
+        }
+        return Number(t.replace(/_/g, ''));
+    };
+    const parseValue = (text) => {
+        if (text.includes('/')) {
+            const pieces = text.split('/');
+            if (pieces.length !== 2) {
+                throw new EvaluationError('too many values to unpack');
+            }
+            const denominator = parseFloatPy(pieces[1]);
+            const numerator = parseFloatPy(pieces[0]);
+            if (denominator === 0) {
+                throw new EvaluationError('float division by zero');
+            }
+            return numerator / denominator;
+        }
+        return parseFloatPy(text);
+    };
+
+    if (!s || /^\s+$/.test(s)) {
+        return new Cls(0, 0, 0, 0);
+    }
+    if (/^-?\d+(\.\d+)?$/.test(s.trim())) {
+        return new Cls(Number(s.trim()), 0, 0, 0);
+    }
+    s = s.split(' ').join('').split('-').join('+-');
+    if (s.startsWith('+')) {
+        s = s.slice(1);
+    }
+    const components = [0, 0, 0, 0];
+    for (let part of s.split(/(?<!e)\+/)) {
+        if (!part) {
+            continue;
+        }
+        const negative = part.startsWith('-');
+        if (negative) {
+            part = part.slice(1);
+        }
+        const unit = ['i', 'j', 'k'].findIndex(u => part.includes(u)) + 1;
+        let value = 1.0;
+        if (unit === 0) {
+            value = parseValue(part);
+        } else if (part.length > 1) {
+            value = parseValue(part.split('ijk'[unit - 1]).join(''));
+        }
+        components[unit] += negative ? -value : value;
+    }
+    return new Cls(...components);
+}
+
+/**
+ * Avalia uma expressão como parse_quaternion_expr / parse_coquaternion_expr
+ * e devolve o texto que o servidor mostraria
+ * @param {string} expression - Expressão introduzida pelo utilizador
+ * @param {string} algebra - 'quaternion' ou 'coquaternion'
+ * @returns {string} - Resultado formatado
+ * @throws {EvaluationError} - Se o servidor devolvesse um erro
+ * @throws {UnsupportedExpression} - Se a expressão usar construções não cobertas
+ */
+function evaluateHypercomplex(expression, algebra) {
+    const Cls = algebra === 'coquaternion' ? Coquaternion : Quaternion;
+    const className = algebra === 'coquaternion' ? 'Coquaternion' : 'Quaternion';
+    const rewritten = rewriteHypercomplexExpr(expression, className);
+    let value;
+    try {
+        const result = evaluateTree(parseExpression(rewritten), buildEnvironment(algebra));
+        if (result instanceof Cls) {
+            value = result;
+        } else if (isScalar(result)) {
+            value = new Cls(result);
+        } else {
+            throw new EvaluationError('Resultado da expressão é de tipo não suportado');
+        }
+    } catch (error) {
+        if (!(error instanceof EvaluationError || error instanceof SyntaxError)) {
+            throw error;
+        }
+        // Parser alternativo, sobre a expressão reescrita com as unidades repostas
+        let original = rewritten;
+        ['i', 'j', 'k'].forEach((unit, index) => {
+            const args = [0, 0, 0, 0];
+            args[index + 1] = 1;
+            original = original.split(`${className}(${args.join(',')})`).join(unit);
+        });
+        value = fromString(original, Cls);
+    }
+    const components = [value.a, value.b, value.c, value.d];
+    if (!components.every(isFinite)) {
+        throw new EvaluationError('Resultado não finito');
+    }
+    return value.toString();
+}
+
+/**
+ * Pré-visualização do resultado, ou null se não for possível calculá-lo localmente
+ * @param {string} expression - Expressão introduzida pelo utilizador
+ * @param {string} algebra - 'quaternion' ou 'coquaternion'
+ * @returns {string|null} - Resultado formatado
+ */
+function previewHypercomplex(expression, algebra) {
+    if (!expression || !expression.trim()) {
+        return null;
+    }
+    try {
+        return evaluateHypercomplex(expression, algebra);
+    } catch (error) {
+        return null;
+    }
+}
+
+let previewScheduled = false;
+
+/**
+ * Actualiza a pré-visualização do resultado (páginas de quaterniões e coquaterniões)
+ */
+function updatePreview() {
+    previewScheduled = false;
+    const preview = document.getElementById('livePreview');
+    const display = document.getElementById('display');
+    if (!preview || !display) {
+        return;
+    }
+    const expression = display.value;
+    const result = resultDisplayed ? null : previewHypercomplex(expression, preview.dataset.algebra);
+    if (result === null || result === expression.replace(/\s+/g, '')) {
+        preview.textContent = '';
+        preview.classList.remove('show');
+    } else {
+        preview.textContent = '= ' + result;
+        preview.classList.add('show');
+    }
+}
+
+/**
+ * Agenda a actualização da pré-visualização depois de o ecrã ser alterado
+ */
+function schedulePreview() {
+    if (!previewScheduled) {
+        previewScheduled = true;
+        setTimeout(updatePreview, 0);
+    }
+}
+
+// Eventos carregados quando o DOM estiver pronto (apenas no browser)
+if (typeof document !== 'undefined') document.addEventListener('DOMContentLoaded', function() {
     // Controlo do menu suspenso
     const dropdownButton = document.getElementById('dropdownButton');
     const dropdownContent = document.getElementById('dropdownContent');
@@ -283,7 +1671,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Submissão do formulário
     const form = document.querySelector('form');
     if (form) {
-        form.addEventListener('submit', function() {
+        form.addEventListener('submit', function(e) {
+            if (window.fetch && window.FormData) {
+                e.preventDefault();
+                submitInBackground(form);
+                return;
+            }
             setTimeout(function() {
                 resultDisplayed = true;
             }, 10);
@@ -400,6 +1793,16 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Pré-visualização: o ecrã é alterado pelos botões e pelo teclado, pelo que
+    // se recalcula após cada clique ou tecla (e em colagens)
+    if (document.getElementById('livePreview')) {
+        document.addEventListener('click', schedulePreview);
+        document.addEventListener('keydown', schedulePreview);
+        if (display) {
+            display.addEventListener('input', schedulePreview);
+        }
+    }
+
     // Eventos de teclado globais
     document.addEventListener('keydown', function(e) {
         if (display && document.activeElement !== display && 
@@ -420,7 +1823,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
                 
-                if (e.key === 'Enter' || e.key === '=') {
+                if (e.key === 'Enter') {
                     submitForm();
                     return;
                 }
@@ -429,4 +1832,12 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
     });
-});
\ No newline at end of file
+});
+
+// Exportação para o Node.js (verificação de paridade com hypercomplex.py)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = {
+        Quaternion, Coquaternion, EvaluationError, UnsupportedExpression,
+        rewriteHypercomplexExpr, evaluateHypercomplex, previewHypercomplex, formatComponent
+    };
+}
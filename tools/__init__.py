@@ -0,0 +1,6 @@
+"""
+Ferramentas de desenvolvimento e de build da calculadora.
+
+Executar a partir da raiz do projecto, como módulos:
+    python -m tools.build_assets
+"""
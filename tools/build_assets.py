@@ -0,0 +1,236 @@
+"""
+Build dos recursos estáticos: agregação, minificação, impressão digital e compressão.
+
+Cada pacote definido em BUNDLES é formado pela concatenação dos ficheiros de
+origem em static/, minificado e gravado em static/dist/ com um hash do
+conteúdo no nome (p.ex. style.3f2a1b9c.css), acompanhado de uma variante
+.gz pré-comprimida. O ficheiro static/dist/manifest.json associa cada nome
+lógico ao nome com impressão digital; é lido por assets.py para gerar os
+endereços usados nos templates. O ficheiro static/dist/sources.json guarda o
+hash de cada ficheiro de origem, para que assets.py reconheça um build
+desactualizado e volte a servir os originais.
+
+Uso:
+    python -m tools.build_assets
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = 'manifest.json'
+SOURCES = 'sources.json'
+
+# Nome lógico do pacote -> ficheiros de origem (relativos a static/), pela ordem
+BUNDLES = {
+    'style.css': ['style.css'],
+    'calculator.js': ['calculator.js'],
+}
+
+# Tamanho mínimo (bytes) para gravar a variante comprimida
+GZIP_MIN_SIZE = 256
+
+
+def _split_strings(source, quotes):
+    """
+    Separa o código em segmentos, distinguindo literais de texto do resto.
+
+    Args:
+        source (str): Código de origem
+        quotes (str): Caracteres que delimitam literais de texto
+
+    Yields:
+        tuple: (é_literal, texto do segmento)
+    """
+    start = i = 0
+    while i < len(source):
+        char = source[i]
+        if char in quotes:
+            if start < i:
+                yield False, source[start:i]
+            j = i + 1
+            while j < len(source) and source[j] != char:
+                j += 2 if source[j] == '\\' else 1
+            yield True, source[i:j + 1]
+            start = i = j + 1
+        else:
+            i += 1
+    if start < len(source):
+        yield False, source[start:]
+
+
+def minify_css(source):
+    """
+    Minifica CSS: remove comentários e espaços desnecessários, preservando
+    os literais de texto.
+
+    Args:
+        source (str): Folha de estilos
+
+    Returns:
+        str: Folha de estilos minificada
+    """
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    parts = []
+    for is_string, segment in _split_strings(source, '"\''):
+        if not is_string:
+            segment = re.sub(r'\s+', ' ', segment)
+            segment = re.sub(r'\s*([{};,>])\s*', r'\1', segment)
+            # Depois de ':' o espaço é sempre dispensável; antes não (p.ex. ".a :hover")
+            segment = re.sub(r':\s+', ':', segment)
+            segment = segment.replace(';}', '}')
+        parts.append(segment)
+    return ''.join(parts).strip()
+
+
+def _starts_regex(out):
+    """Indica se uma barra, dado o código já emitido, inicia uma expressão regular."""
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index < 0:
+        return True
+    previous = out[index]
+    if previous in '(,=:[!&|?{};+-*%<>~^':
+        return True
+    # Palavra-chave imediatamente antes (p.ex. "return /x/")
+    word = ''.join(out[max(0, index - 5):index + 1])
+    return re.search(r'(^|[^\w$])(return|typeof|case|in|of)$', word) is not None
+
+
+def minify_js(source):
+    """
+    Minifica JavaScript de forma conservadora: remove comentários, indentação
+    e linhas vazias, mantendo as quebras de linha (que podem ser significativas)
+    e o conteúdo dos literais de texto e de template.
+
+    Args:
+        source (str): Código JavaScript
+
+    Returns:
+        str: Código minificado
+    """
+    out = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        if char in '"\'`':
+            j = i + 1
+            while j < length and source[j] != char:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = length if end < 0 else end + 2
+        elif char == '/' and _starts_regex(out):
+            # Literal de expressão regular: copiar até à barra final
+            j = i + 1
+            in_class = False
+            while j < length and (source[j] != '/' or in_class):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        else:
+            out.append(char)
+            i += 1
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(name, content):
+    """
+    Acrescenta ao nome do ficheiro os primeiros 8 caracteres do hash do conteúdo.
+
+    Args:
+        name (str): Nome lógico (p.ex. 'style.css')
+        content (bytes): Conteúdo final do ficheiro
+
+    Returns:
+        str: Nome com impressão digital (p.ex. 'style.3f2a1b9c.css')
+    """
+    stem, extension = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    return f"{stem}.{digest}{extension}"
+
+
+def build(bundles=None, static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """
+    Gera os pacotes em dist_dir e grava o manifesto e os hashes das origens.
+
+    Args:
+        bundles (dict, optional): Pacotes a gerar (por omissão BUNDLES)
+        static_dir (str): Pasta dos ficheiros de origem
+        dist_dir (str): Pasta de destino (recriada a cada build)
+
+    Returns:
+        dict: Manifesto (nome lógico -> nome com impressão digital)
+    """
+    bundles = bundles or BUNDLES
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    hashes = {}
+    for name, sources in bundles.items():
+        text = []
+        hashes[name] = {}
+        for source in sources:
+            path = os.path.join(static_dir, source)
+            with open(path, 'rb') as f:
+                hashes[name][source] = hashlib.sha256(f.read()).hexdigest()
+            with open(path, encoding='utf-8') as f:
+                text.append(f.read())
+        minify = MINIFIERS.get(os.path.splitext(name)[1], lambda s: s)
+        content = minify('\n'.join(text)).encode('utf-8')
+
+        filename = fingerprint(name, content)
+        with open(os.path.join(dist_dir, filename), 'wb') as f:
+            f.write(content)
+        if len(content) >= GZIP_MIN_SIZE:
+            # mtime fixo: a variante comprimida é reprodutível entre builds
+            with open(os.path.join(dist_dir, filename + '.gz'), 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        manifest[name] = filename
+
+    with open(os.path.join(dist_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    with open(os.path.join(dist_dir, SOURCES), 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main(argv=None):
+    manifest = build()
+    for name, filename in sorted(manifest.items()):
+        path = os.path.join(DIST_DIR, filename)
+        size = os.path.getsize(path)
+        original = sum(os.path.getsize(os.path.join(STATIC_DIR, s)) for s in BUNDLES[name])
+        gz = path + '.gz'
+        gz_size = f"{os.path.getsize(gz):>7} B gzip" if os.path.exists(gz) else ""
+        print(f"{name:<16} -> {filename:<28} {original:>7} B -> {size:>7} B {gz_size}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
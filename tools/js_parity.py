@@ -0,0 +1,201 @@
+"""
+Verificação de paridade entre o avaliador JavaScript (static/calculator.js)
+e hypercomplex.py.
+
+Avalia o mesmo corpus de expressões nos dois lados (o JavaScript através do
+Node.js) e compara o texto do resultado, ou o facto de ambos falharem. As
+expressões que o avaliador local declara não suportar não contam como
+divergência: nesses casos o browser simplesmente não mostra pré-visualização.
+
+Uso:
+    python -m tools.js_parity
+    python -m tools.js_parity --random 2000 --seed 3 --verbose
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import warnings
+
+from benchmarks.corpus import COQUATERNION_EXPRESSIONS, QUATERNION_EXPRESSIONS
+from hypercomplex import parse_coquaternion_expr, parse_quaternion_expr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'static', 'calculator.js')
+
+# Casos limite: negação unária, parser alternativo, erros, formatação e cortes de ramo
+EDGE_EXPRESSIONS = [
+    "", "0", "-0", "2 3", "1 + 2 i", "-3**2", "-i**2", "-(1+i)", "2*-i", "2**-1", "2**10",
+    "7/2", "1/0", "i/0", "0**-1", "(-8)**0.5", "2**0.5", "sqrt(-4)", "sqrt(4)", "ln(-1)",
+    "ln(0)", "exp(1000)", "exp(700)", "1e-3+2i", "1e3+2i", "1.5e2i", "3/4i", "100000.4",
+    "1e10+0.5", "123456789.123", "0.000012345", "1e-7", "i*j*k", "j*j", "k*k", "i2", "2pi",
+    "pi*i", "e*j", "sin", "sin(1, 2)", "foo(1)", "Quaternion(1,2,3,4)", "Coquaternion(1,2,3,4)",
+    "norm(3)", "norm(-3)", "normalize(-3)", "normalize(0)", "inverse(4)", "arg(-2)", "arg(2)",
+    "absIJK(5)", "sign(5)", "pow(2, 3)", "pow(i, 3)", "pow10(2)", "pow10(i)", "acosh(0.5)",
+    "acosh(2)", "asin(2)", "atanh(1)", "atanh(0.5)", "log(2)", "divL(1, 0)", "divR(i, j)",
+    "- divL(1+i, 1+j)", "-divL(1+i, 1+j) + 2", "√4", "√(1+i)", "2×i", "(1+i)^2", "(1+i)^0.5",
+    "(1+i)**(1+j)", "(1+j)**(1+i)", "conjugate(1+2i)", "real(3+2i)", "vectorial(3+2i)",
+    "tan(1+j)", "tanh(1+k)", "atan(0.5+0.2i)", "atan(0.5+0.2j)", "norm_mink(2+j)",
+    "normalize_mink(2+j)", "sin(i+j)", "exp(j+k)", "ln(1+j)", "ln(-1+j)", "(1+j)**-3",
+    "(2+i)**5", "(1+i)**-2", "(1+i, 2)", "()", "1_000", "01", "00", "1..2", "i j", "2(3)",
+    "math.pi", "1 % 2", "2**100", "2**2000", "10.0**400", "-(2)", "+i", "-pi", "--1",
+]
+
+UNITS = ('i', 'j', 'k')
+
+
+def random_expression(rng, functions, depth=0):
+    """Gera aleatoriamente uma expressão com números, unidades, operadores e funções."""
+    roll = rng.random()
+    if depth > 3 or roll < 0.3:
+        choice = rng.random()
+        if choice < 0.4:
+            return str(rng.choice([rng.randint(0, 9), round(rng.uniform(-3, 3), rng.randint(1, 3))]))
+        if choice < 0.8:
+            coefficient = rng.choice(['', str(rng.randint(1, 5)), str(round(rng.uniform(0, 2), 2))])
+            return coefficient + rng.choice(UNITS)
+        return rng.choice(['pi', 'e'])
+    if roll < 0.55:
+        op = rng.choice(['+', '-', '*', '/', '**'])
+        right = str(rng.choice([2, 3, -1, 0.5])) if op == '**' else random_expression(rng, functions, depth + 1)
+        return f"({random_expression(rng, functions, depth + 1)}{op}{right})"
+    if roll < 0.65:
+        return f"-{random_expression(rng, functions, depth + 1)}"
+    name = rng.choice(functions)
+    if name in ('divL', 'divR', 'pow'):
+        return f"{name}({random_expression(rng, functions, depth + 1)}, {random_expression(rng, functions, depth + 1)})"
+    return f"{name}({random_expression(rng, functions, depth + 1)})"
+
+
+RANDOM_FUNCTIONS = {
+    'quaternion': ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'sinh', 'cosh', 'tanh', 'asinh',
+                   'acosh', 'atanh', 'exp', 'ln', 'sqrt', 'conjugate', 'norm', 'normalize', 'inverse',
+                   'arg', 'absIJK', 'sign', 'pow10', 'divL', 'divR', 'pow', 'real', 'vectorial'],
+    'coquaternion': ['sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh', 'atan', 'exp', 'ln', 'log', 'sqrt',
+                     'conjugate', 'norm', 'normalize', 'inverse', 'absIJK', 'sign', 'norm_mink',
+                     'normalize_mink', 'pow10', 'divL', 'divR', 'pow', 'real', 'vectorial'],
+}
+
+PYTHON_PARSERS = {'quaternion': parse_quaternion_expr, 'coquaternion': parse_coquaternion_expr}
+
+NODE_RUNNER = r"""
+const calc = require(process.argv[1]);
+const cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const out = cases.map(([algebra, expression]) => {
+    try {
+        return { kind: 'ok', text: calc.evaluateHypercomplex(expression, algebra) };
+    } catch (error) {
+        if (error instanceof calc.UnsupportedExpression) {
+            return { kind: 'unsupported', text: error.message };
+        }
+        return { kind: 'error', text: String(error && error.message) };
+    }
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+# Diferenças de arredondamento entre as bibliotecas matemáticas do C e do JavaScript
+# tornam-se visíveis quando um valor muito grande é escrito como inteiro
+RELATIVE_TOLERANCE = 1e-12
+
+_TERM = re.compile(r'([+-]?)(\d+(?:\.\d*)?(?:e[+-]\d+)?)?([ijk]?)')
+
+
+def components(text):
+    """Lê o texto de um resultado ('1.5-2i+k') como lista de 4 componentes."""
+    values = [0.0, 0.0, 0.0, 0.0]
+    position = 0
+    while position < len(text):
+        match = _TERM.match(text, position)
+        if not match or match.end() == position:
+            return None
+        sign, number, unit = match.groups()
+        value = float(number) if number else 1.0
+        values['_ijk'.index(unit) if unit else 0] += -value if sign == '-' else value
+        position = match.end()
+    return values
+
+
+def equivalent(py_text, js_text):
+    """Compara dois resultados formatados, tolerando diferenças de arredondamento."""
+    if py_text == js_text:
+        return True
+    left, right = components(py_text), components(js_text)
+    if left is None or right is None:
+        return False
+    scale = max(map(abs, left + right)) or 1.0
+    return all(math.isclose(a, b, rel_tol=RELATIVE_TOLERANCE, abs_tol=RELATIVE_TOLERANCE * scale)
+               for a, b in zip(left, right))
+
+
+def python_result(algebra, expression):
+    """Resultado do servidor: ('ok', texto) ou ('error', mensagem)."""
+    try:
+        with warnings.catch_warnings():
+            # Expressões aleatórias como "2(3)" geram SyntaxWarning no compile
+            warnings.simplefilter('ignore', SyntaxWarning)
+            return 'ok', str(PYTHON_PARSERS[algebra](expression))
+    except Exception as e:
+        return 'error', f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+
+def javascript_results(cases, node='node'):
+    """Avalia os casos no Node.js com o avaliador de calculator.js."""
+    completed = subprocess.run([node, '-e', NODE_RUNNER, SCRIPT], input=json.dumps(cases),
+                               capture_output=True, text=True, check=True)
+    return [(item['kind'], item['text']) for item in json.loads(completed.stdout)]
+
+
+def build_cases(random_count=0, seed=0):
+    cases = []
+    for algebra, corpus in (('quaternion', QUATERNION_EXPRESSIONS), ('coquaternion', COQUATERNION_EXPRESSIONS)):
+        for expression in list(corpus) + EDGE_EXPRESSIONS:
+            cases.append((algebra, expression))
+    rng = random.Random(seed)
+    for n in range(random_count):
+        algebra = 'quaternion' if n % 2 == 0 else 'coquaternion'
+        cases.append((algebra, random_expression(rng, RANDOM_FUNCTIONS[algebra])))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paridade entre o avaliador JavaScript e hypercomplex.py.")
+    parser.add_argument('--random', type=int, default=500, help="número de expressões aleatórias adicionais")
+    parser.add_argument('--seed', type=int, default=0, help="semente das expressões aleatórias")
+    parser.add_argument('--node', default='node', help="executável do Node.js")
+    parser.add_argument('--verbose', '-v', action='store_true', help="listar também as expressões não suportadas")
+    args = parser.parse_args(argv)
+
+    if shutil.which(args.node) is None:
+        print(f"Node.js não encontrado ({args.node})", file=sys.stderr)
+        return 2
+
+    cases = build_cases(args.random, args.seed)
+    js = javascript_results(cases, args.node)
+    counts = {'match': 0, 'mismatch': 0, 'unsupported': 0}
+    for (algebra, expression), (js_kind, js_text) in zip(cases, js):
+        py_kind, py_text = python_result(algebra, expression)
+        if js_kind == 'unsupported':
+            counts['unsupported'] += 1
+            if args.verbose:
+                print(f"[não suportada] {algebra:<12} {expression!r}: {js_text}")
+        elif js_kind == py_kind and (js_kind == 'error' or equivalent(py_text, js_text)):
+            counts['match'] += 1
+        else:
+            counts['mismatch'] += 1
+            print(f"[divergência]   {algebra:<12} {expression!r}\n"
+                  f"    python: {py_kind} {py_text}\n    js:     {js_kind} {js_text}")
+
+    print(f"{len(cases)} expressões: {counts['match']} iguais, {counts['mismatch']} divergentes, "
+          f"{counts['unsupported']} não suportadas pelo avaliador local")
+    return 1 if counts['mismatch'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Aquecimento da aplicação antes de servir pedidos e endpoints de saúde.
+
+O aquecimento percorre os caminhos de avaliação das três calculadoras com
+expressões representativas: importa o NumPy, compila as expressões regulares
+e os templates Jinja e exercita as funções transcendentes e o parser
+alternativo. Com um servidor que pré-carrega a aplicação antes do fork
+(ver gunicorn.conf.py), o trabalho é feito uma única vez no processo mestre
+e herdado por todos os workers.
+
+Endpoints:
+    /healthz: o processo está vivo (sempre 200)
+    /readyz: 200 apenas depois de concluído o aquecimento, 503 até lá
+"""
+import threading
+import time
+
+# Expressões que cobrem os ramos principais de cada calculadora
+WARMUP_EXPRESSIONS = {
+    '/': ["1+2i", "sqrt(2) + exp(i*pi)", "sin(30) + ln(2+3i)", "mod(7, 3) * abs(3-4i)", "2 3"],
+    '/quaternions': ["(1+2i+3j+4k)*(2-i+j-k)", "divL(1+2i, 3j+k)", "exp(1+2i+3j)", "(1+i+j)**0.5",
+                     "ln(1+2i+3j+4k) + normalize(1+i+j+k)", "1+2i+3j+4k"],
+    '/coquaternions': ["(1+2i+3j+4k)*(2-i+j-k)", "divR(1+2i, 3+k)", "exp(1+2i+j)", "exp(1+i+2j)",
+                       "exp(1+j+k)", "(2+j)**0.5", "1+2i+3j+4k"],
+}
+
+_ready = threading.Event()
+_duration = None
+
+
+def is_ready():
+    """Indica se o aquecimento já foi concluído."""
+    return _ready.is_set()
+
+
+def warm_up(app):
+    """
+    Exercita os caminhos de avaliação e de renderização da aplicação.
+
+    Os pedidos são feitos pelo cliente de testes do Flask, pelo que passam
+    pelas mesmas rotas que os pedidos reais, mas sem a cache de resultados.
+    As métricas acumuladas durante o aquecimento são descartadas no fim.
+
+    Args:
+        app (Flask): Aplicação a aquecer
+
+    Returns:
+        float: Duração do aquecimento em segundos
+    """
+    import metrics
+    import result_cache
+
+    global _duration
+    start = time.perf_counter()
+    client = app.test_client()
+    with result_cache.bypassed():
+        for path, expressions in WARMUP_EXPRESSIONS.items():
+            client.get(path)
+            for expression in expressions:
+                client.post(path, data={'expression': expression})
+        # Modo em graus na calculadora principal
+        client.get('/toggle_angle_mode')
+        client.post('/', data={'expression': 'cos(60) + tan(45)'})
+    for calculator in ('standard', 'quaternion', 'coquaternion'):
+        client.get(f'/clear_history/{calculator}')
+
+    metrics.reset()
+    # Em modo multiprocesso, substituir o snapshot já gravado durante o aquecimento
+    metrics.flush(force=True)
+    _duration = time.perf_counter() - start
+    _ready.set()
+    app.logger.info("Aquecimento concluído em %.1f ms", _duration * 1000)
+    return _duration
+
+
+def init_app(app):
+    """
+    Regista os endpoints /healthz e /readyz na aplicação Flask.
+
+    Args:
+        app (Flask): Aplicação a configurar
+    """
+    from flask import jsonify
+
+    @app.route("/healthz")
+    def healthz():
+        """
+        Verificação de vida do processo.
+
+        Returns:
+            Response: Estado 'ok'
+        """
+        return jsonify(status='ok')
+
+    @app.route("/readyz")
+    def readyz():
+        """
+        Verificação de prontidão: só responde 200 depois do aquecimento.
+
+        Returns:
+            Response: Estado e duração do aquecimento (503 se ainda não terminou)
+        """
+        if not is_ready():
+            return jsonify(status='warming_up'), 503
+        return jsonify(status='ready', warmup_ms=round(_duration * 1000, 1))
@@ -0,0 +1,324 @@
+"""
+Variáveis e funções do utilizador, guardadas na sessão de cada calculadora.
+
+Cada calculadora (principal, quaterniões, coquaterniões) tem o seu espaço de
+nomes e aceita três tipos de instrução:
+
+    q = 1+2i+3j                   atribuição de uma variável
+    f(x) = exp(x)*conjugate(x)    definição de uma função
+    f(q)*ans - q                  expressão, que pode usar as variáveis, as
+                                  funções e ans (o último resultado)
+
+As variáveis guardam o valor nativo (float, complex, Quaternion ou
+Coquaternion). Na sessão (um cookie) ficam as suas componentes numéricas, que
+cada pedido reconstrói sem voltar a avaliar nada, em qualquer worker. Das
+funções guarda-se a definição; o corpo é compilado com memorização partilhada
+por todas as sessões do processo, pelo que cada worker o compila uma única vez
+e as chamadas seguintes só o avaliam.
+
+Quando uma expressão sem nomes do utilizador é servida pela cache de
+resultados, o valor nativo de ans não chega a ser calculado: fica registada a
+expressão, avaliada apenas se uma instrução seguinte usar ans.
+"""
+import collections
+import keyword
+import numbers
+import re
+
+from hypercomplex import Quaternion, Coquaternion
+
+# Chave da sessão com os espaços de nomes de todas as calculadoras
+SESSION_KEY = 'workspace'
+
+# Nome do último resultado
+ANSWER = 'ans'
+
+# Limites por calculadora, para que a sessão caiba no cookie
+MAX_NAMES = 20
+MAX_DEFINITION_LENGTH = 300
+
+_IDENTIFIER = re.compile(r'[A-Za-z_]\w*')
+_ASSIGNMENT = re.compile(r'^\s*([A-Za-z_]\w*)\s*=(?!=)(.*)$', re.S)
+_DEFINITION = re.compile(r'^\s*([A-Za-z_]\w*)\s*\(\s*([A-Za-z_]\w*(?:\s*,\s*[A-Za-z_]\w*)*)\s*\)\s*=(?!=)(.*)$', re.S)
+
+# Classe da álgebra de cada calculadora (None para a calculadora principal)
+_ALGEBRAS = {'standard': None, 'quaternion': Quaternion, 'coquaternion': Coquaternion}
+
+Statement = collections.namedtuple('Statement', 'kind name params expression')
+Statement.__doc__ = """
+Instrução introduzida pelo utilizador.
+
+Attributes:
+    kind (str): 'expression', 'assignment' ou 'definition'
+    name (str): Variável ou função definida (None nas expressões)
+    params (tuple): Parâmetros da função
+    expression (str): Expressão a avaliar, ou corpo da função
+"""
+
+Evaluator = collections.namedtuple('Evaluator', 'compile evaluate reserved')
+Evaluator.__doc__ = """
+Operações de uma calculadora usadas pelo espaço de nomes.
+
+Attributes:
+    compile (callable): compile(expressão, variáveis) -> objecto com
+        evaluate(valores); memorizada
+    evaluate (callable): evaluate(expressão, valores, stats, angle_mode) ->
+        valor nativo
+    reserved (callable): reserved(nome) -> True se o nome pertence ao
+        ambiente da calculadora
+"""
+
+
+def parse_statement(text):
+    """
+    Classifica uma instrução em expressão, atribuição ou definição de função.
+
+    Args:
+        text (str): Texto introduzido
+
+    Returns:
+        Statement: Instrução
+
+    Raises:
+        ValueError: Se uma atribuição não tiver expressão
+    """
+    match = _DEFINITION.match(text)
+    if match:
+        params = tuple(param.strip() for param in match.group(2).split(','))
+        return Statement('definition', match.group(1), params, match.group(3).strip())
+    match = _ASSIGNMENT.match(text)
+    if match:
+        expression = match.group(2).strip()
+        if not expression:
+            raise ValueError(f"Falta a expressão a atribuir a {match.group(1)}")
+        return Statement('assignment', match.group(1), (), expression)
+    return Statement('expression', None, (), text)
+
+
+def encode(value, calculator):
+    """
+    Converte um valor nativo em dados serializáveis na sessão.
+
+    Args:
+        value: Resultado de uma avaliação
+        calculator (str): 'standard', 'quaternion' ou 'coquaternion'
+
+    Returns:
+        int, float ou list: Número inteiro ou real, [real, imaginária] ou [a, b, c, d]
+
+    Raises:
+        ValueError: Se o valor não for um número da calculadora
+    """
+    algebra = _ALGEBRAS[calculator]
+    if algebra is not None and isinstance(value, algebra):
+        return [value.a, value.b, value.c, value.d]
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        # Os inteiros continuam inteiros (a*3 mostra 6, como 2*3, e não 6.0)
+        return int(value) if isinstance(value, numbers.Integral) else float(value)
+    if isinstance(value, numbers.Complex):
+        return [float(value.real), float(value.imag)]
+    raise ValueError(f"Só é possível guardar números, não {type(value).__name__}")
+
+
+def decode(data, calculator):
+    """Reconstrói o valor nativo guardado por encode()."""
+    algebra = _ALGEBRAS[calculator]
+    if isinstance(data, list):
+        return algebra(*data) if len(data) == 4 else complex(*data)
+    return algebra(data) if algebra is not None else data
+
+
+class UserFunction:
+    """
+    Função definida pelo utilizador, pronta a chamar nas expressões.
+
+    O corpo compilado é partilhado (memorizado); as variáveis e funções que
+    usa são lidas do espaço de nomes no momento da chamada.
+    """
+
+    __slots__ = ('name', 'params', 'compiled', 'scope')
+
+    def __init__(self, name, params, compiled, scope):
+        self.name = name
+        self.params = params
+        self.compiled = compiled
+        self.scope = scope
+
+    def __call__(self, *args):
+        if len(args) != len(self.params):
+            raise TypeError(f"{self.name}() recebe {len(self.params)} argumento(s), foram indicados {len(args)}")
+        values = dict(self.scope)
+        values.update(zip(self.params, args))
+        return self.compiled.evaluate(values)
+
+
+class Workspace:
+    """
+    Espaço de nomes de uma calculadora na sessão corrente.
+
+    Args:
+        calculator (str): 'standard', 'quaternion' ou 'coquaternion'
+        store (dict): Dados da sessão: 'values' (nome -> valor codificado,
+            ou {'pending': expressão, 'angle_mode': modo} para ans) e
+            'functions' (nome -> [parâmetros, corpo])
+    """
+
+    def __init__(self, calculator, store=None):
+        store = store or {}
+        self.calculator = calculator
+        self.values = dict(store.get('values', {}))
+        self.functions = dict(store.get('functions', {}))
+        self._decoded = {}
+
+    @classmethod
+    def load(cls, session, calculator):
+        """Espaço de nomes de uma calculadora guardado na sessão."""
+        return cls(calculator, session.get(SESSION_KEY, {}).get(calculator))
+
+    def save(self, session):
+        """Grava o espaço de nomes na sessão."""
+        data = dict(session.get(SESSION_KEY, {}))
+        data[self.calculator] = {'values': self.values, 'functions': self.functions}
+        session[SESSION_KEY] = data
+
+    @property
+    def names(self):
+        return self.values.keys() | self.functions.keys()
+
+    def references(self, expression):
+        """Indica se a expressão usa algum nome deste espaço."""
+        names = self.names
+        return bool(names) and any(name in names for name in _IDENTIFIER.findall(expression))
+
+    def _check_name(self, name, evaluator):
+        if name == ANSWER or keyword.iskeyword(name) or evaluator.reserved(name):
+            raise ValueError(f"O nome '{name}' é reservado")
+        user_names = self.names - {ANSWER}
+        if name not in user_names and len(user_names) >= MAX_NAMES:
+            raise ValueError(f"Limite de {MAX_NAMES} variáveis e funções atingido")
+
+    def assign(self, name, value, evaluator):
+        """
+        Guarda uma variável.
+
+        Raises:
+            ValueError: Se o nome for reservado, o limite for atingido ou o
+                valor não for um número da calculadora
+        """
+        self._check_name(name, evaluator)
+        self.values[name] = encode(value, self.calculator)
+        self.functions.pop(name, None)
+        self._decoded[name] = value
+
+    def define(self, name, params, body, evaluator):
+        """
+        Define uma função, compilando o corpo (o que valida a sintaxe).
+
+        Raises:
+            ValueError: Se o nome ou os parâmetros forem inválidos, ou o corpo
+                não compilar
+        """
+        self._check_name(name, evaluator)
+        for param in params:
+            if keyword.iskeyword(param) or evaluator.reserved(param):
+                raise ValueError(f"O nome '{param}' é reservado")
+        if len(set(params)) != len(params):
+            raise ValueError("Parâmetros repetidos na definição da função")
+        if not body or len(body) > MAX_DEFINITION_LENGTH:
+            raise ValueError(f"O corpo da função deve ter entre 1 e {MAX_DEFINITION_LENGTH} caracteres")
+        try:
+            self._compile(params, body, evaluator)
+        except SyntaxError as e:
+            raise ValueError(f"Erro de sintaxe na definição de {name}: {e.msg}")
+        self.functions[name] = [list(params), body]
+        self.values.pop(name, None)
+        self._decoded.pop(name, None)
+
+    def _compile(self, params, body, evaluator):
+        # Só os nomes do espaço usados no corpo entram na chave da compilação memorizada
+        used = {name for name in _IDENTIFIER.findall(body) if name in self.names and name not in params}
+        return evaluator.compile(body, tuple(params) + tuple(sorted(used)))
+
+    def set_answer(self, value):
+        """Guarda o último resultado em ans (ignorado se não for um número)."""
+        try:
+            self.values[ANSWER] = encode(value, self.calculator)
+        except ValueError:
+            self.values.pop(ANSWER, None)
+            self._decoded.pop(ANSWER, None)
+            return
+        self._decoded[ANSWER] = value
+
+    def set_pending_answer(self, expression, angle_mode=None):
+        """Regista em ans a expressão cujo resultado veio da cache, sem o calcular."""
+        self.values[ANSWER] = {'pending': expression, 'angle_mode': angle_mode}
+        self._decoded.pop(ANSWER, None)
+
+    def clear(self):
+        """Apaga todas as variáveis e funções."""
+        self.values.clear()
+        self.functions.clear()
+        self._decoded.clear()
+
+    def _referenced(self, expression):
+        """Nomes deste espaço usados pela expressão, directamente ou pelas funções que chama."""
+        referenced = set()
+        pending = [(expression, ())]
+        while pending:
+            text, params = pending.pop()
+            for name in _IDENTIFIER.findall(text):
+                if name in referenced or name in params:
+                    continue
+                if name in self.functions:
+                    referenced.add(name)
+                    function_params, body = self.functions[name]
+                    pending.append((body, tuple(function_params)))
+                elif name in self.values:
+                    referenced.add(name)
+        return referenced
+
+    def scope(self, evaluator, expression=None):
+        """
+        Valores das variáveis e funções, para passar à avaliação.
+
+        Só são descodificados (e, no caso de ans pendente, avaliados) os nomes
+        que a expressão usa, directamente ou através das funções que chama.
+
+        Args:
+            evaluator (Evaluator): Operações da calculadora
+            expression (str, optional): Expressão a avaliar (por omissão,
+                todos os nomes do espaço)
+
+        Returns:
+            dict: Nome -> valor nativo ou UserFunction
+        """
+        names = self.names if expression is None else self._referenced(expression)
+        scope = {}
+        for name, data in list(self.values.items()):
+            if name not in names:
+                continue
+            value = self._decoded.get(name)
+            if value is None:
+                if isinstance(data, dict):
+                    value = evaluator.evaluate(data['pending'], None, None, data.get('angle_mode'))
+                    self.set_answer(value)
+                else:
+                    value = self._decoded[name] = decode(data, self.calculator)
+            scope[name] = value
+        for name, (params, body) in self.functions.items():
+            if name not in names:
+                continue
+            scope[name] = UserFunction(name, tuple(params), self._compile(params, body, evaluator), scope)
+        return scope
+
+
+def load(session, calculator):
+    """Atalho para Workspace.load."""
+    return Workspace.load(session, calculator)
+
+
+def clear(session, calculator):
+    """Apaga as variáveis e funções de uma calculadora na sessão."""
+    workspace = Workspace.load(session, calculator)
+    workspace.clear()
+    workspace.save(session)
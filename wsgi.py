@@ -0,0 +1,13 @@
+"""
+Ponto de entrada WSGI para produção.
+
+Importa a aplicação e aquece-a antes de devolver o objecto WSGI, para que
+o primeiro pedido de cada worker não pague importações nem compilações.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app
+import warmup
+
+warmup.warm_up(app)